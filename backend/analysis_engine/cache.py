@@ -0,0 +1,140 @@
+import hashlib
+import logging
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models.analysis import FileMetrics, CodeSmell
+from analysis_engine.pipeline import ANALYZER_VERSION, FileAnalysis, detect_language
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisCache:
+    """Content-addressed cache of per-file analysis results.
+
+    Entries are keyed on sha256(content) + language + analyzer version +
+    complexity threshold, so a file only needs re-analysis when its content
+    or the analysis rules change. A bounded in-memory LRU sits in front of
+    an optional Mongo collection whose TTL index expires old entries.
+
+    Cached values do not carry the filename: identical content under a
+    different path is a hit and gets re-labelled on the way out.
+    """
+
+    def __init__(self, collection=None, max_entries: int = 10000,
+                 ttl_seconds: int = 7 * 24 * 3600, complexity_threshold: int = 10):
+        self.collection = collection
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.complexity_threshold = complexity_threshold
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._index_ready = False
+
+    def key(self, filename: str, code: str) -> Optional[str]:
+        language = detect_language(filename)
+        if language == 'unknown':
+            return None
+        digest = hashlib.sha256(code.encode('utf-8', 'surrogatepass')).hexdigest()
+        return f"{digest}:{language}:{ANALYZER_VERSION}:{self.complexity_threshold}"
+
+    # ---------------- LRU ----------------
+
+    def _remember(self, key: str, value: dict):
+        if self.max_entries == 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _recall(self, key: str) -> Optional[dict]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    # ---------------- Serialization ----------------
+
+    @staticmethod
+    def _encode(analysis: FileAnalysis) -> dict:
+        return {
+            'metrics': analysis.metrics.model_dump(exclude={'filename', 'duplicated_lines'}),
+            'smells': [s.model_dump(exclude={'file'}) for s in analysis.smells],
+            'fingerprints': analysis.fingerprints.tobytes() if analysis.fingerprints else b''
+        }
+
+    @staticmethod
+    def _decode(filename: str, value: dict) -> FileAnalysis:
+        fingerprints = array('Q')
+        fingerprints.frombytes(value.get('fingerprints') or b'')
+        return FileAnalysis(
+            FileMetrics(filename=filename, **value['metrics']),
+            [CodeSmell(file=filename, **s) for s in value['smells']],
+            fingerprints
+        )
+
+    # ---------------- Persistent backing ----------------
+
+    async def _ensure_index(self):
+        if self._index_ready or self.collection is None:
+            return
+        await self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+        self._index_ready = True
+
+    async def _fetch(self, keys: List[str]) -> Dict[str, dict]:
+        if self.collection is None or not keys:
+            return {}
+        try:
+            await self._ensure_index()
+            cursor = self.collection.find({"_id": {"$in": keys}}, {"created_at": 0})
+            return {doc.pop('_id'): doc async for doc in cursor}
+        except Exception as e:
+            logger.warning(f"Analysis cache lookup failed: {str(e)}")
+            return {}
+
+    async def _store(self, entries: Dict[str, dict]):
+        if self.collection is None or not entries:
+            return
+        now = datetime.now(timezone.utc)
+        docs = [{'_id': key, 'created_at': now, **value} for key, value in entries.items()]
+        try:
+            await self._ensure_index()
+            await self.collection.insert_many(docs, ordered=False)
+        except Exception as e:
+            # Duplicate keys from concurrent analyses of the same content are expected
+            if 'duplicate key' not in str(e).lower() and 'E11000' not in str(e):
+                logger.warning(f"Analysis cache store failed: {str(e)}")
+
+    # ---------------- Public API ----------------
+
+    async def get_many(self, files: Iterable[Tuple[str, str, str]]) -> Dict[str, FileAnalysis]:
+        """Look up (key, filename, code) triples; returns hits by filename"""
+        hits = {}
+        missing = []
+        for key, filename, _ in files:
+            value = self._recall(key)
+            if value is not None:
+                hits[filename] = self._decode(filename, value)
+            else:
+                missing.append((key, filename))
+
+        if missing:
+            found = await self._fetch(list({key for key, _ in missing}))
+            for key, filename in missing:
+                value = found.get(key)
+                if value is not None:
+                    self._remember(key, value)
+                    hits[filename] = self._decode(filename, value)
+
+        return hits
+
+    async def put_many(self, entries: Iterable[Tuple[str, FileAnalysis]]):
+        """Store freshly computed (key, analysis) pairs"""
+        fresh = {}
+        for key, analysis in entries:
+            value = self._encode(analysis)
+            self._remember(key, value)
+            fresh[key] = value
+        await self._store(fresh)
@@ -0,0 +1,276 @@
+import heapq
+import re
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from models.analysis import CodeClone
+
+
+# Tokens per fingerprinted window (roughly 5-8 lines of code) and the
+# winnowing window: any clone at least K + W - 1 tokens long is guaranteed
+# to share a fingerprint
+KGRAM = 50
+WINDOW = 20
+
+# Upper bound on the line gap bridged when merging matches into one clone
+MAX_RUN_GAP = 40
+
+HASH_BASE = np.uint64(1000003)
+MIX_MULTIPLIER = np.uint64(0xBF58476D1CE4E5B9)
+
+COMMENT_PATTERNS = {
+    'python': r"#[^\n]*",
+    'bash': r"#[^\n]*",
+    'sql': r"--[^\n]*|/\*[\s\S]*?(?:\*/|\Z)",
+}
+C_COMMENTS = r"//[^\n]*|/\*[\s\S]*?(?:\*/|\Z)"
+
+TOKEN_BODY = (
+    r"|(?P<str>\"\"\"[\s\S]*?(?:\"\"\"|\Z)|'''[\s\S]*?(?:'''|\Z)"
+    r"|\"(?:\\.|[^\"\\\n])*\"?|'(?:\\.|[^'\\\n])*'?|`(?:\\[\s\S]|[^\\`])*`?)"
+    r"|(?P<id>[A-Za-z_$][\w$]*)"
+    r"|(?P<num>\d[\w.]*)"
+    r"|(?P<op>[^\s\w])"
+)
+
+_token_res: Dict[str, "re.Pattern"] = {}
+
+# Keywords survive normalization so `if` and `while` loops do not match;
+# every other identifier becomes one placeholder (type-2 clones)
+KEYWORDS = frozenset(
+    "if else elif for while do switch case default break continue return try catch "
+    "except finally raise throw def function fn func class struct interface enum impl "
+    "trait import from package new delete lambda yield await async with as in is not "
+    "and or match loop let var const static public private protected void select "
+    "where join insert update values then fi done esac".split()
+)
+
+_token_ids: Dict[str, int] = {}
+
+
+def _token_re(language: str):
+    pattern = _token_res.get(language)
+    if pattern is None:
+        comments = COMMENT_PATTERNS.get(language, C_COMMENTS)
+        pattern = re.compile(f"(?P<comment>{comments})" + TOKEN_BODY)
+        _token_res[language] = pattern
+    return pattern
+
+
+def _token_id(text: str) -> int:
+    # crc32 rather than hash(): fingerprints are computed in worker processes
+    # with different hash seeds and must agree
+    token_id = _token_ids.get(text)
+    if token_id is None:
+        token_id = zlib.crc32(text.encode('utf-8', 'surrogatepass')) + 1
+        _token_ids[text] = token_id
+    return token_id
+
+
+def normalized_tokens(code: str, language: str) -> Tuple[List[int], List[int]]:
+    """Token ids with identifiers and literals normalized, and their line numbers"""
+    ids = []
+    lines = []
+    line = 1
+    last = 0
+    placeholder = {'str': _token_id('S'), 'num': _token_id('N')}
+    identifier = _token_id('I')
+
+    for match in _token_re(language).finditer(code):
+        kind = match.lastgroup
+        start = match.start()
+        line += code.count('\n', last, start)
+        last = start
+        if kind == 'comment':
+            continue
+        if kind == 'id':
+            text = match.group(kind)
+            ids.append(_token_id(text) if text in KEYWORDS else identifier)
+        elif kind == 'op':
+            ids.append(_token_id(match.group(kind)))
+        else:
+            ids.append(placeholder[kind])
+        lines.append(line)
+
+    return ids, lines
+
+
+def fingerprint(code: str, language: str, k: int = KGRAM, w: int = WINDOW) -> array:
+    """Winnowed k-gram fingerprints of one file.
+
+    Returns a flat array of (hash, start_line, end_line) triples. Every
+    k-gram of normalized tokens gets a polynomial hash (computed for all
+    windows at once with numpy); winnowing keeps the minimum of every run
+    of w consecutive k-gram hashes, so the number of fingerprints is
+    O(tokens / w) while matches of k + w - 1 tokens or more are never missed.
+    """
+    ids, lines = normalized_tokens(code, language)
+    count = len(ids) - k + 1
+    if count <= 0:
+        return array('Q')
+
+    tokens = np.array(ids, dtype=np.uint64)
+    hashes = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        # Horner's rule over the k-gram, wrapping modulo 2**64
+        for offset in range(k):
+            hashes = hashes * HASH_BASE + tokens[offset:offset + count]
+        # splitmix64 finalizer: spreads entropy into the low bits used for sampling
+        hashes ^= hashes >> np.uint64(31)
+        hashes *= MIX_MULTIPLIER
+        hashes ^= hashes >> np.uint64(29)
+
+    if count > w:
+        picks = sliding_window_view(hashes, w).argmin(axis=1) + np.arange(count - w + 1)
+        picks = np.unique(picks)
+    else:
+        picks = np.array([hashes.argmin()])
+
+    line_numbers = np.array(lines, dtype=np.uint64)
+    triples = np.column_stack((hashes[picks], line_numbers[picks], line_numbers[picks + k - 1]))
+    return array('Q', triples.astype(np.uint64).tobytes())
+
+
+class CloneIndex:
+    """Streams per-file fingerprints into a bounded cross-file clone index.
+
+    Only the first occurrence of each fingerprint is kept, packed into one
+    int. When the index outgrows max_entries, the sampling modulus doubles
+    and fingerprints whose hash is not a multiple of it are dropped; lookups
+    use the same modulus, so memory stays bounded regardless of project
+    size at the cost of coarser (still unbiased) coverage.
+
+    Duplicated lines are counted on the later copy only: the ratio is the
+    share of code that repeats code seen before it, estimated per file from
+    the share of its fingerprints that were seen before.
+    """
+
+    LINE_BITS = 22
+    LINE_MASK = (1 << LINE_BITS) - 1
+
+    def __init__(self, max_entries: int = 500000, min_lines: int = 6,
+                 max_clones: int = 200, max_gap: int = 3):
+        self.max_entries = max(1, max_entries)
+        self.min_lines = min_lines
+        self.max_clones = max_clones
+        self.max_gap = max_gap
+        self.modulus = 1
+        self.total_loc = 0
+        self.duplicated_lines = 0
+        self._index: Dict[int, int] = {}
+        self._files: List[str] = []
+        self._clones: List[tuple] = []
+        self._seq = 0
+
+    # ---------------- Packing ----------------
+
+    def _pack(self, file_idx: int, start: int, end: int) -> int:
+        return (((file_idx << self.LINE_BITS) | min(start, self.LINE_MASK)) << self.LINE_BITS) \
+            | min(end, self.LINE_MASK)
+
+    def _unpack(self, value: int) -> Tuple[int, int, int]:
+        end = value & self.LINE_MASK
+        value >>= self.LINE_BITS
+        return value >> self.LINE_BITS, value & self.LINE_MASK, end
+
+    def _shrink(self):
+        while len(self._index) > self.max_entries:
+            self.modulus *= 2
+            modulus = self.modulus
+            self._index = {h: v for h, v in self._index.items() if h % modulus == 0}
+
+    # ---------------- Clone runs ----------------
+
+    def _emit(self, run: list, file_b: int):
+        file_a, start_a, end_a, start_b, end_b, _ = run
+        lines = end_b - start_b + 1
+        if lines < self.min_lines:
+            return
+        self._seq += 1
+        entry = (lines, self._seq, file_a, start_a, end_a, file_b, start_b, end_b)
+        if len(self._clones) < self.max_clones:
+            heapq.heappush(self._clones, entry)
+        elif entry > self._clones[0]:
+            heapq.heapreplace(self._clones, entry)
+
+    # ---------------- Public API ----------------
+
+    def add(self, filename: str, fingerprints: Optional[array], loc: int = 0) -> int:
+        """Index one file; returns the number of its lines duplicating earlier code"""
+        file_idx = len(self._files)
+        self._files.append(filename)
+        self.total_loc += loc
+        if not fingerprints:
+            return 0
+
+        runs: Dict[int, list] = {}
+        sampled = 0
+        matched = 0
+        index = self._index
+        # Sampling thins out fingerprints, so tolerate proportionally wider gaps
+        gap = min(self.max_gap * self.modulus, MAX_RUN_GAP)
+
+        for i in range(0, len(fingerprints), 3):
+            h, start, end = fingerprints[i], fingerprints[i + 1], fingerprints[i + 2]
+            if h % self.modulus:
+                continue
+            sampled += 1
+            first = index.get(h)
+            if first is None:
+                index[h] = self._pack(file_idx, start, end)
+                continue
+
+            file_a, start_a, end_a = self._unpack(first)
+            if file_a == file_idx and start_a <= end and start <= end_a:
+                # Overlaps itself (repetitive code such as long tables)
+                continue
+
+            matched += 1
+
+            # Extend the current run against file_a while both sides move
+            # forward together (periodic code keeps matching one short stretch)
+            run = runs.get(file_a)
+            if (run is not None and start <= run[4] + gap
+                    and run[5] <= start_a <= run[2] + gap
+                    and max(run[4], end) - run[3] <= max(run[2], end_a) - run[1] + gap):
+                run[2] = max(run[2], end_a)
+                run[4] = max(run[4], end)
+                run[5] = start_a
+            else:
+                if run is not None:
+                    self._emit(run, file_idx)
+                runs[file_a] = [file_a, start_a, end_a, start, end, start_a]
+
+        for run in runs.values():
+            self._emit(run, file_idx)
+
+        if len(index) > self.max_entries:
+            self._shrink()
+
+        # The matched share of sampled fingerprints estimates the duplicated
+        # share of the file whatever the sampling rate
+        duplicated = round(loc * matched / sampled) if sampled else 0
+        self.duplicated_lines += duplicated
+        return duplicated
+
+    @property
+    def duplication_ratio(self) -> float:
+        if not self.total_loc:
+            return 0.0
+        return round(min(1.0, self.duplicated_lines / self.total_loc), 4)
+
+    def clones(self) -> List[CodeClone]:
+        """Largest clone pairs found, longest first"""
+        return [
+            CodeClone(
+                file_a=self._files[file_a], start_a=start_a, end_a=end_a,
+                file_b=self._files[file_b], start_b=start_b, end_b=end_b,
+                lines=lines
+            )
+            for lines, _, file_a, start_a, end_a, file_b, start_b, end_b
+            in sorted(self._clones, reverse=True)
+        ]
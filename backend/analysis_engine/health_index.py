@@ -40,10 +40,107 @@
         
 #         # Ensure score is between 0 and 100
 #         return max(0.0, min(100.0, round(score, 2)))
-from typing import List
+from typing import Iterable, List, Optional
 from models.analysis import FileMetrics, CodeSmell, Hotspot
 
 
+def _number(value, default=0):
+    if isinstance(value, (int, float)):
+        return value
+    return default
+
+
+class HealthAccumulator:
+    """Partial aggregates the health index is computed from.
+
+    Filled per file (or per chunk of files) and merged associatively, so
+    parallel workers, streaming, incremental and distributed analyses can
+    score a project without keeping every smell in memory.
+    """
+
+    __slots__ = ("files", "total_loc", "complexity_sum", "max_nesting",
+                 "high", "medium", "low", "duplicated_lines")
+
+    def __init__(self, files: int = 0, total_loc: int = 0, complexity_sum: float = 0.0,
+                 max_nesting: int = 0, high: int = 0, medium: int = 0, low: int = 0,
+                 duplicated_lines: int = 0):
+        self.files = files
+        self.total_loc = total_loc
+        self.complexity_sum = complexity_sum
+        self.max_nesting = max_nesting
+        self.high = high
+        self.medium = medium
+        self.low = low
+        self.duplicated_lines = duplicated_lines
+
+    @classmethod
+    def from_results(cls, files: Iterable[FileMetrics], smells: Iterable[CodeSmell]) -> "HealthAccumulator":
+        accumulator = cls()
+        for file_metrics in files:
+            accumulator.add_file(file_metrics)
+        accumulator.add_smells(smells)
+        return accumulator
+
+    def add_file(self, file_metrics: FileMetrics):
+        if getattr(file_metrics, "error", None):
+            # Failed files would only drag the averages towards 0
+            return
+        self.files += 1
+        self.total_loc += _number(getattr(file_metrics, "loc", 0))
+        self.complexity_sum += _number(getattr(file_metrics, "complexity", 0))
+        self.max_nesting = max(self.max_nesting, _number(getattr(file_metrics, "nesting_depth", 0)))
+        self.duplicated_lines += _number(getattr(file_metrics, "duplicated_lines", 0))
+
+    def add_smells(self, smells: Iterable[CodeSmell]):
+        for smell in smells:
+            severity = getattr(smell, "severity", "")
+            if severity == "high":
+                self.high += 1
+            elif severity == "medium":
+                self.medium += 1
+            elif severity == "low":
+                self.low += 1
+
+    def add(self, file_metrics: FileMetrics, smells: Iterable[CodeSmell]):
+        self.add_file(file_metrics)
+        self.add_smells(smells)
+
+    def merge(self, other: "HealthAccumulator") -> "HealthAccumulator":
+        return HealthAccumulator(
+            files=self.files + other.files,
+            total_loc=self.total_loc + other.total_loc,
+            complexity_sum=self.complexity_sum + other.complexity_sum,
+            max_nesting=max(self.max_nesting, other.max_nesting),
+            high=self.high + other.high,
+            medium=self.medium + other.medium,
+            low=self.low + other.low,
+            duplicated_lines=self.duplicated_lines + other.duplicated_lines
+        )
+
+    __add__ = merge
+
+    def update(self, other: "HealthAccumulator"):
+        """In-place merge"""
+        self.files += other.files
+        self.total_loc += other.total_loc
+        self.complexity_sum += other.complexity_sum
+        self.max_nesting = max(self.max_nesting, other.max_nesting)
+        self.high += other.high
+        self.medium += other.medium
+        self.low += other.low
+        self.duplicated_lines += other.duplicated_lines
+
+    @property
+    def avg_complexity(self) -> float:
+        return self.complexity_sum / self.files if self.files else 0.0
+
+    @property
+    def duplication_ratio(self) -> float:
+        if not self.total_loc:
+            return 0.0
+        return round(min(1.0, self.duplicated_lines / self.total_loc), 4)
+
+
 class HealthIndexCalculator:
     """Calculate Code Health Index (0-100)"""
 
@@ -53,18 +150,37 @@ class HealthIndexCalculator:
         return []
 
     def _safe_number(self, value, default=0):
-        if isinstance(value, (int, float)):
-            return value
-        return default
+        return _number(value, default)
+
+    def score(self, accumulator: HealthAccumulator) -> float:
+        """Health index from merged partial aggregates"""
+        return self._score(
+            accumulator.avg_complexity, accumulator.total_loc, accumulator.max_nesting,
+            accumulator.high, accumulator.medium, accumulator.low,
+            accumulator.duplication_ratio
+        )
 
     def calculate(self, files: List[FileMetrics], smells: List[CodeSmell],
-                  total_loc: int, avg_complexity: float) -> float:
+                  total_loc: Optional[int] = None, avg_complexity: Optional[float] = None,
+                  duplication_ratio: Optional[float] = None) -> float:
+        """Health index from complete result lists.
 
-        # Safety conversions
-        files = self._safe_list(files)
-        smells = self._safe_list(smells)
-        total_loc = self._safe_number(total_loc)
-        avg_complexity = self._safe_number(avg_complexity)
+        Totals passed by the caller take precedence over the ones
+        accumulated from files.
+        """
+        accumulator = HealthAccumulator.from_results(self._safe_list(files), self._safe_list(smells))
+
+        return self._score(
+            accumulator.avg_complexity if avg_complexity is None else self._safe_number(avg_complexity),
+            accumulator.total_loc if total_loc is None else self._safe_number(total_loc),
+            accumulator.max_nesting,
+            accumulator.high, accumulator.medium, accumulator.low,
+            accumulator.duplication_ratio if duplication_ratio is None else self._safe_number(duplication_ratio)
+        )
+
+    def _score(self, avg_complexity: float, total_loc: int, max_nesting: int,
+               high_severity: int, medium_severity: int, low_severity: int,
+               duplication_ratio: float) -> float:
 
         score = 100.0
 
@@ -74,10 +190,6 @@ class HealthIndexCalculator:
             score -= complexity_penalty
 
         # Smell penalties
-        high_severity = len([s for s in smells if getattr(s, "severity", "") == "high"])
-        medium_severity = len([s for s in smells if getattr(s, "severity", "") == "medium"])
-        low_severity = len([s for s in smells if getattr(s, "severity", "") == "low"])
-
         smell_penalty = min(
             (high_severity * 5) + (medium_severity * 3) + (low_severity * 1),
             40
@@ -90,11 +202,13 @@ class HealthIndexCalculator:
             score -= size_penalty
 
         # Nesting penalty
-        nesting_values = [getattr(f, "nesting_depth", 0) for f in files]
-        max_nesting = max(nesting_values) if nesting_values else 0
-
         if max_nesting > 4:
             nesting_penalty = min((max_nesting - 4) * 3, 15)
             score -= nesting_penalty
 
+        # Duplication penalty (ignores the first 3% of duplicated code)
+        if duplication_ratio > 0.03:
+            duplication_penalty = min((duplication_ratio - 0.03) * 50, 15)
+            score -= duplication_penalty
+
         return max(0.0, min(100.0, round(score, 2)))
@@ -39,7 +39,13 @@
 #         hotspots.sort(key=lambda x: x.risk_score, reverse=True)
         
 #         return hotspots
-from typing import List
+import heapq
+from collections import Counter
+from operator import attrgetter
+from typing import List, Optional
+
+import numpy as np
+
 from models.analysis import Hotspot, FileMetrics, CodeSmell
 
 
@@ -56,51 +62,84 @@ class HotspotDetector:
             return value
         return default
 
-    def detect(self, files: List[FileMetrics], smells: List[CodeSmell]) -> List[Hotspot]:
-        hotspots = []
-
+    def _column(self, files: List[FileMetrics], attr: str) -> np.ndarray:
+        return np.fromiter(
+            (self._safe_number(getattr(f, attr, 0)) for f in files),
+            dtype=np.float64, count=len(files)
+        )
+
+    @staticmethod
+    def _priority(risk_score: float) -> str:
+        if risk_score >= 70:
+            return "critical"
+        if risk_score >= 50:
+            return "high"
+        if risk_score >= 30:
+            return "medium"
+        return "low"
+
+    def detect(self, files: List[FileMetrics], smells: List[CodeSmell],
+               top_k: Optional[int] = None) -> List[Hotspot]:
+        """Score every file and return hotspots, highest risk first.
+
+        Smells are counted per file in one pass and the risk components are
+        computed as columns over all files at once, so the cost is linear in
+        files + smells. With top_k only the k riskiest files are selected
+        (with a heap) and turned into Hotspot objects.
+        """
         files = self._safe_list(files)
         smells = self._safe_list(smells)
+        if not files:
+            return []
+
+        filenames = [getattr(f, "filename", "unknown") for f in files]
+        try:
+            smell_counts = Counter(map(attrgetter("file"), smells))
+        except AttributeError:
+            smell_counts = Counter(getattr(s, "file", "") for s in smells)
+
+        try:
+            # Fast path: one attribute read per field, converted in bulk
+            columns = np.array(
+                [(f.complexity, f.loc, f.nesting_depth) for f in files], dtype=np.float64
+            )
+            complexity, loc, nesting = columns[:, 0], columns[:, 1], columns[:, 2]
+        except (AttributeError, TypeError, ValueError):
+            complexity = self._column(files, "complexity")
+            loc = self._column(files, "loc")
+            nesting = self._column(files, "nesting_depth")
+
+        smell_count = np.fromiter(
+            (smell_counts.get(name, 0) for name in filenames),
+            dtype=np.float64, count=len(filenames)
+        )
+
+        # Risk score components
+        risk = (
+            np.minimum(complexity / 20.0, 1.0) * 40
+            + np.minimum(smell_count / 5.0, 1.0) * 30
+            + np.minimum(loc / 500.0, 1.0) * 20
+            + np.minimum(nesting / 6.0, 1.0) * 10
+        )
+        # Priorities come from the exact score; rounding is for output and order
+        rounded = risk.round(2)
+
+        # Both orders are stable: ties keep the input order
+        if top_k is not None and top_k < len(files):
+            scores = rounded.tolist()
+            order = heapq.nlargest(max(0, top_k), range(len(scores)), key=scores.__getitem__)
+        else:
+            order = np.argsort(-rounded, kind="stable").tolist()
 
-        for file_metrics in files:
-
-            complexity = self._safe_number(getattr(file_metrics, "complexity", 0))
-            loc = self._safe_number(getattr(file_metrics, "loc", 0))
-            nesting = self._safe_number(getattr(file_metrics, "nesting_depth", 0))
-            filename = getattr(file_metrics, "filename", "unknown")
-
-            # Risk score components
-            complexity_score = min(complexity / 20.0, 1.0) * 40
-
-            smell_count = len([
-                s for s in smells
-                if getattr(s, "file", "") == filename
-            ])
-            smell_score = min(smell_count / 5.0, 1.0) * 30
-
-            size_score = min(loc / 500.0, 1.0) * 20
-            nesting_score = min(nesting / 6.0, 1.0) * 10
-
-            risk_score = complexity_score + smell_score + size_score + nesting_score
-
-            # Priority
-            if risk_score >= 70:
-                priority = "critical"
-            elif risk_score >= 50:
-                priority = "high"
-            elif risk_score >= 30:
-                priority = "medium"
-            else:
-                priority = "low"
-
-            hotspots.append(Hotspot(
-                file=filename,
-                risk_score=round(risk_score, 2),
-                complexity=complexity,
-                smells_count=smell_count,
-                priority=priority
+        hotspots = []
+        for i in order:
+            # Fields are computed here from validated metrics; skip re-validation
+            hotspots.append(Hotspot.model_construct(
+                file=filenames[i],
+                risk_score=float(rounded[i]),
+                complexity=float(complexity[i]),
+                smells_count=int(smell_count[i]),
+                priority=self._priority(float(risk[i]))
             ))
 
-        hotspots.sort(key=lambda x: getattr(x, "risk_score", 0), reverse=True)
-
         return hotspots
@@ -0,0 +1,160 @@
+import tempfile
+import zipfile
+from typing import BinaryIO, Iterator, Tuple
+
+
+ALLOWED_EXT = (
+    '.py', '.js', '.ts', '.java', '.cpp', '.c', '.go', '.rs', '.sql', '.sh'
+)
+
+IGNORE_FOLDERS = (
+    'node_modules', 'venv', '__pycache__', '.git', 'dist', 'build'
+)
+
+READ_CHUNK = 1024 * 1024
+
+# Small entries can legitimately compress very well; only apply the ratio
+# check once an entry has expanded past this size
+RATIO_CHECK_FLOOR = 1024 * 1024
+
+
+class IngestError(ValueError):
+    """Raised when an upload cannot be ingested"""
+
+
+class IngestLimitExceeded(IngestError):
+    """Raised when an upload exceeds the configured ingest limits"""
+
+
+class IngestLimits:
+    """Limits enforced while an upload is spooled and unpacked"""
+
+    def __init__(self, max_upload_bytes: int = 512 * 1024 * 1024,
+                 max_uncompressed_bytes: int = 2 * 1024 * 1024 * 1024,
+                 max_entries: int = 200000,
+                 max_compression_ratio: float = 100.0,
+                 max_file_bytes: int = 10 * 1024 * 1024):
+        self.max_upload_bytes = max_upload_bytes
+        self.max_uncompressed_bytes = max_uncompressed_bytes
+        self.max_entries = max_entries
+        self.max_compression_ratio = max_compression_ratio
+        self.max_file_bytes = max_file_bytes
+
+
+def decode_source(raw: bytes) -> str:
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return str(raw)
+
+
+def is_source_entry(filename: str) -> bool:
+    # Skip folders
+    if filename.endswith('/'):
+        return False
+
+    # Skip heavy folders
+    lowered = filename.lower()
+    if any(x in lowered for x in IGNORE_FOLDERS):
+        return False
+
+    # Allow only source code files
+    return lowered.endswith(ALLOWED_EXT)
+
+
+async def spool_upload(upload, limits: IngestLimits) -> BinaryIO:
+    """Copy an upload to an anonymous temp file in bounded chunks"""
+    spool = tempfile.TemporaryFile()
+    total = 0
+    try:
+        while True:
+            chunk = await upload.read(READ_CHUNK)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > limits.max_upload_bytes:
+                raise IngestLimitExceeded(f"Upload exceeds {limits.max_upload_bytes} bytes")
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+    return spool
+
+
+def _read_entry(zf: zipfile.ZipFile, info: zipfile.ZipInfo, limits: IngestLimits,
+                budget: int) -> Tuple[bytes, int]:
+    """Decompress one entry, checking real (not declared) sizes as we go.
+
+    Returns the content and the number of bytes decompressed.
+    """
+    parts = []
+    size = 0
+    ratio_base = max(info.compress_size, 1)
+
+    with zf.open(info) as entry:
+        while True:
+            chunk = entry.read(READ_CHUNK)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > budget:
+                raise IngestLimitExceeded(f"Archive expands beyond {limits.max_uncompressed_bytes} bytes")
+            if size > RATIO_CHECK_FLOOR and size / ratio_base > limits.max_compression_ratio:
+                raise IngestLimitExceeded(
+                    f"{info.filename}: compression ratio exceeds {limits.max_compression_ratio}"
+                )
+            if size > limits.max_file_bytes:
+                # Oversized (usually generated) source files are skipped
+                return b"", size
+            parts.append(chunk)
+
+    return b"".join(parts), size
+
+
+def count_zip_sources(fileobj: BinaryIO) -> int:
+    """Count the source entries of a ZIP archive from its central directory"""
+    try:
+        with zipfile.ZipFile(fileobj) as zf:
+            return len({info.filename for info in zf.infolist() if is_source_entry(info.filename)})
+    except zipfile.BadZipFile as e:
+        raise IngestError(f"Invalid ZIP archive: {str(e)}")
+
+
+def iter_zip_sources(fileobj: BinaryIO, limits: IngestLimits) -> Iterator[Tuple[str, str]]:
+    """Lazily yield (filename, code) for the source files in a ZIP archive.
+
+    Entries are decompressed one at a time, so memory stays bounded by the
+    largest single file rather than the archive. Limits on entry count,
+    total uncompressed size and per-entry compression ratio are enforced
+    while streaming and raise IngestLimitExceeded. When a name appears more
+    than once, only its first entry is read.
+    """
+    try:
+        zf = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as e:
+        raise IngestError(f"Invalid ZIP archive: {str(e)}")
+
+    with zf:
+        entries = zf.infolist()
+        if len(entries) > limits.max_entries:
+            raise IngestLimitExceeded(f"Archive has more than {limits.max_entries} entries")
+
+        remaining = limits.max_uncompressed_bytes
+        seen = set()
+        for info in entries:
+            if not is_source_entry(info.filename) or info.filename in seen:
+                continue
+            seen.add(info.filename)
+
+            try:
+                raw, size = _read_entry(zf, info, limits, remaining)
+            except IngestError:
+                raise
+            except Exception:
+                continue
+
+            remaining -= size
+            if raw:
+                yield info.filename, decode_source(raw)
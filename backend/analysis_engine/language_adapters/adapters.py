@@ -120,80 +120,221 @@
 #             "nesting_depth": 0
 #         }
 
+import re
+
+from models.analysis import FunctionMetrics
+from analysis_engine.language_adapters.python_ast import analyze_python
+from analysis_engine.language_adapters.clike import CLikeScanner, CPP, GO, JAVA, JAVASCRIPT, RUST
+
+
+# Decision keywords for complexity. The lookahead lets one findall() count
+# every keyword occurrence on a line, including overlaps such as "elif "/"if ".
+DECISION_RE = re.compile(
+    r"(?=(if |elif |for |while |and |or |except |case |catch |&&|\|\|))"
+)
+PARAMS_RE = re.compile(r"(?:def|function)\s+(\w+)\s*\((.*?)\)")
+SPAN_NAME_RE = re.compile(r"^(?:def|function|class)\s+(\w+)")
+
+
+def _span_name(stripped):
+    match = SPAN_NAME_RE.match(stripped)
+    return match.group(1) if match else stripped
+
+
+def function_metrics(function_spans):
+    """Compact per-function records built from an adapter's function spans"""
+    return [
+        FunctionMetrics(
+            span["name"], span["start"], span["end"], span.get("complexity", 1),
+            span.get("nesting", 0), span.get("params", 0),
+            span.get("loc", span["end"] - span["start"] + 1)
+        )
+        for span in function_spans
+    ]
+
+
 class BaseAdapter:
+    """Line-based scanner shared by every language without a dedicated parser.
+
+    A single pass over the source produces everything the metrics and smell
+    stages need (LOC, function/class spans, decision points, nesting depth and
+    parameter counts), so those stages never have to re-split or re-scan it.
+    """
+
     def analyze(self, code=None):
         if code is None:
             code = ""
         if not isinstance(code, str):
             code = str(code)
 
-        lines = code.splitlines()
+        lines = code.split('\n')
 
         functions = []
         classes = []
+        function_spans = []
+        class_spans = []
+        parameters = []
 
-        # Decision keywords for complexity
-        keywords = [
-            "if ", "elif ", "for ", "while ",
-            "and ", "or ", "except ", "case ",
-            "catch ", "&&", "||"
-        ]
+        # Open function/class spans as (indent, span) pairs
+        open_spans = []
+        last_code_line = 0
 
         complexity = 1
-
         max_indent = 0
+        loc = 0
+        in_multiline_comment = False
 
-        for line in lines:
+        for lineno, line in enumerate(lines, 1):
             stripped = line.strip()
 
+            # Approximate nesting depth (indent based)
+            spaces = len(line) - len(line.lstrip(' '))
+            indent_level = spaces // 4
+            if indent_level > max_indent:
+                max_indent = indent_level
+
+            if not stripped:
+                continue
+
+            # Lines of code (blank lines, comments and docstrings excluded)
+            is_code = False
+            if '"""' in stripped or "'''" in stripped:
+                in_multiline_comment = not in_multiline_comment
+            elif not in_multiline_comment and not stripped.startswith(('#', '//')):
+                is_code = True
+                loc += 1
+
+            # Close spans whose body ended above this line
+            while open_spans and spaces <= open_spans[-1][0]:
+                open_spans.pop()[1]["end"] = last_code_line
+
             # Detect functions
+            new_function = None
             if stripped.startswith("def ") or stripped.startswith("function "):
                 functions.append(stripped)
+                new_function = {
+                    "name": _span_name(stripped), "start": lineno, "end": lineno,
+                    "params": 0, "complexity": 1, "nesting": 0, "loc": 0
+                }
+                function_spans.append(new_function)
+                open_spans.append((spaces, new_function))
 
             # Detect classes
             if stripped.startswith("class "):
                 classes.append(stripped)
+                span = {"name": _span_name(stripped), "start": lineno, "end": lineno}
+                class_spans.append(span)
+                open_spans.append((spaces, span))
+
+            # Parameter counts for every signature on the line
+            if "def" in stripped or "function" in stripped:
+                for match in PARAMS_RE.finditer(stripped):
+                    param_str = match.group(2)
+                    if param_str:
+                        count = len([p for p in param_str.split(',') if p.strip()])
+                        parameters.append({
+                            "name": match.group(1),
+                            "line": lineno,
+                            "count": count
+                        })
+                        if new_function is not None and match.group(1) == new_function["name"]:
+                            new_function["params"] = count
 
             # Increase complexity for decision keywords
-            for keyword in keywords:
-                complexity += stripped.count(keyword)
-
-            # Approximate nesting depth (indent based)
-            spaces = len(line) - len(line.lstrip(' '))
-            indent_level = spaces // 4
-            if indent_level > max_indent:
-                max_indent = indent_level
+            decisions = len(DECISION_RE.findall(stripped))
+            complexity += decisions
+
+            # Attribute the line to the innermost enclosing function
+            for indent, span in reversed(open_spans):
+                if "loc" in span:
+                    span["complexity"] += decisions
+                    if span is not new_function:
+                        span["nesting"] = max(span["nesting"], (spaces - indent) // 4 - 1)
+                    break
+            if is_code:
+                for _, span in open_spans:
+                    if "loc" in span:
+                        span["loc"] += 1
+
+            last_code_line = lineno
+
+        for _, span in open_spans:
+            span["end"] = last_code_line
 
         return {
             "functions": functions,
             "classes": classes,
             "complexity": complexity,
-            "nesting_depth": max_indent
+            "nesting_depth": max_indent,
+            "loc": loc,
+            "line_count": len(lines),
+            "function_spans": function_spans,
+            "class_spans": class_spans,
+            "parameters": parameters,
+            "function_metrics": function_metrics(function_spans)
         }
 
 
 class PythonAdapter(BaseAdapter):
-    pass
+    """AST-based analysis with real per-function complexity and nesting.
 
+    Falls back to the line scanner for code that does not parse (Python 2
+    sources, syntax errors, pathologically deep nesting).
+    """
 
-class JavaScriptAdapter(BaseAdapter):
-    pass
+    def analyze(self, code=None):
+        if code is None:
+            code = ""
+        if not isinstance(code, str):
+            code = str(code)
 
+        try:
+            result = analyze_python(code)
+        except (SyntaxError, ValueError, RecursionError):
+            return super().analyze(code)
 
-class CppAdapter(BaseAdapter):
-    pass
+        result["function_metrics"] = function_metrics(result["function_spans"])
+        return result
 
 
-class JavaAdapter(BaseAdapter):
-    pass
+class CLikeAdapter(BaseAdapter):
+    """Lexer-based analysis for C-family languages.
 
+    Comments, strings and template literals are skipped as whole tokens and
+    functions are found from their declarations, not from indentation.
+    """
 
-class GoAdapter(BaseAdapter):
-    pass
+    language = None
+
+    def analyze(self, code=None):
+        if code is None:
+            code = ""
+        if not isinstance(code, str):
+            code = str(code)
 
+        result = CLikeScanner(self.language).scan(code)
+        result["function_metrics"] = function_metrics(result["function_spans"])
+        return result
 
-class RustAdapter(BaseAdapter):
-    pass
+
+class JavaScriptAdapter(CLikeAdapter):
+    language = JAVASCRIPT
+
+
+class CppAdapter(CLikeAdapter):
+    language = CPP
+
+
+class JavaAdapter(CLikeAdapter):
+    language = JAVA
+
+
+class GoAdapter(CLikeAdapter):
+    language = GO
+
+
+class RustAdapter(CLikeAdapter):
+    language = RUST
 
 
 class SqlAdapter(BaseAdapter):
@@ -0,0 +1,469 @@
+import re
+from typing import Any, Dict, FrozenSet, List, Optional
+
+
+class CLikeLanguage:
+    """Keyword and declaration tables plugged into the C-family scanner"""
+
+    def __init__(self, name: str,
+                 decision_keywords: FrozenSet[str],
+                 decision_operators: FrozenSet[str],
+                 control_keywords: FrozenSet[str],
+                 class_keywords: FrozenSet[str],
+                 function_keywords: FrozenSet[str] = frozenset(),
+                 lambda_arrow: Optional[str] = None,
+                 method_declarations: bool = True,
+                 single_quote: str = "char",
+                 backtick_strings: bool = False,
+                 preprocessor: bool = False,
+                 raw_strings: Optional[str] = None,
+                 regex_literals: bool = False,
+                 generics: bool = True):
+        self.name = name
+        self.decision_keywords = decision_keywords
+        self.decision_operators = decision_operators
+        self.control_keywords = control_keywords
+        self.class_keywords = class_keywords
+        # Keywords introducing a function ("function", "func", "fn")
+        self.function_keywords = function_keywords
+        # Token that turns the preceding parameter list into a lambda body
+        self.lambda_arrow = lambda_arrow
+        # Whether `name(params) ... {` declares a function (C, C++, Java, JS methods)
+        self.method_declarations = method_declarations
+        self.generics = generics
+        self.token_re = _build_token_re(single_quote, backtick_strings, preprocessor, raw_strings)
+        self.regex_literals = regex_literals
+
+
+def _build_token_re(single_quote: str, backtick_strings: bool, preprocessor: bool,
+                    raw_strings: Optional[str]):
+    parts = [
+        r"(?P<nl>\n)",
+        # Any whitespace but \n, including Unicode spaces such as U+00A0
+        r"(?P<ws>[^\S\n]+)",
+        r"(?P<comment>//[^\n]*|/\*[\s\S]*?(?:\*/|\Z))",
+    ]
+    if preprocessor:
+        parts.append(r"(?P<pre>\#(?:\\\n|[^\n])*)")
+    if raw_strings == "cpp":
+        parts.append(r'(?P<mstr>(?:u8|[uUL])?R"(?P<delim>[^()\\\s]{0,16})\([\s\S]*?(?:\)(?P=delim)"|\Z))')
+    elif raw_strings == "rust":
+        parts.append(r'(?P<mstr>b?r(?P<hashes>\#*)"[\s\S]*?(?:"(?P=hashes)|\Z))')
+    if backtick_strings:
+        parts.append(r"(?P<mstr2>`(?:\\[\s\S]|[^\\`])*(?:`|\Z))")
+    parts.append(r'(?P<str>"(?:\\.|[^"\\\n])*"?)')
+    if single_quote == "string":
+        parts.append(r"(?P<str2>'(?:\\.|[^'\\\n])*'?)")
+    elif single_quote == "char":
+        parts.append(r"(?P<str2>'(?:\\.|[^'\\\n])*')")
+    else:
+        # Rust: 'x' is a char literal but 'a on its own is a lifetime
+        parts.append(r"(?P<str2>'(?:\\.|[^'\\\n])')")
+    parts += [
+        # Unicode letters are valid in identifiers (Java, JS, Go, Rust)
+        r"(?P<id>(?:[^\W\d]|\$)[\w$]*)",
+        r"(?P<num>\d[\w.]*)",
+        r"(?P<op>&&|\|\||=>|->|::|\?\?=?|\?\.|>>|[^\s\w])",
+        # Never reached by the groups above, but it guarantees a match
+        r"(?P<other>[\s\S])",
+    ]
+    return re.compile("|".join(parts))
+
+
+REGEX_LITERAL_RE = re.compile(r"/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n])+/[A-Za-z]*")
+
+# Tokens after which a "/" starts a regular expression rather than a division
+REGEX_PRECEDERS = frozenset(
+    "( , = : [ ! & | ? { } ; + - * % < > ~ ^ && || => return typeof instanceof in of "
+    "new delete void throw case do else yield await".split()
+)
+
+# Identifiers that can precede a parenthesized group without naming a function
+NOT_FUNCTION_NAMES = frozenset(
+    "if for while switch catch return sizeof typeof new delete throw else do case "
+    "synchronized using decltype alignof alignas defined await yield function super this "
+    "noexcept static_assert assert".split()
+)
+
+MULTILINE_GROUPS = frozenset(["nl", "comment", "pre", "mstr", "mstr2"])
+
+
+class _Frame:
+    """One open (, [ or { with the tokens of the statement being read inside it"""
+
+    __slots__ = ("kind", "tokens", "first_line", "first_loc", "commas", "angle",
+                 "level", "func", "record", "loc_start")
+
+    def __init__(self, kind: str, level: int = 0, func: Optional[Dict] = None):
+        self.kind = kind
+        self.tokens: List[tuple] = []
+        self.first_line = 0
+        self.first_loc = 0
+        self.commas = 0
+        self.angle = 0
+        self.level = level
+        self.func = func
+        self.record: Optional[Dict] = None
+        self.loc_start = 0
+
+
+MAX_STATEMENT_TOKENS = 64
+
+
+class CLikeScanner:
+    """Hand-written lexer for C-style syntax, linear in the size of the source.
+
+    One pass tokenizes the source (strings, templates, chars and comments
+    are single tokens, so keywords inside them are never counted) and
+    tracks a stack of open brackets. Each bracket frame keeps the tokens of
+    the statement currently being read; when a `{` opens, those tokens tell
+    whether it starts a function, a class-like body, a control block or
+    something else (object literal, initializer, ...).
+
+    Nesting depth counts control blocks enclosing a statement, relative to
+    its function body. Complexity counts decision keywords and operators,
+    attributed to the innermost function and to the file.
+    """
+
+    def __init__(self, language: CLikeLanguage):
+        self.lang = language
+
+    def scan(self, code: str) -> Dict[str, Any]:
+        lang = self.lang
+        token_re = lang.token_re
+        decision_keywords = lang.decision_keywords
+        decision_operators = lang.decision_operators
+
+        functions: List[Dict[str, Any]] = []
+        classes: List[Dict[str, Any]] = []
+
+        complexity = 1
+        max_level = 0
+        line = 1
+        loc = 0
+        last_code_line = 0
+        prev = None  # previous significant token text
+
+        root = _Frame("{")
+        stack = [root]
+        frame = root
+
+        pos = 0
+        length = len(code)
+        while pos < length:
+            if (lang.regex_literals and code[pos] == "/" and prev in REGEX_PRECEDERS
+                    and not code.startswith(("//", "/*"), pos)):
+                match = REGEX_LITERAL_RE.match(code, pos)
+                if match:
+                    if line != last_code_line:
+                        loc += 1
+                        last_code_line = line
+                    frame.tokens.append(("str", ""))
+                    prev = "regex"
+                    pos = match.end()
+                    continue
+
+            match = token_re.match(code, pos)
+            kind = match.lastgroup
+            text = match.group(kind)
+            pos = match.end()
+
+            if kind == "ws":
+                continue
+            token_line = line
+            if kind in MULTILINE_GROUPS:
+                newlines = text.count("\n")
+                if kind == "nl" or kind == "comment":
+                    line += newlines
+                    continue
+                # Preprocessor lines and multi-line strings are code on every line they span
+                if line != last_code_line:
+                    loc += 1
+                loc += newlines
+                line += newlines
+                last_code_line = line
+                if kind == "pre":
+                    continue
+                kind = "str"
+            elif line != last_code_line:
+                loc += 1
+                last_code_line = line
+
+            tokens = frame.tokens
+            if not tokens:
+                frame.first_line = token_line
+                # LOC before this line, so a function's own first line counts
+                frame.first_loc = loc - 1 - (line - token_line)
+
+            if kind == "id":
+                if text in decision_keywords:
+                    complexity += 1
+                    if frame.func is not None:
+                        frame.func["complexity"] += 1
+                tokens.append(("id", text))
+
+            elif kind == "op":
+                if text in decision_operators:
+                    if text != "?" or code[pos:pos + 1] not in (":", ")", ",", "."):
+                        complexity += 1
+                        if frame.func is not None:
+                            frame.func["complexity"] += 1
+
+                if text == "(" or text == "[":
+                    child = _Frame(text, frame.level, frame.func)
+                    stack.append(child)
+                    frame = child
+                elif text == ")" or text == "]":
+                    if len(stack) > 1 and frame.kind != "{":
+                        closed = stack.pop()
+                        frame = stack[-1]
+                        if closed.kind == "(":
+                            frame.tokens.append(("group", _param_count(closed)))
+                        else:
+                            frame.tokens.append(("bracket", ""))
+                elif text == "{":
+                    record, block, level = self._open_block(frame, line, functions, classes)
+                    child = _Frame("{", level, record if block == "function" else frame.func)
+                    child.record = record
+                    if block == "function":
+                        child.loc_start = frame.first_loc
+                    if level > max_level:
+                        max_level = level
+                    if child.func is not None and level > child.func["nesting"]:
+                        child.func["nesting"] = level
+                    stack.append(child)
+                    frame = child
+                elif text == "}":
+                    # Close any ( or [ left open by malformed code
+                    while len(stack) > 1 and stack[-1].kind != "{":
+                        stack.pop()
+                    if len(stack) > 1:
+                        closed = stack.pop()
+                        frame = stack[-1]
+                        self._close(closed, line, loc)
+                        if frame.kind == "{":
+                            frame.tokens = []
+                        else:
+                            frame.tokens.append(("block", ""))
+                    else:
+                        frame = root
+                        frame.tokens = []
+                elif text == ";":
+                    if frame.kind == "{" and not (lang.name == "go" and tokens and tokens[0][1] == "for"):
+                        frame.tokens = []
+                elif text == ",":
+                    if frame.angle == 0:
+                        frame.commas += 1
+                    tokens.append(("op", text))
+                elif text == "<" and lang.generics and prev is not None and prev[:1].isalpha():
+                    frame.angle += 1
+                    tokens.append(("op", text))
+                elif (text == ">" or text == ">>") and frame.angle:
+                    frame.angle = max(0, frame.angle - len(text))
+                    tokens.append(("op", text))
+                else:
+                    tokens.append(("op", text))
+            else:
+                tokens.append((kind, text))
+
+            if len(tokens) > MAX_STATEMENT_TOKENS:
+                # Keep the head (control keyword) and the tail (declaration)
+                del tokens[8:len(tokens) - MAX_STATEMENT_TOKENS // 2]
+
+            prev = text
+
+        # Unterminated bodies end at the last line
+        for open_frame in stack[1:]:
+            self._close(open_frame, line, loc)
+
+        return {
+            "functions": [f["name"] for f in functions],
+            "classes": [c["name"] for c in classes],
+            "complexity": complexity,
+            "nesting_depth": max_level,
+            "loc": loc,
+            "line_count": code.count("\n") + 1,
+            "function_spans": functions,
+            "class_spans": classes,
+            "parameters": [
+                {"name": f["name"], "line": f["start"], "count": f["params"]}
+                for f in functions
+            ]
+        }
+
+    @staticmethod
+    def _close(frame: _Frame, line: int, loc: int):
+        record = frame.record
+        if record is None:
+            return
+        record["end"] = line
+        if "loc" in record:
+            record["loc"] = loc - frame.loc_start
+
+    def _open_block(self, frame: _Frame, line: int, functions: List[Dict], classes: List[Dict]):
+        """Classify the `{` ending the frame's current statement.
+
+        Returns (record, kind, nesting level of the new block).
+        """
+        lang = self.lang
+        tokens = frame.tokens
+        start = frame.first_line or line
+
+        if tokens:
+            if tokens[0][1] in lang.control_keywords:
+                return None, "control", frame.level + 1
+
+            declaration = self._function_declaration(tokens)
+            if declaration is not None:
+                name, params = declaration
+                record = {
+                    "name": name,
+                    "start": start,
+                    "end": line,
+                    "params": params,
+                    "complexity": 1,
+                    "nesting": 0,
+                    "loc": 0
+                }
+                functions.append(record)
+                return record, "function", 0
+
+            for index, (kind, text) in enumerate(tokens):
+                if kind == "id" and text in lang.class_keywords:
+                    name = text
+                    for next_kind, next_text in tokens[index + 1:]:
+                        if next_kind == "id":
+                            name = next_text
+                            break
+                    if lang.name == "go" and index > 0 and tokens[index - 1][0] == "id":
+                        # type Name struct {
+                        name = tokens[index - 1][1]
+                    record = {"name": name, "start": start, "end": line}
+                    classes.append(record)
+                    return record, "class", frame.level
+
+        return None, "other", frame.level
+
+    def _function_declaration(self, tokens: List[tuple]):
+        """Return (name, params) if the statement tokens declare a function"""
+        lang = self.lang
+        count = len(tokens)
+
+        # Lambda / arrow function: `(a, b) => {` or `x -> {`
+        if lang.lambda_arrow and tokens[-1][1] == lang.lambda_arrow and count >= 2:
+            before = tokens[-2]
+            params = before[1] if before[0] == "group" else 1
+            name = "<lambda>"
+            for index in range(count - 3, -1, -1):
+                kind, text = tokens[index]
+                if text in ("=", ":") and index > 0 and tokens[index - 1][0] == "id":
+                    name = tokens[index - 1][1]
+                    break
+            return name, params
+
+        # Keyword declarations: function f(...), func (r T) F(...), fn f<T>(...)
+        for index in range(count - 1, -1, -1):
+            kind, text = tokens[index]
+            if kind != "id" or text not in lang.function_keywords:
+                continue
+            rest = tokens[index + 1:]
+            if (len(rest) > 2 and rest[0][0] == "group" and rest[1][0] == "id"
+                    and rest[2][0] == "group"):
+                # Go method receiver
+                rest = rest[1:]
+            name = "<anonymous>"
+            for next_kind, next_text in rest:
+                if next_kind == "id" and name == "<anonymous>":
+                    name = next_text
+                elif next_kind == "group":
+                    return name, next_text
+            return name, 0
+
+        if not lang.method_declarations:
+            return None
+
+        # `name(params) qualifiers {` (C, C++, Java, JS/TS methods)
+        for index in range(1, count):
+            kind, params = tokens[index]
+            if kind != "group":
+                continue
+            name_kind, name = tokens[index - 1]
+            if name_kind != "id" or name in NOT_FUNCTION_NAMES:
+                continue
+            before = tokens[index - 2][1] if index >= 2 else None
+            if before in ("@", "new", "=", ".") or before in lang.control_keywords:
+                continue
+            return name, params
+
+        return None
+
+
+def _param_count(frame: _Frame) -> int:
+    tokens = frame.tokens
+    if not tokens:
+        return 0
+    if len(tokens) == 1 and tokens[0][1] == "void":
+        return 0
+    # A trailing comma does not add a parameter
+    trailing = 1 if tokens[-1][1] == "," else 0
+    return frame.commas + 1 - trailing
+
+
+C_DECISION_OPERATORS = frozenset(["&&", "||", "?"])
+
+JAVASCRIPT = CLikeLanguage(
+    "javascript",
+    decision_keywords=frozenset(["if", "for", "while", "case", "catch"]),
+    decision_operators=C_DECISION_OPERATORS,
+    control_keywords=frozenset(["if", "else", "for", "while", "do", "switch", "try", "catch", "finally", "with"]),
+    class_keywords=frozenset(["class", "interface", "enum", "namespace", "module"]),
+    function_keywords=frozenset(["function"]),
+    lambda_arrow="=>",
+    single_quote="string",
+    backtick_strings=True,
+    regex_literals=True
+)
+
+JAVA = CLikeLanguage(
+    "java",
+    decision_keywords=frozenset(["if", "for", "while", "case", "catch"]),
+    decision_operators=C_DECISION_OPERATORS,
+    control_keywords=frozenset(["if", "else", "for", "while", "do", "switch", "try", "catch", "finally", "synchronized"]),
+    class_keywords=frozenset(["class", "interface", "enum", "record"]),
+    lambda_arrow="->"
+)
+
+CPP = CLikeLanguage(
+    "cpp",
+    decision_keywords=frozenset(["if", "for", "while", "case", "catch"]),
+    decision_operators=C_DECISION_OPERATORS,
+    control_keywords=frozenset(["if", "else", "for", "while", "do", "switch", "try", "catch"]),
+    class_keywords=frozenset(["class", "struct", "union", "namespace", "enum"]),
+    preprocessor=True,
+    raw_strings="cpp"
+)
+
+GO = CLikeLanguage(
+    "go",
+    decision_keywords=frozenset(["if", "for", "case"]),
+    decision_operators=frozenset(["&&", "||"]),
+    control_keywords=frozenset(["if", "else", "for", "switch", "select"]),
+    class_keywords=frozenset(["struct", "interface"]),
+    function_keywords=frozenset(["func"]),
+    method_declarations=False,
+    backtick_strings=True,
+    generics=False
+)
+
+RUST = CLikeLanguage(
+    "rust",
+    decision_keywords=frozenset(["if", "for", "while"]),
+    # Every match arm is a branch
+    decision_operators=frozenset(["&&", "||", "=>"]),
+    control_keywords=frozenset(["if", "else", "for", "while", "loop", "match"]),
+    class_keywords=frozenset(["struct", "enum", "impl", "trait", "mod", "union"]),
+    function_keywords=frozenset(["fn"]),
+    method_declarations=False,
+    single_quote="rust",
+    raw_strings="rust"
+)
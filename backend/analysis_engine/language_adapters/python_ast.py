@@ -0,0 +1,219 @@
+import ast
+import warnings
+from typing import Any, Dict, List, Optional
+
+
+# Statements that open a nested block
+BLOCK_NODES = tuple(
+    getattr(ast, name) for name in (
+        "For", "AsyncFor", "While", "With", "AsyncWith", "Try", "TryStar", "Match"
+    )
+    if hasattr(ast, name)
+)
+
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+# Nodes that can never contain a decision point or a nested block; skipping
+# them (and the context/operator singletons) roughly halves the walk
+LEAF_NODES = frozenset(
+    [ast.Name, ast.Constant, ast.Pass, ast.Break, ast.Continue, ast.Global,
+     ast.Nonlocal, ast.Import, ast.ImportFrom, ast.alias]
+    + ast.expr_context.__subclasses__()
+    + ast.operator.__subclasses__()
+    + ast.cmpop.__subclasses__()
+    + ast.unaryop.__subclasses__()
+    + ast.boolop.__subclasses__()
+)
+
+
+class PythonScanner:
+    """Single walk over a Python AST collecting complexity, nesting and spans.
+
+    Cyclomatic complexity follows McCabe: each if/elif, loop, except
+    handler, match case, conditional expression, comprehension clause and
+    extra boolean operand adds one decision point. Decision points count
+    towards the innermost enclosing function and towards the file total.
+
+    Nesting depth counts the blocks (if/for/while/with/try/match) enclosing
+    a statement, relative to the body of its function; an elif chain stays
+    at the depth of its if.
+    """
+
+    def __init__(self):
+        self.functions: List[Dict[str, Any]] = []
+        self.classes: List[Dict[str, Any]] = []
+        self.complexity = 1
+        self.nesting_depth = 0
+        self.docstring_ranges = []
+
+    # ---------------- Helpers ----------------
+
+    def _decision(self, func: Optional[Dict], count: int = 1):
+        self.complexity += count
+        if func is not None:
+            func["complexity"] += count
+
+    def _enter_block(self, func: Optional[Dict], depth: int):
+        if depth > self.nesting_depth:
+            self.nesting_depth = depth
+        if func is not None and depth > func["nesting"]:
+            func["nesting"] = depth
+
+    def _docstring(self, node):
+        body = getattr(node, "body", None)
+        if not body:
+            return
+        first = body[0]
+        if (isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant)
+                and isinstance(first.value.value, str)):
+            self.docstring_ranges.append((first.lineno, first.end_lineno))
+
+    @staticmethod
+    def _param_count(node, in_class: bool) -> int:
+        args = node.args
+        names = [a.arg for a in args.posonlyargs + args.args]
+        count = len(names) + len(args.kwonlyargs)
+        if args.vararg:
+            count += 1
+        if args.kwarg:
+            count += 1
+        # The implicit receiver of a method is not a real parameter
+        if in_class and names and names[0] in ("self", "cls"):
+            count -= 1
+        return count
+
+    def _visit_all(self, nodes, depth: int, func: Optional[Dict], in_class: bool = False):
+        for node in nodes:
+            self._visit(node, depth, func, in_class)
+
+    def _visit_children(self, node, depth: int, func: Optional[Dict]):
+        for name in node._fields:
+            value = getattr(node, name, None)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST) and type(item) not in LEAF_NODES:
+                        self._visit(item, depth, func, False)
+            elif isinstance(value, ast.AST) and type(value) not in LEAF_NODES:
+                self._visit(value, depth, func, False)
+
+    # ---------------- Walk ----------------
+
+    def _visit(self, node, depth: int, func: Optional[Dict], in_class: bool):
+        if isinstance(node, FUNCTION_NODES):
+            record = {
+                "name": node.name,
+                "start": node.lineno,
+                "end": node.end_lineno,
+                "params": self._param_count(node, in_class),
+                "complexity": 1,
+                "nesting": 0
+            }
+            self.functions.append(record)
+            self._docstring(node)
+            # Decorators, defaults and annotations belong to the outer scope
+            self._visit_all(node.decorator_list, depth, func)
+            self._visit_children(node.args, depth, func)
+            if node.returns is not None:
+                self._visit(node.returns, depth, func, False)
+            self._visit_all(node.body, 0, record)
+
+        elif isinstance(node, ast.ClassDef):
+            self.classes.append({
+                "name": node.name,
+                "start": node.lineno,
+                "end": node.end_lineno
+            })
+            self._docstring(node)
+            self._visit_all(node.decorator_list, depth, func)
+            self._visit_all(node.bases, depth, func)
+            self._visit_all(node.keywords, depth, func)
+            self._visit_all(node.body, depth, func, in_class=True)
+
+        elif isinstance(node, ast.If):
+            self._decision(func)
+            self._visit(node.test, depth, func, False)
+            self._enter_block(func, depth + 1)
+            self._visit_all(node.body, depth + 1, func)
+            orelse = node.orelse
+            if len(orelse) == 1 and isinstance(orelse[0], ast.If):
+                # elif: same level as the if it continues
+                self._visit(orelse[0], depth, func, False)
+            elif orelse:
+                self._visit_all(orelse, depth + 1, func)
+
+        elif isinstance(node, BLOCK_NODES):
+            if isinstance(node, (ast.For, ast.AsyncFor, ast.While)):
+                self._decision(func)
+            self._enter_block(func, depth + 1)
+            for field, value in ast.iter_fields(node):
+                if isinstance(value, list) and value and isinstance(value[0], ast.AST):
+                    if field in ("body", "orelse", "finalbody", "handlers", "cases"):
+                        self._visit_all(value, depth + 1, func)
+                    else:
+                        self._visit_all(value, depth, func)
+                elif isinstance(value, ast.AST):
+                    self._visit(value, depth, func, False)
+
+        else:
+            if isinstance(node, (ast.ExceptHandler, ast.IfExp)):
+                self._decision(func)
+            elif isinstance(node, ast.BoolOp):
+                self._decision(func, len(node.values) - 1)
+            elif isinstance(node, ast.comprehension):
+                self._decision(func, 1 + len(node.ifs))
+            elif type(node).__name__ == "match_case":
+                self._decision(func)
+            self._visit_children(node, depth, func)
+
+    def scan(self, tree: ast.Module):
+        self._docstring(tree)
+        self._visit_all(tree.body, 0, None)
+        return self
+
+
+def analyze_python(code: str) -> Dict[str, Any]:
+    """Analyze Python source; raises SyntaxError/ValueError if it cannot be parsed"""
+    with warnings.catch_warnings():
+        # Invalid escape sequences etc. in analyzed code are not our concern
+        warnings.simplefilter("ignore")
+        tree = ast.parse(code)
+    scanner = PythonScanner().scan(tree)
+
+    # ast numbers lines the way the tokenizer splits them: on \n, \r\n and
+    # a lone \r (but not on the other separators str.splitlines() knows)
+    lines = code.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+
+    # Per-line code flags: blank lines, comments and docstrings excluded
+    is_code = [0] * (len(lines) + 1)
+    for lineno, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#'):
+            is_code[lineno] = 1
+    for start, end in scanner.docstring_ranges:
+        for lineno in range(start, end + 1):
+            is_code[lineno] = 0
+
+    # Prefix sums give each function's LOC in O(1)
+    prefix = [0] * len(is_code)
+    running = 0
+    for lineno, flag in enumerate(is_code):
+        running += flag
+        prefix[lineno] = running
+
+    for func in scanner.functions:
+        func["loc"] = prefix[func["end"]] - prefix[func["start"] - 1]
+
+    return {
+        "functions": [f["name"] for f in scanner.functions],
+        "classes": [c["name"] for c in scanner.classes],
+        "complexity": scanner.complexity,
+        "nesting_depth": scanner.nesting_depth,
+        "loc": running,
+        "line_count": len(lines),
+        "function_spans": scanner.functions,
+        "class_spans": scanner.classes,
+        "parameters": [
+            {"name": f["name"], "line": f["start"], "count": f["params"]}
+            for f in scanner.functions
+        ]
+    }
@@ -101,6 +101,8 @@
 from typing import Dict, Any, List
 import re
 
+from analysis_engine.duplication import CloneIndex, fingerprint
+
 
 class MetricsCalculator:
     """Calculate code metrics (safe version)"""
@@ -114,7 +116,11 @@ class MetricsCalculator:
         return code
 
     @staticmethod
-    def calculate_loc(code: str) -> int:
+    def calculate_loc(code: str, ast_data: Dict[str, Any] = None) -> int:
+        # Adapters already count LOC during their scan; reuse it when present
+        if isinstance(ast_data, dict) and isinstance(ast_data.get('loc'), int):
+            return ast_data['loc']
+
         code = MetricsCalculator._ensure_string(code)
 
         lines = code.split('\n')
@@ -194,18 +200,23 @@ class MetricsCalculator:
 
     @staticmethod
     def detect_duplication(files: List[Dict[str, Any]]) -> int:
+        """Number of lines duplicating code seen earlier in the list.
+
+        Files are fingerprinted one at a time into a bounded CloneIndex, so
+        memory does not grow with the total size of the input.
+        """
         if not isinstance(files, list):
             return 0
 
-        all_code = '\n'.join([str(f.get('code', '')) for f in files if isinstance(f, dict)])
-        lines = [l.strip() for l in all_code.split('\n') if l.strip()]
-
-        duplicates = 0
-        seen = set()
-        for line in lines:
-            if len(line) > 20:
-                if line in seen:
-                    duplicates += 1
-                seen.add(line)
-
-        return duplicates
+        index = CloneIndex()
+        for f in files:
+            if not isinstance(f, dict):
+                continue
+            code = MetricsCalculator._ensure_string(f.get('code', ''))
+            index.add(
+                str(f.get('filename', '')),
+                fingerprint(code, str(f.get('language', ''))),
+                MetricsCalculator.calculate_loc(code)
+            )
+
+        return index.duplicated_lines
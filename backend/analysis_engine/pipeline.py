@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from models.analysis import FileMetrics, CodeSmell
+from analysis_engine.language_adapters.adapters import get_adapter
+from analysis_engine.metrics_calculator import MetricsCalculator
+from analysis_engine.smell_detector import SmellDetector
+from analysis_engine.duplication import fingerprint
+from analysis_engine.health_index import HealthAccumulator
+
+logger = logging.getLogger(__name__)
+
+
+# Bump whenever adapter, metrics or smell rules change so cached results
+# computed by older rules are not reused
+ANALYZER_VERSION = "5"
+
+EXT_MAP = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.jsx': 'javascript',
+    '.ts': 'javascript',
+    '.tsx': 'javascript',
+    '.java': 'java',
+    '.cpp': 'cpp',
+    '.cc': 'cpp',
+    '.cxx': 'cpp',
+    '.c': 'cpp',
+    '.h': 'cpp',
+    '.hpp': 'cpp',
+    '.go': 'go',
+    '.rs': 'rust',
+    '.sql': 'sql',
+    '.sh': 'bash',
+    '.bash': 'bash'
+}
+
+
+def detect_language(filename: str) -> str:
+    """Detect programming language from file extension"""
+    ext = Path(filename).suffix.lower()
+    return EXT_MAP.get(ext, 'unknown')
+
+
+class FileAnalysis(NamedTuple):
+    """Per-file output of the analysis stage"""
+    metrics: FileMetrics
+    smells: List[CodeSmell]
+    # Winnowed clone fingerprints, consumed by the aggregate stage's CloneIndex
+    fingerprints: Optional[array] = None
+
+
+class BatchResult(NamedTuple):
+    """A worker's output for one chunk: per-file results and their health aggregates"""
+    analyses: List[FileAnalysis]
+    health: HealthAccumulator
+
+
+class FileStageStats:
+    """Counters collected while the per-file stage runs"""
+
+    def __init__(self):
+        self.files = 0
+        self.cache_hits = 0
+        # Health aggregates of every file yielded so far
+        self.health = HealthAccumulator()
+
+    @property
+    def cache_hit_rate(self) -> float:
+        if not self.files:
+            return 0.0
+        return round(self.cache_hits / self.files, 4)
+
+
+_metrics_calc = MetricsCalculator()
+_smell_detectors: Dict[int, SmellDetector] = {}
+
+
+def _get_smell_detector(complexity_threshold: int) -> SmellDetector:
+    detector = _smell_detectors.get(complexity_threshold)
+    if detector is None:
+        detector = SmellDetector(complexity_threshold=complexity_threshold)
+        _smell_detectors[complexity_threshold] = detector
+    return detector
+
+
+def analyze_file(filename: str, code: str, complexity_threshold: int = 10) -> Optional[FileAnalysis]:
+    """Run adapter, metrics and smell detection for one file.
+
+    Returns None for files in languages we cannot analyze. A file that
+    makes the analyzers fail comes back with `metrics.error` set instead of
+    failing the rest of its batch.
+    """
+    language = detect_language(filename)
+    if language == 'unknown':
+        return None
+
+    try:
+        return _analyze(filename, code, language, complexity_threshold)
+    except Exception as e:
+        logger.warning(f"Could not analyze {filename}: {type(e).__name__}: {str(e)}")
+        metrics = FileMetrics(
+            filename=filename, language=language, loc=0, functions=0, classes=0,
+            complexity=0, nesting_depth=0, smells=[],
+            error=f"{type(e).__name__}: {str(e)}"
+        )
+        return FileAnalysis(metrics, [])
+
+
+def _analyze(filename: str, code: str, language: str, complexity_threshold: int) -> FileAnalysis:
+    adapter = get_adapter(language, code, filename)
+    ast_data = adapter.analyze(code)
+
+    loc = _metrics_calc.calculate_loc(code, ast_data)
+    complexity = _metrics_calc.calculate_complexity(ast_data)
+
+    smells = _get_smell_detector(complexity_threshold).detect(
+        {'filename': filename, 'code': code}, ast_data
+    )
+
+    metrics = FileMetrics(
+        filename=filename,
+        language=language,
+        loc=loc,
+        functions=len(ast_data.get('functions', [])),
+        classes=len(ast_data.get('classes', [])),
+        complexity=complexity,
+        nesting_depth=ast_data.get('nesting_depth', 0),
+        smells=[s.type for s in smells],
+        function_metrics=ast_data.get('function_metrics', [])
+    )
+
+    return FileAnalysis(metrics, smells, fingerprint(code, language))
+
+
+def analyze_batch(files: List[Tuple[str, str]], complexity_threshold: int = 10) -> BatchResult:
+    """Analyze a chunk of (filename, code) pairs; entry point for pool workers"""
+    results = []
+    health = HealthAccumulator()
+    for filename, code in files:
+        analysis = analyze_file(filename, code, complexity_threshold)
+        if analysis is not None:
+            results.append(analysis)
+            health.add(analysis.metrics, analysis.smells)
+    return BatchResult(results, health)
+
+
+def _take(files: Iterator[Tuple[str, str]], count: int) -> List[Tuple[str, str]]:
+    return list(islice(files, count))
+
+
+class AnalysisPool:
+    """Shards the per-file analysis stage across worker processes.
+
+    Files are sent to the workers in chunks so the per-task IPC overhead is
+    amortized, and only a bounded number of chunks is in flight at a time so
+    large inputs are never fully materialized. Chunk results are yielded in
+    submission order, keeping the output deterministic.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 64,
+                 complexity_threshold: int = 10):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = max(0, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.complexity_threshold = complexity_threshold
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        # workers=0 keeps the stage in-process (on the default thread pool)
+        if self.workers == 0:
+            return None
+        if self._executor is None:
+            # spawn: forking a process that already runs the event loop and
+            # the Mongo client's monitor threads is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def map(self, files: Iterable[Tuple[str, str]], cache=None,
+                  stats: Optional[FileStageStats] = None) -> AsyncIterator[List[FileAnalysis]]:
+        """Analyze (filename, code) pairs, yielding results chunk by chunk.
+
+        With a cache (see AnalysisCache) files are looked up in batches and
+        only the misses are sent to the workers.
+        """
+        if stats is None:
+            stats = FileStageStats()
+
+        if cache is None:
+            async for chunk in self._map(files, stats.health):
+                stats.files += len(chunk)
+                yield chunk
+            return
+
+        loop = asyncio.get_running_loop()
+        files = iter(files)
+        batch_size = self.chunk_size * max(1, self.workers) * 2
+
+        while True:
+            # Sources may be lazy (e.g. ZIP entries), so pull them off the loop
+            batch = await loop.run_in_executor(None, _take, files, batch_size)
+            if not batch:
+                return
+
+            keyed = [(cache.key(name, code), name, code) for name, code in batch]
+            keyed = [entry for entry in keyed if entry[0] is not None]
+            hits = await cache.get_many(keyed)
+
+            keys = {}
+            misses = []
+            for key, name, code in keyed:
+                if name not in hits:
+                    keys[name] = key
+                    misses.append((name, code))
+
+            for analysis in hits.values():
+                stats.health.add(analysis.metrics, analysis.smells)
+
+            computed = {}
+            async for chunk in self._map(misses, stats.health):
+                for analysis in chunk:
+                    computed[analysis.metrics.filename] = analysis
+            # Failures are not cached: the next run may have the fix
+            await cache.put_many(
+                (keys[name], analysis) for name, analysis in computed.items()
+                if analysis.metrics.error is None
+            )
+
+            results = []
+            for _, name, _ in keyed:
+                analysis = hits.get(name) or computed.get(name)
+                if analysis is not None:
+                    results.append(analysis)
+
+            stats.files += len(results)
+            stats.cache_hits += len(hits)
+            yield results
+
+    async def _map(self, files: Iterable[Tuple[str, str]],
+                   health: HealthAccumulator) -> AsyncIterator[List[FileAnalysis]]:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        max_in_flight = max(1, self.workers) * 2
+
+        files = iter(files)
+        pending = deque()
+
+        try:
+            while True:
+                while len(pending) < max_in_flight:
+                    chunk = await loop.run_in_executor(None, _take, files, self.chunk_size)
+                    if not chunk:
+                        break
+                    pending.append(loop.run_in_executor(
+                        executor, analyze_batch, chunk, self.complexity_threshold
+                    ))
+
+                if not pending:
+                    return
+
+                batch = await pending.popleft()
+                # Workers aggregate their chunk; only the merge happens here
+                health.update(batch.health)
+                yield batch.analyses
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool next time
+            self.shutdown()
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
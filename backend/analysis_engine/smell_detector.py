@@ -123,11 +123,17 @@
 #                     ))
         
 #         return smells
-from typing import List, Dict, Any
-from models.analysis import CodeSmell
+from typing import List, Dict, Any, Optional
+from models.analysis import CodeSmell, FunctionMetrics
 import re
 
 
+LONG_FUNCTION_LOC = 50
+MAX_NESTING = 4
+MAX_CLASS_METHODS = 10
+MAX_PARAMETERS = 5
+
+
 class SmellDetector:
     """Detect code smells (safe version)"""
 
@@ -151,6 +157,13 @@ class SmellDetector:
             return value
         return default
 
+    def _function_metrics(self, ast_data: Dict) -> Optional[List[FunctionMetrics]]:
+        # None when the adapter produced no per-function records at all
+        records = ast_data.get('function_metrics')
+        if not isinstance(records, list):
+            return None
+        return [r for r in records if isinstance(r, FunctionMetrics)]
+
     def detect(self, file_data: Dict[str, Any], ast_data: Dict[str, Any]) -> List[CodeSmell]:
 
         smells = []
@@ -159,39 +172,69 @@ class SmellDetector:
 
         code = self._ensure_string(file_data.get('code', ''))
         ast_data = ast_data if isinstance(ast_data, dict) else {}
+        records = self._function_metrics(ast_data)
 
-        smells.extend(self._detect_long_functions(filename, code, ast_data))
-        smells.extend(self._detect_deep_nesting(filename, ast_data))
-        smells.extend(self._detect_high_complexity(filename, ast_data))
-        smells.extend(self._detect_large_class(filename, code, ast_data))
-        smells.extend(self._detect_many_parameters(filename, code))
+        smells.extend(self._detect_long_functions(filename, code, ast_data, records))
+        smells.extend(self._detect_deep_nesting(filename, ast_data, records))
+        smells.extend(self._detect_high_complexity(filename, ast_data, records))
+        smells.extend(self._detect_large_class(filename, code, ast_data, records))
+        smells.extend(self._detect_many_parameters(filename, code, ast_data, records))
 
         return smells
 
-    def _detect_long_functions(self, filename: str, code: str, ast_data: Dict) -> List[CodeSmell]:
+    def _detect_long_functions(self, filename: str, code: str, ast_data: Dict,
+                               records: Optional[List[FunctionMetrics]]) -> List[CodeSmell]:
         smells = []
 
+        if records is not None:
+            for func in records:
+                if func.loc > LONG_FUNCTION_LOC:
+                    smells.append(CodeSmell(
+                        type="Long Function",
+                        severity="medium",
+                        file=filename,
+                        line=func.start_line,
+                        message=f"Function '{func.name}' has {func.loc} lines of code",
+                        suggestion="Consider breaking down large functions"
+                    ))
+            return smells
+
         functions = self._ensure_list(ast_data.get('functions', []))
-        lines = code.split('\n')
+        line_count = ast_data.get('line_count')
+        if not isinstance(line_count, int):
+            line_count = len(code.split('\n'))
 
-        if len(lines) > 50 and functions:
+        if line_count > LONG_FUNCTION_LOC and functions:
             smells.append(CodeSmell(
                 type="Long Function",
                 severity="medium",
                 file=filename,
                 line=1,
-                message=f"File contains {len(lines)} lines with {len(functions)} functions",
+                message=f"File contains {line_count} lines with {len(functions)} functions",
                 suggestion="Consider breaking down large functions"
             ))
 
         return smells
 
-    def _detect_deep_nesting(self, filename: str, ast_data: Dict) -> List[CodeSmell]:
+    def _detect_deep_nesting(self, filename: str, ast_data: Dict,
+                             records: Optional[List[FunctionMetrics]]) -> List[CodeSmell]:
         smells = []
 
+        for func in records or []:
+            if func.nesting > MAX_NESTING:
+                smells.append(CodeSmell(
+                    type="Deep Nesting",
+                    severity="high",
+                    file=filename,
+                    line=func.start_line,
+                    message=f"Nesting depth {func.nesting} in '{func.name}'",
+                    suggestion="Refactor nested logic"
+                ))
+
         nesting_depth = self._ensure_number(ast_data.get('nesting_depth', 0))
 
-        if nesting_depth > 4:
+        # Deep nesting outside any reported function (module-level code)
+        if nesting_depth > MAX_NESTING and not smells:
             smells.append(CodeSmell(
                 type="Deep Nesting",
                 severity="high",
@@ -203,11 +246,25 @@ class SmellDetector:
 
         return smells
 
-    def _detect_high_complexity(self, filename: str, ast_data: Dict) -> List[CodeSmell]:
+    def _detect_high_complexity(self, filename: str, ast_data: Dict,
+                                records: Optional[List[FunctionMetrics]]) -> List[CodeSmell]:
         smells = []
 
         complexity = self._ensure_number(ast_data.get('complexity', 1))
 
+        for func in records or []:
+            if func.complexity > self.complexity_threshold:
+                smells.append(CodeSmell(
+                    type="High Complexity",
+                    severity="high",
+                    file=filename,
+                    line=func.start_line,
+                    message=f"Complexity {func.complexity} in '{func.name}'",
+                    suggestion="Reduce branching"
+                ))
+            # What is left is the decision points of top-level code
+            complexity -= func.complexity - 1
+
         if complexity > self.complexity_threshold:
             smells.append(CodeSmell(
                 type="High Complexity",
@@ -220,13 +277,32 @@ class SmellDetector:
 
         return smells
 
-    def _detect_large_class(self, filename: str, code: str, ast_data: Dict) -> List[CodeSmell]:
+    def _detect_large_class(self, filename: str, code: str, ast_data: Dict,
+                            records: Optional[List[FunctionMetrics]]) -> List[CodeSmell]:
         smells = []
 
+        class_spans = self._ensure_list(ast_data.get('class_spans'))
+        if records is not None and class_spans:
+            for cls in class_spans:
+                if not isinstance(cls, dict):
+                    continue
+                start, end = cls.get('start', 0), cls.get('end', 0)
+                methods = sum(1 for func in records if start <= func.start_line <= end)
+                if methods > MAX_CLASS_METHODS:
+                    smells.append(CodeSmell(
+                        type="Large Class",
+                        severity="medium",
+                        file=filename,
+                        line=start,
+                        message=f"Class '{cls.get('name')}' has {methods} methods",
+                        suggestion="Split into smaller classes"
+                    ))
+            return smells
+
         classes = self._ensure_list(ast_data.get('classes', []))
         functions = self._ensure_list(ast_data.get('functions', []))
 
-        if classes and len(functions) > 10:
+        if classes and len(functions) > MAX_CLASS_METHODS:
             smells.append(CodeSmell(
                 type="Large Class",
                 severity="medium",
@@ -238,23 +314,48 @@ class SmellDetector:
 
         return smells
 
-    def _detect_many_parameters(self, filename: str, code: str) -> List[CodeSmell]:
-        smells = []
+    def _parameter_counts(self, code: str, ast_data: Dict) -> List[int]:
+        # Prefer the counts collected by the adapter scan over re-scanning code
+        parameters = ast_data.get('parameters')
+        if isinstance(parameters, list):
+            return [self._ensure_number(p.get('count')) for p in parameters if isinstance(p, dict)]
 
+        counts = []
         patterns = re.findall(r'def\s+\w+\s*\((.*?)\)|function\s+\w+\s*\((.*?)\)', code)
 
         for params in patterns:
             param_str = params[0] if params[0] else params[1] if len(params) > 1 else ''
             if param_str:
-                count = len([p for p in param_str.split(',') if p.strip()])
-                if count > 5:
+                counts.append(len([p for p in param_str.split(',') if p.strip()]))
+
+        return counts
+
+    def _detect_many_parameters(self, filename: str, code: str, ast_data: Dict,
+                                records: Optional[List[FunctionMetrics]]) -> List[CodeSmell]:
+        smells = []
+
+        if records is not None:
+            for func in records:
+                if func.params > MAX_PARAMETERS:
                     smells.append(CodeSmell(
                         type="Too Many Parameters",
                         severity="low",
                         file=filename,
-                        line=1,
-                        message=f"{count} parameters",
+                        line=func.start_line,
+                        message=f"'{func.name}' has {func.params} parameters",
                         suggestion="Use parameter objects"
                     ))
+            return smells
+
+        for count in self._parameter_counts(code, ast_data):
+            if count > MAX_PARAMETERS:
+                smells.append(CodeSmell(
+                    type="Too Many Parameters",
+                    severity="low",
+                    file=filename,
+                    line=1,
+                    message=f"{count} parameters",
+                    suggestion="Use parameter objects"
+                ))
 
         return smells
@@ -0,0 +1,127 @@
+"""Concurrency benchmark for the /api/compile HTTP client.
+
+Run from the backend directory:
+
+    python -m benchmarks.compile_benchmark
+    python -m benchmarks.compile_benchmark --requests 500 --latency 0.05 --concurrency 50
+
+Starts a local stand-in for the hosted compiler API (an HTTP/1.1
+keep-alive server that answers every run after --latency seconds) and
+fires concurrent requests at it through RemoteCompiler. The blocking
+requests.post the endpoint used to make is timed too, as it behaved
+inside the event loop: one call at a time.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compiler_service.remote import RemoteCompiler  # noqa: E402
+
+
+class StandInServer:
+    """Minimal keep-alive HTTP server answering like the compiler API"""
+
+    def __init__(self, latency: float, fail_every: int = 0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self.connections = 0
+        self._server = None
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                await reader.readexactly(length)
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+
+                if self.fail_every and self.requests % self.fail_every == 0:
+                    status, body = "503 Service Unavailable", b"{}"
+                else:
+                    status = "200 OK"
+                    body = json.dumps({"stdout": "ok\n", "stderr": None, "time": self.latency}).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/api/v1/run"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+async def run_pooled(url: str, count: int, concurrency: int) -> float:
+    compiler = RemoteCompiler(url=url, max_connections=concurrency, max_concurrency=concurrency)
+    await compiler.start()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(compiler.run("python", "print('ok')") for _ in range(count)))
+    elapsed = time.perf_counter() - start
+    await compiler.close()
+    assert all(r["stdout"] == "ok\n" for r in results)
+    return elapsed
+
+
+async def run_legacy(url: str, count: int) -> float:
+    """The previous endpoint body: a blocking call per request on the event loop"""
+    async def compile_once():
+        response = requests.post(url, json={"language": "python", "files": []})
+        return response.json()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(compile_once() for _ in range(count)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--legacy-limit", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'client':>14} {'concurrency':>12} {'requests':>9} {'time (s)':>9} {'req/s':>8} {'conns':>6}")
+
+    for concurrency in args.concurrency:
+        server = StandInServer(args.latency)
+        url = await server.start()
+        elapsed = await run_pooled(url, args.requests, concurrency)
+        await server.stop()
+        print(f"{'pooled async':>14} {concurrency:>12} {args.requests:>9} {elapsed:>9.3f} "
+              f"{args.requests / elapsed:>8.1f} {server.connections:>6}")
+
+    count = min(args.requests, args.legacy_limit)
+    server = StandInServer(args.latency)
+    url = await server.start()
+    # The legacy client blocks whatever loop it runs on, so give it its own
+    # loop in a worker thread while this one keeps serving
+    elapsed = await asyncio.to_thread(lambda: asyncio.run(run_legacy(url, count)))
+    await server.stop()
+    print(f"{'legacy':>14} {1:>12} {count:>9} {elapsed:>9.3f} {count / elapsed:>8.1f} {server.connections:>6}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
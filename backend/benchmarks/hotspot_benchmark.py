@@ -0,0 +1,101 @@
+"""Scaling benchmark for HotspotDetector.
+
+Run from the backend directory:
+
+    python -m benchmarks.hotspot_benchmark
+    python -m benchmarks.hotspot_benchmark --sizes 10000 100000 --top-k 50
+
+The per-file rescan the detector used to do is timed too, but only up to
+--legacy-limit files: it is O(files x smells) and does not finish in any
+reasonable time beyond that.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.analysis import CodeSmell, FileMetrics  # noqa: E402
+from analysis_engine.hotspot_detector import HotspotDetector  # noqa: E402
+
+
+SMELL_TYPES = ["Long Function", "Deep Nesting", "High Complexity", "Too Many Parameters"]
+
+
+def make_project(size: int, smells_per_file: float = 2.0, seed: int = 0):
+    rng = random.Random(seed)
+    files = [
+        FileMetrics.model_construct(
+            filename=f"src/pkg{i // 1000}/module_{i}.py",
+            language="python",
+            loc=rng.randint(10, 2000),
+            functions=rng.randint(0, 60),
+            classes=rng.randint(0, 5),
+            complexity=float(rng.randint(1, 80)),
+            nesting_depth=rng.randint(0, 8),
+            smells=[]
+        )
+        for i in range(size)
+    ]
+    smells = [
+        CodeSmell.model_construct(
+            type=rng.choice(SMELL_TYPES),
+            severity="medium",
+            file=files[rng.randrange(size)].filename,
+            line=1,
+            message="",
+            suggestion=""
+        )
+        for _ in range(int(size * smells_per_file))
+    ]
+    return files, smells
+
+
+def legacy_detect(files, smells):
+    """The previous implementation: one full smell scan per file, then a full sort"""
+    hotspots = []
+    for f in files:
+        smell_count = len([s for s in smells if s.file == f.filename])
+        risk_score = (min(f.complexity / 20.0, 1.0) * 40 + min(smell_count / 5.0, 1.0) * 30
+                      + min(f.loc / 500.0, 1.0) * 20 + min(f.nesting_depth / 6.0, 1.0) * 10)
+        hotspots.append((round(risk_score, 2), f.filename))
+    hotspots.sort(key=lambda h: h[0], reverse=True)
+    return hotspots
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--legacy-limit", type=int, default=10000)
+    args = parser.parse_args()
+
+    detector = HotspotDetector()
+    print(f"{'files':>10} {'smells':>10} {'full (s)':>10} {'top-k (s)':>10} {'legacy (s)':>11}")
+
+    for size in args.sizes:
+        files, smells = make_project(size)
+
+        full_time, full = timed(detector.detect, files, smells)
+        top_time, top = timed(detector.detect, files, smells, top_k=args.top_k)
+        assert [h.file for h in top] == [h.file for h in full[:args.top_k]]
+
+        legacy = "skipped"
+        if size <= args.legacy_limit:
+            legacy_time, ranked = timed(legacy_detect, files, smells)
+            assert [name for _, name in ranked] == [h.file for h in full]
+            legacy = f"{legacy_time:.3f}"
+
+        print(f"{size:>10} {len(smells):>10} {full_time:>10.3f} {top_time:>10.3f} {legacy:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Java execution benchmark: resident JVM daemon vs javac/java per run.
+
+Run from the backend directory (needs a JDK on PATH):
+
+    python -m benchmarks.java_benchmark
+    python -m benchmarks.java_benchmark --requests 50 --concurrency 1 4
+
+Runs the same submissions through LocalCompiler twice: once the way
+/api/compile used to (a cold javac and a cold java process per call),
+once through the RunnerDaemon. Every submission gets a distinct source, so
+the daemon's compile cache is not what is being measured; --repeat reruns
+one source to show the cached case as well.
+"""
+import argparse
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compiler_service.java_daemon import JavaDaemon  # noqa: E402
+from compiler_service.local import LocalCompiler  # noqa: E402
+
+PROGRAM = """
+import java.util.*;
+
+public class Main {
+    public static void main(String[] args) {
+        Scanner in = new Scanner(System.in);
+        long n = in.nextLong(), total = 0;
+        for (long i = 1; i <= n; i++) total += i %% 7;
+        System.out.println(total + " %d");
+    }
+}
+"""
+
+
+async def run(compiler: LocalCompiler, count: int, concurrency: int, repeat: bool) -> float:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with slots:
+            code = PROGRAM % (0 if repeat else i)
+            result = await compiler.execute("java", code, "100000")
+            assert result.success, result.stderr
+            return result
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", action="store_true", help="submit the same source every time")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if not shutil.which("javac") or not shutil.which("java"):
+        sys.exit("javac/java not found in PATH")
+
+    build_dir = tempfile.mkdtemp()
+    daemon = JavaDaemon(build_dir)
+    modes = {
+        "javac + java": LocalCompiler(timeout=args.timeout, compile_timeout=args.timeout),
+        "daemon": LocalCompiler(timeout=args.timeout, compile_timeout=args.timeout, java_daemon=daemon),
+    }
+    started = time.perf_counter()
+    await modes["daemon"].start()
+    print(f"daemon start (incl. build): {time.perf_counter() - started:.2f}s, metrics {daemon.metrics()}")
+
+    print(f"{'path':>14} {'concurrency':>12} {'runs':>6} {'time (s)':>9} {'ms/run':>8} {'runs/s':>7}")
+    for concurrency in args.concurrency:
+        for name, compiler in modes.items():
+            elapsed = await run(compiler, args.requests, concurrency, args.repeat)
+            print(f"{name:>14} {concurrency:>12} {args.requests:>6} {elapsed:>9.2f} "
+                  f"{elapsed / args.requests * 1000:>8.1f} {args.requests / elapsed:>7.1f}")
+    print(f"daemon metrics {daemon.metrics()}")
+
+    for compiler in modes.values():
+        await compiler.close()
+    shutil.rmtree(build_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# How to ask a compiler for its version when `--version` does not work
+VERSION_ARGS = {
+    'go': ['version'],
+    'javac': ['-version'],
+}
+VERSION_TIMEOUT = 10  # seconds
+
+
+class ArtifactCache:
+    """Content-addressed store of compiled programs on local disk.
+
+    An entry is keyed on the source, the resolved compiler (path, mtime and
+    version) and the compile command, so the same program built by the same
+    toolchain is only ever compiled once. Entries are directories under
+    `root`, published with an atomic rename: readers see a complete entry or
+    none, and several processes can share one root. Hits copy the artifacts
+    into the caller's working directory (never a link: the program may
+    rewrite its own binary), so an entry being evicted meanwhile is just a
+    miss. The least recently used entries are evicted once the cache grows
+    past `max_bytes`.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._toolchains: Dict[Tuple[str, int], str] = {}
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(self.root, 'tmp'), exist_ok=True)
+        self._load_index()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    # ---------------- Keys ----------------
+
+    def _version(self, path: str) -> str:
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            proc = subprocess.run(
+                [path] + VERSION_ARGS.get(name, ['--version']),
+                capture_output=True, text=True, errors='replace', timeout=VERSION_TIMEOUT
+            )
+            return (proc.stdout + proc.stderr).strip()
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Could not get the version of {path}: {str(e)}")
+            return ""
+
+    def toolchain(self, executable: str) -> Optional[str]:
+        """Resolved path and version of a compiler; None if it is not installed"""
+        found = shutil.which(executable)
+        if not found:
+            return None
+        path = os.path.realpath(found)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        # An upgraded compiler has a new mtime, so its version is asked again
+        cached = self._toolchains.get((path, mtime))
+        if cached is None:
+            cached = f"{path}\n{mtime}\n{self._version(path)}"
+            self._toolchains[(path, mtime)] = cached
+        return cached
+
+    def key(self, code: str, source: Optional[str], compile_cmd: List[str],
+            artifacts: Tuple[str, ...]) -> Optional[str]:
+        toolchain = self.toolchain(compile_cmd[0])
+        if toolchain is None:
+            return None
+        material = json.dumps([code, source, compile_cmd, list(artifacts), toolchain])
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    # ---------------- Entries ----------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+    def _load_index(self):
+        """Pick up what earlier runs left on disk, least recently used first"""
+        found = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir() or shard.name == 'tmp':
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    found.append((entry.stat().st_mtime, entry.name, self._dir_size(entry.path)))
+                except OSError:
+                    continue
+        found.sort()
+        self._entries = OrderedDict((name, size) for _, name, size in found)
+        self._size = sum(self._entries.values())
+
+    def _remove(self, key: str):
+        path = self._path(key)
+        # Rename first, so the entry disappears at once for every reader
+        trash = os.path.join(self.root, 'tmp', f"evict-{key}-{uuid.uuid4().hex}")
+        try:
+            os.rename(path, trash)
+        except OSError:
+            return
+        shutil.rmtree(trash, ignore_errors=True)
+
+    def _evict(self):
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self._remove(key)
+            self.evictions += 1
+
+    # ---------------- Public API ----------------
+
+    def fetch(self, key: str, workdir: str) -> bool:
+        """Copy a cached build into workdir; False on a miss"""
+        path = self._path(key)
+        try:
+            for entry in os.scandir(path):
+                shutil.copy2(entry.path, os.path.join(workdir, entry.name))
+            os.utime(path)
+        except FileNotFoundError:
+            # Never built, or evicted while we were copying
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return True
+
+    def store(self, key: str, files: List[str]):
+        """Publish freshly compiled files under key"""
+        path = self._path(key)
+        if os.path.isdir(path):
+            return
+        staging = tempfile.mkdtemp(dir=os.path.join(self.root, 'tmp'))
+        try:
+            for file in files:
+                shutil.copy2(file, os.path.join(staging, os.path.basename(file)))
+            size = self._dir_size(staging)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.rename(staging, path)
+            except OSError:
+                # Someone else published the same build first
+                return
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        with self._lock:
+            self.stores += 1
+            self._size += size - self._entries.get(key, 0)
+            self._entries[key] = size
+            self._evict()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._size,
+            }
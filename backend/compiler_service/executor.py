@@ -1,512 +1,448 @@
 import subprocess
-import tempfile
 import os
 import sys
 import time
 import shutil
 import re
-from typing import Tuple
+import select
+import selectors
+import signal
+import sqlite3
+import glob
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from compiler_service.artifact_cache import ArtifactCache
+from compiler_service.limits import ResourceLimits, ResourceUsage, apply_rlimits, peak_rss_kb, signal_message
+from compiler_service.workspace import WorkspacePool, default_pool
+
+
+TIMEOUT = 5  # seconds
+
+
+class ExecutionPlan(NamedTuple):
+    """How to build and run one program.
+
+    The source is written to `source` inside a fresh working directory.
+    Commands may use {dir}, {src} and {bin}, which are filled in with that
+    directory, the source path and the path of the compiled binary.
+    `artifacts` names what the compile step leaves behind for the run step
+    ({bin} or glob patterns); only plans that list them are cached.
+    Runtimes that reserve much more address space than they touch set
+    `reserves_address_space`, so their memory limit is not an RLIMIT_AS.
+    """
+    source: Optional[str]
+    run: List[str]
+    compile: Optional[List[str]] = None
+    missing: str = ""
+    artifacts: Tuple[str, ...] = ()
+    reserves_address_space: bool = False
+
+
+class ExecutionResult(NamedTuple):
+    success: bool
+    stdout: str
+    stderr: str
+    execution_time: float
+    compile_time: float = 0.0
+    cache_hit: bool = False
+    usage: Optional[ResourceUsage] = None
+    timed_out: bool = False
+    compile_error: bool = False
+
+
+# ---------------- Per-language plans ----------------
+
+def _plan_python(code: str) -> ExecutionPlan:
+    return ExecutionPlan("main.py", [sys.executable or 'python', "{src}"])
+
+
+def _plan_javascript(code: str) -> ExecutionPlan:
+    return ExecutionPlan(
+        "main.js", ["node", "{src}"],
+        missing="Node.js (node) compiler/runtime is not installed or not found in PATH.",
+        reserves_address_space=True
+    )
+
+
+def _plan_java(code: str) -> ExecutionPlan:
+    class_name = "Main"
+    match = re.search(r'public\s+class\s+([A-Za-z0-9_]+)', code)
+    if match:
+        class_name = match.group(1)
+    return ExecutionPlan(
+        f"{class_name}.java", ["java", "-cp", "{dir}", class_name], compile=["javac", "{src}"],
+        missing="Java JDK (javac/java) is not installed or not found in PATH.",
+        artifacts=("*.class",), reserves_address_space=True
+    )
+
+
+def _plan_cpp(code: str) -> ExecutionPlan:
+    compiler = "g++" if shutil.which("g++") else "clang++"
+    return ExecutionPlan(
+        "main.cpp", ["{bin}"], compile=[compiler, "{src}", "-o", "{bin}"],
+        missing="C++ compiler (g++/clang++) is not installed or not found in PATH.",
+        artifacts=("{bin}",)
+    )
+
+
+def _plan_c(code: str) -> ExecutionPlan:
+    compiler = "gcc" if shutil.which("gcc") else "clang"
+    return ExecutionPlan(
+        "main.c", ["{bin}"], compile=[compiler, "{src}", "-o", "{bin}"],
+        missing="C compiler (gcc/clang) is not installed or not found in PATH.",
+        artifacts=("{bin}",)
+    )
+
+
+def _plan_go(code: str) -> ExecutionPlan:
+    return ExecutionPlan(
+        "main.go", ["{bin}"], compile=["go", "build", "-o", "{bin}", "{src}"],
+        missing="Go compiler (go) is not installed or not found in PATH.",
+        artifacts=("{bin}",), reserves_address_space=True
+    )
+
+
+def _plan_rust(code: str) -> ExecutionPlan:
+    return ExecutionPlan(
+        "main.rs", ["{bin}"], compile=["rustc", "{src}", "-o", "{bin}"],
+        missing="Rust compiler (rustc) is not installed or not found in PATH.",
+        artifacts=("{bin}",)
+    )
+
+
+def _plan_bash(code: str) -> ExecutionPlan:
+    bash_bin = shutil.which("bash") or shutil.which("sh")
+    if bash_bin:
+        # From a file, not `-c`: argv has a size limit, and so do fork server requests
+        return ExecutionPlan("main.sh", [bash_bin, "{src}"])
+    if os.name == 'nt':
+        return ExecutionPlan(None, ["cmd.exe", "/c", code])
+    return ExecutionPlan(None, [], missing="Bash shell runtime not found.")
+
+
+def _plan_ruby(code: str) -> ExecutionPlan:
+    return ExecutionPlan(
+        "main.rb", ["ruby", "{src}"],
+        missing="Ruby runtime is not installed or not found in PATH."
+    )
+
+
+def _plan_php(code: str) -> ExecutionPlan:
+    return ExecutionPlan(
+        "main.php", ["php", "{src}"],
+        missing="PHP runtime is not installed or not found in PATH."
+    )
+
+
+def _plan_r(code: str) -> ExecutionPlan:
+    return ExecutionPlan(
+        "main.R", ["Rscript", "{src}"],
+        missing="Rscript is not installed or not found in PATH."
+    )
+
 
-class CodeExecutor:
-    """Safe code execution for multiple programming languages using subprocess."""
+PLANNERS = {
+    'python': _plan_python,
+    'python3': _plan_python,
+    'javascript': _plan_javascript,
+    'js': _plan_javascript,
+    # Strip simple type annotations or run via node if node available
+    'typescript': _plan_javascript,
+    'ts': _plan_javascript,
+    'java': _plan_java,
+    'cpp': _plan_cpp,
+    'c++': _plan_cpp,
+    'c': _plan_c,
+    'go': _plan_go,
+    'golang': _plan_go,
+    'rust': _plan_rust,
+    'bash': _plan_bash,
+    'sh': _plan_bash,
+    'shell': _plan_bash,
+    'ruby': _plan_ruby,
+    'php': _plan_php,
+    'r': _plan_r,
+}
+
+# Languages run in-process rather than in a subprocess
+IN_PROCESS = {'sql'}
+
+UNAVAILABLE = {
+    'csharp': "C# (.NET) compiler not installed or not found in PATH.",
+    'kotlin': "Kotlin compiler (kotlinc) not installed or not found in PATH.",
+    'scala': "Scala compiler (scalac) not installed or not found in PATH.",
+}
+
+TIMEOUT_MESSAGE = f"Execution timeout exceeded ({TIMEOUT}s)"
+
+
+def normalize_language(language: str) -> str:
+    return (language or '').lower().strip()
+
+
+def build_plan(language: str, code: str) -> Optional[ExecutionPlan]:
+    planner = PLANNERS.get(normalize_language(language))
+    return planner(code) if planner else None
+
+
+def unsupported(language: str) -> ExecutionResult:
+    message = UNAVAILABLE.get(normalize_language(language), f"Unsupported language: {language}")
+    return ExecutionResult(False, "", message, 0.0)
+
+
+def prepare(plan: ExecutionPlan, code: str, workdir: str) -> Dict[str, str]:
+    """Write the source into workdir; returns the command placeholders"""
+    paths = {
+        'dir': workdir,
+        'src': os.path.join(workdir, plan.source or "main"),
+        'bin': os.path.join(workdir, "main.exe" if os.name == 'nt' else "main"),
+    }
+    if plan.source:
+        with open(paths['src'], "w", encoding='utf-8') as f:
+            f.write(code)
+    return paths
+
+
+PLACEHOLDERS = frozenset({'{dir}', '{src}', '{bin}'})
+
+
+def command(template: List[str], paths: Dict[str, str]) -> List[str]:
+    # Only whole-argument placeholders are substituted, never user code
+    return [paths[arg[1:-1]] if arg in PLACEHOLDERS else arg for arg in template]
+
+
+def cache_key(cache: Optional[ArtifactCache], plan: ExecutionPlan, code: str) -> Optional[str]:
+    if cache is None or not plan.compile or not plan.artifacts:
+        return None
+    return cache.key(code, plan.source, plan.compile, plan.artifacts)
+
+
+def artifact_files(plan: ExecutionPlan, paths: Dict[str, str]) -> List[str]:
+    """The files the compile step produced, to be cached"""
+    files = []
+    for pattern in plan.artifacts:
+        if pattern in PLACEHOLDERS:
+            files.append(paths[pattern[1:-1]])
+        else:
+            files.extend(sorted(glob.glob(os.path.join(paths['dir'], pattern))))
+    return files
+
+
+def copy_artifacts(plan: ExecutionPlan, build: Dict[str, str], workdir: str):
+    """Copy what a build in another directory produced into workdir"""
+    for path in artifact_files(plan, build):
+        # Copies, not links: a program may modify its own files
+        shutil.copy2(path, os.path.join(workdir, os.path.basename(path)))
+
+
+def plan_rlimits(limits: Optional[ResourceLimits], plan: ExecutionPlan) -> Dict[str, int]:
+    if limits is None or os.name == 'nt':
+        return {}
+    return limits.rlimits(plan.reserves_address_space)
+
+
+def with_exit_signal(stderr: str, usage: Optional[ResourceUsage]) -> str:
+    """stderr, plus what killed the program if it died of a signal"""
+    if usage is None or usage.exit_signal is None:
+        return stderr
+    if stderr and not stderr.endswith("\n"):
+        stderr += "\n"
+    return stderr + signal_message(usage.exit_signal)
+
+
+def _pump(proc: subprocess.Popen, data: bytes, timeout: float) -> Tuple[bytes, bytes]:
+    """Popen.communicate() without the wait, so the caller can reap with wait4()"""
+    deadline = time.monotonic() + timeout
+    output = {proc.stdout: [], proc.stderr: []}
+    view = memoryview(data)
+    with selectors.DefaultSelector() as selector:
+        if view:
+            selector.register(proc.stdin, selectors.EVENT_WRITE)
+        else:
+            proc.stdin.close()
+        for stream in output:
+            selector.register(stream, selectors.EVENT_READ)
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            for key, _ in selector.select(remaining):
+                if key.fileobj is proc.stdin:
+                    try:
+                        view = view[os.write(key.fd, view[:select.PIPE_BUF]):]
+                    except BrokenPipeError:
+                        # The program exited without reading all of its input
+                        view = view[:0]
+                    if not view:
+                        selector.unregister(proc.stdin)
+                        proc.stdin.close()
+                else:
+                    chunk = os.read(key.fd, 65536)
+                    if chunk:
+                        output[key.fileobj].append(chunk)
+                    else:
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+    return b"".join(output[proc.stdout]), b"".join(output[proc.stderr])
+
+
+def execute_sql(code: str) -> ExecutionResult:
+    try:
+        start = time.time()
+        conn = sqlite3.connect(":memory:")
+        cursor = conn.cursor()
+        output_lines = []
+
+        statements = [s.strip() for s in code.split(';') if s.strip()]
+        for stmt in statements:
+            cursor.execute(stmt)
+            rows = cursor.fetchall()
+            if rows:
+                for r in rows:
+                    output_lines.append(str(r))
+
+        conn.commit()
+        conn.close()
+        execution_time = time.time() - start
+        output_str = "\n".join(output_lines) if output_lines else "Query executed successfully."
+        return ExecutionResult(True, output_str + "\n", "", execution_time)
+    except Exception as e:
+        return ExecutionResult(False, "", str(e), 0.0)
 
-    TIMEOUT = 5  # seconds
 
-    @staticmethod
-    def execute(language: str, code: str, input_data: str = "") -> Tuple[bool, str, str, float]:
-        """Execute code safely and return (success, stdout, stderr, execution_time)"""
-        lang = (language or '').lower().strip()
-
-        executors = {
-            'python': CodeExecutor._execute_python,
-            'python3': CodeExecutor._execute_python,
-            'javascript': CodeExecutor._execute_javascript,
-            'js': CodeExecutor._execute_javascript,
-            'typescript': CodeExecutor._execute_typescript,
-            'ts': CodeExecutor._execute_typescript,
-            'java': CodeExecutor._execute_java,
-            'cpp': CodeExecutor._execute_cpp,
-            'c++': CodeExecutor._execute_cpp,
-            'c': CodeExecutor._execute_c,
-            'go': CodeExecutor._execute_go,
-            'golang': CodeExecutor._execute_go,
-            'rust': CodeExecutor._execute_rust,
-            'bash': CodeExecutor._execute_bash,
-            'sh': CodeExecutor._execute_bash,
-            'shell': CodeExecutor._execute_bash,
-            'ruby': CodeExecutor._execute_ruby,
-            'php': CodeExecutor._execute_php,
-            'r': CodeExecutor._execute_r,
-            'sql': CodeExecutor._execute_sql,
-            'csharp': CodeExecutor._execute_csharp,
-            'kotlin': CodeExecutor._execute_kotlin,
-            'scala': CodeExecutor._execute_scala,
-        }
-
-        executor = executors.get(lang)
-        if not executor:
-            return False, "", f"Unsupported language: {language}", 0.0
-
-        return executor(code, input_data or "")
-
-    # ---------------- PYTHON ----------------
-    @staticmethod
-    def _execute_python(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        temp_file = None
-        try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as f:
-                f.write(code)
-                temp_file = f.name
+class CodeExecutor:
+    """Safe code execution for multiple programming languages using subprocess.
 
-            python_bin = sys.executable or 'python'
-            start = time.time()
-            result = subprocess.run(
-                [python_bin, temp_file],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
-            execution_time = time.time() - start
-            return result.returncode == 0, result.stdout, result.stderr, execution_time
-        except subprocess.TimeoutExpired:
-            return False, "", "Execution timeout exceeded (5s)", CodeExecutor.TIMEOUT
-        except Exception as e:
-            return False, "", str(e), 0.0
-        finally:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except Exception:
-                    pass
+    Blocking; the server uses compiler_service.local.LocalCompiler, which
+    runs the same plans on asyncio subprocesses. Set `artifact_cache` to
+    reuse compiled programs between calls; programs run in `workspaces`
+    (the process-wide pool unless set). Set `limits` to run programs under
+    setrlimit caps; on POSIX every run reports its resource usage.
+    """
 
-    # ---------------- JAVASCRIPT ----------------
-    @staticmethod
-    def _execute_javascript(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        temp_file = None
-        try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.js', delete=False, encoding='utf-8') as f:
-                f.write(code)
-                temp_file = f.name
+    TIMEOUT = TIMEOUT
+    artifact_cache: Optional[ArtifactCache] = None
+    workspaces: Optional[WorkspacePool] = None
+    limits: Optional[ResourceLimits] = None
 
-            start = time.time()
-            result = subprocess.run(
-                ['node', temp_file],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
-            execution_time = time.time() - start
-            return result.returncode == 0, result.stdout, result.stderr, execution_time
-        except FileNotFoundError:
-            return False, "", "Node.js (node) compiler/runtime is not installed or not found in PATH.", 0.0
-        except subprocess.TimeoutExpired:
-            return False, "", "Execution timeout exceeded (5s)", CodeExecutor.TIMEOUT
-        except Exception as e:
-            return False, "", str(e), 0.0
-        finally:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except Exception:
-                    pass
-
-    # ---------------- TYPESCRIPT ----------------
     @staticmethod
-    def _execute_typescript(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        # Strip simple type annotations or run via node if node available
-        return CodeExecutor._execute_javascript(code, input_data)
+    def execute(language: str, code: str, input_data: str = "") -> ExecutionResult:
+        """Execute code safely and return (success, stdout, stderr, execution_time, ...)"""
+        if normalize_language(language) in IN_PROCESS:
+            return execute_sql(code)
 
-    # ---------------- JAVA ----------------
-    @staticmethod
-    def _execute_java(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        temp_dir = None
-        try:
-            temp_dir = tempfile.mkdtemp()
-            class_name = "Main"
-            match = re.search(r'public\s+class\s+([A-Za-z0-9_]+)', code)
-            if match:
-                class_name = match.group(1)
-
-            file_path = os.path.join(temp_dir, f"{class_name}.java")
-            with open(file_path, "w", encoding='utf-8') as f:
-                f.write(code)
-
-            compile_proc = subprocess.run(
-                ["javac", file_path],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
+        plan = build_plan(language, code)
+        if plan is None:
+            return unsupported(language)
+        if not plan.run:
+            return ExecutionResult(False, "", plan.missing, 0.0)
 
-            if compile_proc.returncode != 0:
-                return False, "", compile_proc.stderr, 0.0
+        return CodeExecutor._execute_plan(plan, code, input_data or "")
 
-            start = time.time()
-            run_proc = subprocess.run(
-                ["java", "-cp", temp_dir, class_name],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
-            execution_time = time.time() - start
-            return run_proc.returncode == 0, run_proc.stdout, run_proc.stderr, execution_time
-        except FileNotFoundError:
-            return False, "", "Java JDK (javac/java) is not installed or not found in PATH.", 0.0
-        except subprocess.TimeoutExpired:
-            return False, "", "Execution timeout exceeded (5s)", CodeExecutor.TIMEOUT
-        except Exception as e:
-            return False, "", str(e), 0.0
-        finally:
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir, ignore_errors=True)
-
-    # ---------------- C++ ----------------
     @staticmethod
-    def _execute_cpp(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        temp_dir = None
-        try:
-            temp_dir = tempfile.mkdtemp()
-            src = os.path.join(temp_dir, "main.cpp")
-            binary = os.path.join(temp_dir, "main.exe" if os.name == 'nt' else "main")
-
-            with open(src, "w", encoding='utf-8') as f:
-                f.write(code)
-
-            compiler = "g++" if shutil.which("g++") else "clang++"
-            compile_proc = subprocess.run(
-                [compiler, src, "-o", binary],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
-
-            if compile_proc.returncode != 0:
-                return False, "", compile_proc.stderr, 0.0
+    def _run(cmd: List[str], cwd: str, input_data: Optional[str] = None):
+        return subprocess.run(
+            cmd,
+            input=input_data,
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            cwd=cwd,
+            timeout=CodeExecutor.TIMEOUT
+        )
 
-            start = time.time()
-            run_proc = subprocess.run(
-                [binary],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
-            execution_time = time.time() - start
-            return run_proc.returncode == 0, run_proc.stdout, run_proc.stderr, execution_time
-        except FileNotFoundError:
-            return False, "", "C++ compiler (g++/clang++) is not installed or not found in PATH.", 0.0
-        except subprocess.TimeoutExpired:
-            return False, "", "Execution timeout exceeded (5s)", CodeExecutor.TIMEOUT
-        except Exception as e:
-            return False, "", str(e), 0.0
-        finally:
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir, ignore_errors=True)
-
-    # ---------------- C ----------------
     @staticmethod
-    def _execute_c(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        temp_dir = None
-        try:
-            temp_dir = tempfile.mkdtemp()
-            src = os.path.join(temp_dir, "main.c")
-            binary = os.path.join(temp_dir, "main.exe" if os.name == 'nt' else "main")
-
-            with open(src, "w", encoding='utf-8') as f:
-                f.write(code)
-
-            compiler = "gcc" if shutil.which("gcc") else "clang"
-            compile_proc = subprocess.run(
-                [compiler, src, "-o", binary],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
+    def _run_metered(cmd: List[str], cwd: str, input_data: str,
+                     rlimits: Dict[str, int]) -> Tuple[int, str, str, Optional[ResourceUsage]]:
+        """Run a program under `rlimits` and reap it with wait4() for its resource usage"""
+        if os.name == 'nt':
+            result = CodeExecutor._run(cmd, cwd, input_data)
+            return result.returncode, result.stdout, result.stderr, None
+        floor_r, floor_w = os.pipe()
+
+        def preexec():
+            apply_rlimits(rlimits)
+            # Linux carries the child's peak RSS over exec: report it as the program's floor
+            floor = peak_rss_kb()
+            if floor is not None:
+                os.write(floor_w, str(floor).encode('ascii'))
 
-            if compile_proc.returncode != 0:
-                return False, "", compile_proc.stderr, 0.0
-
-            start = time.time()
-            run_proc = subprocess.run(
-                [binary],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
-            execution_time = time.time() - start
-            return run_proc.returncode == 0, run_proc.stdout, run_proc.stderr, execution_time
-        except FileNotFoundError:
-            return False, "", "C compiler (gcc/clang) is not installed or not found in PATH.", 0.0
-        except subprocess.TimeoutExpired:
-            return False, "", "Execution timeout exceeded (5s)", CodeExecutor.TIMEOUT
-        except Exception as e:
-            return False, "", str(e), 0.0
-        finally:
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir, ignore_errors=True)
-
-    # ---------------- GO ----------------
-    @staticmethod
-    def _execute_go(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        temp_file = None
         try:
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".go", delete=False, encoding='utf-8') as f:
-                f.write(code)
-                temp_file = f.name
-
-            start = time.time()
-            result = subprocess.run(
-                ["go", "run", temp_file],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
-            execution_time = time.time() - start
-            return result.returncode == 0, result.stdout, result.stderr, execution_time
-        except FileNotFoundError:
-            return False, "", "Go compiler (go) is not installed or not found in PATH.", 0.0
-        except subprocess.TimeoutExpired:
-            return False, "", "Execution timeout exceeded (5s)", CodeExecutor.TIMEOUT
-        except Exception as e:
-            return False, "", str(e), 0.0
-        finally:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except Exception:
-                    pass
-
-    # ---------------- RUST ----------------
-    @staticmethod
-    def _execute_rust(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        temp_dir = None
-        try:
-            temp_dir = tempfile.mkdtemp()
-            src = os.path.join(temp_dir, "main.rs")
-            binary = os.path.join(temp_dir, "main.exe" if os.name == 'nt' else "main")
-
-            with open(src, "w", encoding='utf-8') as f:
-                f.write(code)
-
-            compile_proc = subprocess.run(
-                ["rustc", src, "-o", binary],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
-
-            if compile_proc.returncode != 0:
-                return False, "", compile_proc.stderr, 0.0
-
-            start = time.time()
-            run_proc = subprocess.run(
-                [binary],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
-            execution_time = time.time() - start
-            return run_proc.returncode == 0, run_proc.stdout, run_proc.stderr, execution_time
-        except FileNotFoundError:
-            return False, "", "Rust compiler (rustc) is not installed or not found in PATH.", 0.0
-        except subprocess.TimeoutExpired:
-            return False, "", "Execution timeout exceeded (5s)", CodeExecutor.TIMEOUT
-        except Exception as e:
-            return False, "", str(e), 0.0
-        finally:
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir, ignore_errors=True)
-
-    # ---------------- BASH / SHELL ----------------
-    @staticmethod
-    def _execute_bash(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        try:
-            bash_bin = shutil.which("bash") or shutil.which("sh")
-            if bash_bin:
-                cmd = [bash_bin, "-c", code]
-            elif os.name == 'nt':
-                cmd = ["cmd.exe", "/c", code]
-            else:
-                return False, "", "Bash shell runtime not found.", 0.0
-
-            start = time.time()
-            result = subprocess.run(
+            proc = subprocess.Popen(
                 cmd,
-                input=input_data,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
-            execution_time = time.time() - start
-            return result.returncode == 0, result.stdout, result.stderr, execution_time
-        except subprocess.TimeoutExpired:
-            return False, "", "Execution timeout exceeded (5s)", CodeExecutor.TIMEOUT
-        except Exception as e:
-            return False, "", str(e), 0.0
-
-    # ---------------- RUBY ----------------
-    @staticmethod
-    def _execute_ruby(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        temp_file = None
-        try:
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".rb", delete=False, encoding='utf-8') as f:
-                f.write(code)
-                temp_file = f.name
-
-            start = time.time()
-            result = subprocess.run(
-                ["ruby", temp_file],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=cwd,
+                preexec_fn=preexec,
+                start_new_session=True
             )
-            execution_time = time.time() - start
-            return result.returncode == 0, result.stdout, result.stderr, execution_time
-        except FileNotFoundError:
-            return False, "", "Ruby runtime is not installed or not found in PATH.", 0.0
-        except Exception as e:
-            return False, "", str(e), 0.0
+        except BaseException:
+            os.close(floor_r)
+            raise
         finally:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except Exception:
-                    pass
-
-    # ---------------- PHP ----------------
-    @staticmethod
-    def _execute_php(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        temp_file = None
+            os.close(floor_w)
         try:
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".php", delete=False, encoding='utf-8') as f:
-                f.write(code)
-                temp_file = f.name
-
-            start = time.time()
-            result = subprocess.run(
-                ["php", temp_file],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
-            )
-            execution_time = time.time() - start
-            return result.returncode == 0, result.stdout, result.stderr, execution_time
-        except FileNotFoundError:
-            return False, "", "PHP runtime is not installed or not found in PATH.", 0.0
-        except Exception as e:
-            return False, "", str(e), 0.0
-        finally:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except Exception:
-                    pass
+            stdout, stderr = _pump(proc, input_data.encode('utf-8'), CodeExecutor.TIMEOUT)
+        except BaseException:
+            os.close(floor_r)
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+            proc.wait()
+            for stream in (proc.stdin, proc.stdout, proc.stderr):
+                stream.close()
+            raise
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        with os.fdopen(floor_r, 'rb') as f:
+            floor = f.read()
+        rss_floor_kb = int(floor) if floor else None
+        return (
+            proc.returncode,
+            stdout.decode('utf-8', errors='replace'),
+            stderr.decode('utf-8', errors='replace'),
+            ResourceUsage.from_rusage(rusage, proc.returncode, rss_floor_kb)
+        )
 
-    # ---------------- R ----------------
     @staticmethod
-    def _execute_r(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        temp_file = None
+    def _execute_plan(plan: ExecutionPlan, code: str, input_data: str) -> ExecutionResult:
+        workspaces = CodeExecutor.workspaces or default_pool()
+        temp_dir = None
+        cache = CodeExecutor.artifact_cache
         try:
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".R", delete=False, encoding='utf-8') as f:
-                f.write(code)
-                temp_file = f.name
+            temp_dir = workspaces.acquire()
+            paths = prepare(plan, code, temp_dir)
+
+            compile_time = 0.0
+            key = cache_key(cache, plan, code)
+            cache_hit = key is not None and cache.fetch(key, temp_dir)
+            if plan.compile and not cache_hit:
+                start = time.time()
+                compile_proc = CodeExecutor._run(command(plan.compile, paths), temp_dir)
+                compile_time = time.time() - start
+                if compile_proc.returncode != 0:
+                    return ExecutionResult(False, "", compile_proc.stderr, 0.0, compile_time, compile_error=True)
+                if key is not None:
+                    cache.store(key, artifact_files(plan, paths))
 
             start = time.time()
-            result = subprocess.run(
-                ["Rscript", temp_file],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=CodeExecutor.TIMEOUT
+            returncode, stdout, stderr, usage = CodeExecutor._run_metered(
+                command(plan.run, paths), temp_dir, input_data, plan_rlimits(CodeExecutor.limits, plan)
             )
             execution_time = time.time() - start
-            return result.returncode == 0, result.stdout, result.stderr, execution_time
+            return ExecutionResult(
+                returncode == 0, stdout, with_exit_signal(stderr, usage), execution_time,
+                compile_time, cache_hit, usage
+            )
         except FileNotFoundError:
-            return False, "", "Rscript is not installed or not found in PATH.", 0.0
+            return ExecutionResult(False, "", plan.missing or "Runtime not found in PATH.", 0.0)
+        except subprocess.TimeoutExpired:
+            return ExecutionResult(False, "", TIMEOUT_MESSAGE, CodeExecutor.TIMEOUT, timed_out=True)
         except Exception as e:
-            return False, "", str(e), 0.0
+            return ExecutionResult(False, "", str(e), 0.0)
         finally:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except Exception:
-                    pass
-
-    # ---------------- SQL ----------------
-    @staticmethod
-    def _execute_sql(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        import sqlite3
-        try:
-            start = time.time()
-            conn = sqlite3.connect(":memory:")
-            cursor = conn.cursor()
-            output_lines = []
-
-            statements = [s.strip() for s in code.split(';') if s.strip()]
-            for stmt in statements:
-                cursor.execute(stmt)
-                rows = cursor.fetchall()
-                if rows:
-                    for r in rows:
-                        output_lines.append(str(r))
-
-            conn.commit()
-            conn.close()
-            execution_time = time.time() - start
-            output_str = "\n".join(output_lines) if output_lines else "Query executed successfully."
-            return True, output_str + "\n", "", execution_time
-        except Exception as e:
-            return False, "", str(e), 0.0
-
-    # ---------------- CSHARP ----------------
-    @staticmethod
-    def _execute_csharp(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        return False, "", "C# (.NET) compiler not installed or not found in PATH.", 0.0
-
-    # ---------------- KOTLIN ----------------
-    @staticmethod
-    def _execute_kotlin(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        return False, "", "Kotlin compiler (kotlinc) not installed or not found in PATH.", 0.0
-
-    # ---------------- SCALA ----------------
-    @staticmethod
-    def _execute_scala(code: str, input_data: str) -> Tuple[bool, str, str, float]:
-        return False, "", "Scala compiler (scalac) not installed or not found in PATH.", 0.0
\ No newline at end of file
+            if temp_dir:
+                workspaces.release(temp_dir)
@@ -0,0 +1,234 @@
+"""Fork server behind compiler_service.launcher.
+
+Imports the commonly used standard library once, then forks a child for
+every request received on the control socket (a SOCK_SEQPACKET passed as
+argv[1]). A request is a JSON object ({"rlimits", "argv", "cwd"}) carrying
+three file descriptors that become the child's stdin, stdout and stderr;
+the reply is the child's pid. Its exit status and resource usage (from
+wait4) are reported once it has been reaped, along with the peak RSS the
+child had just before its command or program started: Linux counts that
+in the child's peak, so it is the floor of max_rss_kb.
+
+The child applies `rlimits` ({"RLIMIT_CPU": seconds, ...}) to itself. With
+an `argv` it then executes that command in `cwd`. Without one it is a
+Python worker: it blocks until its program arrives on stdin, as one JSON
+header line ({"cwd", "filename", "size"}), `size` bytes of UTF-8 source,
+and whatever follows is the program's own stdin. The program runs as
+__main__ and the worker exits with it; a worker never runs twice.
+"""
+import json
+import linecache
+import os
+import resource
+import select
+import signal
+import socket
+import sys
+import traceback
+import types
+from typing import Optional, Tuple
+
+# Preloaded so that programs do not pay for them; keep to pure stdlib
+import array  # noqa: F401
+import bisect  # noqa: F401
+import collections  # noqa: F401
+import copy  # noqa: F401
+import datetime  # noqa: F401
+import decimal  # noqa: F401
+import fractions  # noqa: F401
+import functools  # noqa: F401
+import heapq  # noqa: F401
+import itertools  # noqa: F401
+import math  # noqa: F401
+import operator  # noqa: F401
+import random  # noqa: F401
+import re  # noqa: F401
+import statistics  # noqa: F401
+import string  # noqa: F401
+import typing  # noqa: F401
+
+
+# ---------------- Worker ----------------
+
+def _read_exact(size: int) -> bytes:
+    # os.read, not sys.stdin: nothing past the source may be buffered here
+    chunks = []
+    while size > 0:
+        chunk = os.read(0, size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _read_line() -> bytes:
+    line = bytearray()
+    while True:
+        byte = os.read(0, 1)
+        if not byte or byte == b"\n":
+            return bytes(line)
+        line += byte
+
+
+def _report_floor(fd: int):
+    """Send our peak RSS so far to the server: the floor of our max_rss_kb"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    os.write(fd, line.split()[1].encode('ascii'))
+                    break
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def run_program(floor: int):
+    header = _read_line()
+    if not header:
+        sys.exit(0)
+    request = json.loads(header)
+    source = _read_exact(request['size']).decode('utf-8', errors='replace')
+    filename = request.get('filename', 'main.py')
+    os.chdir(request['cwd'])
+
+    module = types.ModuleType('__main__')
+    module.__file__ = filename
+    sys.modules['__main__'] = module
+    sys.argv = [filename]
+    sys.path[0] = request['cwd']
+    # Tracebacks quote the source as if it had been read from a file
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+
+    try:
+        code = compile(source, filename, 'exec')
+        _report_floor(floor)
+        exec(code, module.__dict__)
+    except SystemExit:
+        raise
+    except BaseException as e:
+        # Report it like `python main.py` would, without this file's frames
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        sys.exit(1)
+    sys.exit(0)
+
+
+# ---------------- Fork server ----------------
+
+def _send(control: socket.socket, message: dict):
+    control.send(json.dumps(message).encode('utf-8'))
+
+
+def _read_floor(fd: Optional[int], max_rss_kb: int) -> Optional[int]:
+    if fd is None:
+        return None
+    try:
+        # The child has exited: whatever it wrote is there, or nothing
+        data = os.read(fd, 32)
+    finally:
+        os.close(fd)
+    # The kernel's RSS counters are approximate; they can disagree by a few pages
+    return min(int(data), max_rss_kb) if data else None
+
+
+def _reap(control: socket.socket, floors: dict):
+    while True:
+        try:
+            pid, status, usage = os.wait4(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        _send(control, {
+            'exit': pid,
+            'status': os.waitstatus_to_exitcode(status),
+            'user_time': usage.ru_utime,
+            'system_time': usage.ru_stime,
+            'max_rss_kb': usage.ru_maxrss,
+            'rss_floor_kb': _read_floor(floors.pop(pid, None), usage.ru_maxrss),
+        })
+
+
+def _child(request: dict, floor: int):
+    # Same rules as compiler_service.limits.apply_rlimits
+    for name, value in (request.get('rlimits') or {}).items():
+        which = getattr(resource, name)
+        ceiling = resource.getrlimit(which)[1]
+        hard = value + 1 if name == 'RLIMIT_CPU' else value
+        if ceiling != resource.RLIM_INFINITY:
+            value, hard = min(value, ceiling), min(hard, ceiling)
+        resource.setrlimit(which, (value, hard))
+    argv = request.get('argv')
+    if not argv:
+        run_program(floor)
+    # What Python ignores for itself, as subprocess's restore_signals does
+    for signum in (signal.SIGPIPE, signal.SIGXFSZ):
+        signal.signal(signum, signal.SIG_DFL)
+    try:
+        os.chdir(request['cwd'])
+        _report_floor(floor)
+        os.execvp(argv[0], argv)
+    except OSError as e:
+        os.write(2, f"{argv[0]}: {e.strerror}\n".encode('utf-8', errors='replace'))
+    os._exit(127)
+
+
+def _fork(control: socket.socket, wakeup, request: dict, fds) -> Tuple[int, int]:
+    """Returns the child's pid and the pipe its floor arrives on"""
+    floor_r, floor_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child: its own session, so the whole group can be killed
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            for fd in wakeup:
+                os.close(fd)
+            control.close()
+            os.close(floor_r)
+            os.setsid()
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            _child(request, floor_w)
+        except SystemExit:
+            raise
+        except BaseException:
+            traceback.print_exc()
+            os._exit(127)
+    for fd in fds + [floor_w]:
+        os.close(fd)
+    return pid, floor_r
+
+
+def serve(control: socket.socket):
+    # SIGCHLD only wakes the loop up; children are reaped here, between
+    # requests, so an exit is never reported before the pid it belongs to
+    # and none is missed while the loop is blocked
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    floors = {}
+    while True:
+        readable, _, _ = select.select([control, wakeup_r], [], [])
+        if wakeup_r in readable:
+            try:
+                os.read(wakeup_r, 4096)
+            except BlockingIOError:
+                pass
+            _reap(control, floors)
+        if control in readable:
+            message, fds, _, _ = socket.recv_fds(control, 65536, 3)  # launcher.MAX_REQUEST
+            if not message:
+                return
+            pid, floor = _fork(control, (wakeup_r, wakeup_w), json.loads(message), fds)
+            floors[pid] = floor
+            _send(control, {'pid': pid})
+
+
+if __name__ == '__main__':
+    serve(socket.socket(fileno=int(sys.argv[1])))
@@ -0,0 +1,650 @@
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.DataInputStream;
+import java.io.DataOutputStream;
+import java.io.EOFException;
+import java.io.FileDescriptor;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.FilePermission;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.io.StringWriter;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.lang.reflect.Modifier;
+import java.net.URI;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.InvalidPathException;
+import java.nio.file.LinkPermission;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+import java.security.MessageDigest;
+import java.security.Permission;
+import java.util.ArrayList;
+import java.util.Collections;
+import java.util.HashMap;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Locale;
+import java.util.Map;
+import java.util.Set;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.TimeUnit;
+import javax.tools.FileObject;
+import javax.tools.ForwardingJavaFileManager;
+import javax.tools.JavaCompiler;
+import javax.tools.JavaFileManager;
+import javax.tools.JavaFileObject;
+import javax.tools.SimpleJavaFileObject;
+import javax.tools.StandardJavaFileManager;
+import javax.tools.ToolProvider;
+
+/**
+ * Resident compile-and-run service behind compiler_service.java_daemon.
+ *
+ * Requests arrive on stdin and responses leave on stdout, each framed as a
+ * 4-byte big-endian length followed by the message. Every submission is
+ * compiled in memory, loaded by its own class loader (so static state never
+ * carries over) and run on its own thread, with System.in, System.out and
+ * System.err routed to that submission and output capped. A submission that
+ * overruns its time limit cannot be stopped safely: the daemon answers, the
+ * client sends it no more work and closes stdin, and once the submissions
+ * already running have answered the daemon exits; the client starts a new
+ * one.
+ */
+public final class RunnerDaemon {
+
+    static final int CACHE_ENTRIES = 256;
+    static final List<String> JAVAC_OPTIONS = List.of("-proc:none", "-Xlint:none");
+
+    static final InheritableThreadLocal<Session> SESSION = new InheritableThreadLocal<>();
+
+    // Compiled classes by source hash, least recently used evicted first
+    static final Map<String, Map<String, byte[]>> CACHE = Collections.synchronizedMap(
+        new LinkedHashMap<String, Map<String, byte[]>>(16, 0.75f, true) {
+            @Override
+            protected boolean removeEldestEntry(Map.Entry<String, Map<String, byte[]>> eldest) {
+                return size() > CACHE_ENTRIES;
+            }
+        });
+
+    private static JavaCompiler javac;
+    private static StandardJavaFileManager standardFiles;
+    private static DataOutputStream responses;
+
+    // ---------------- Sessions ----------------
+
+    static final class OutputLimitExceeded extends Error {
+        OutputLimitExceeded() {
+            super("Output limit exceeded", null, false, false);
+        }
+    }
+
+    static final class ExitTrap extends SecurityException {
+        final int status;
+
+        ExitTrap(int status) {
+            super("System.exit(" + status + ")");
+            this.status = status;
+        }
+    }
+
+    /** One running submission: its stdin, captured output and outcome */
+    static final class Session {
+        final InputStream stdin;
+        final ByteArrayOutputStream stdout = new ByteArrayOutputStream();
+        final ByteArrayOutputStream stderr = new ByteArrayOutputStream();
+        final PrintStream out = new PrintStream(new Capture(this, false), true, StandardCharsets.UTF_8);
+        final PrintStream err = new PrintStream(new Capture(this, true), true, StandardCharsets.UTF_8);
+        final long limit;
+        long written;
+        volatile boolean limitExceeded;
+        volatile Integer exitStatus;
+        volatile int exitCode = 1;
+
+        Session(byte[] input, long limit) {
+            this.stdin = new ByteArrayInputStream(input);
+            this.limit = limit;
+        }
+
+        synchronized void write(boolean toErr, byte[] b, int off, int len) {
+            long allowed = Math.max(0, Math.min(len, limit - written));
+            (toErr ? stderr : stdout).write(b, off, (int) allowed);
+            written += allowed;
+            if (allowed < len) {
+                limitExceeded = true;
+                throw new OutputLimitExceeded();
+            }
+        }
+
+        void finish(Throwable failure) {
+            if (failure == null) {
+                exitCode = exitStatus != null ? exitStatus : 0;
+            } else if (failure instanceof ExitTrap) {
+                exitCode = ((ExitTrap) failure).status;
+            } else if (exitStatus != null) {
+                exitCode = exitStatus;
+            } else {
+                exitCode = 1;
+                if (!limitExceeded && !(failure instanceof OutputLimitExceeded)) {
+                    try {
+                        err.print("Exception in thread \"main\" ");
+                        trimStackTrace(failure);
+                        failure.printStackTrace(err);
+                    } catch (OutputLimitExceeded ignored) {
+                        // Nothing more fits; the limit is reported instead
+                    }
+                }
+            }
+            out.flush();
+            err.flush();
+        }
+
+        String stdoutText() {
+            synchronized (this) {
+                return new String(stdout.toByteArray(), StandardCharsets.UTF_8);
+            }
+        }
+
+        String stderrText() {
+            synchronized (this) {
+                return new String(stderr.toByteArray(), StandardCharsets.UTF_8);
+            }
+        }
+    }
+
+    static final class Capture extends OutputStream {
+        private final Session session;
+        private final boolean toErr;
+
+        Capture(Session session, boolean toErr) {
+            this.session = session;
+            this.toErr = toErr;
+        }
+
+        @Override
+        public void write(int b) {
+            session.write(toErr, new byte[] {(byte) b}, 0, 1);
+        }
+
+        @Override
+        public void write(byte[] b, int off, int len) {
+            session.write(toErr, b, off, len);
+        }
+    }
+
+    /** Drop the reflection frames below the program's own main */
+    static void trimStackTrace(Throwable failure) {
+        StackTraceElement[] frames = failure.getStackTrace();
+        int end = frames.length;
+        for (int i = 0; i < frames.length; i++) {
+            String name = frames[i].getClassName();
+            if (name.startsWith("jdk.internal.reflect.") || name.startsWith("java.lang.reflect.")
+                    || name.startsWith(RunnerDaemon.class.getName())) {
+                end = i;
+                break;
+            }
+        }
+        if (end > 0 && end < frames.length) {
+            StackTraceElement[] kept = new StackTraceElement[end];
+            System.arraycopy(frames, 0, kept, 0, end);
+            failure.setStackTrace(kept);
+        }
+    }
+
+    // ---------------- Routed standard streams ----------------
+
+    /** System.out / System.err: the current submission's stream, else the daemon's stderr */
+    static final class RoutedPrintStream extends PrintStream {
+        private final boolean toErr;
+        private final PrintStream fallback;
+
+        RoutedPrintStream(boolean toErr, PrintStream fallback) {
+            super(fallback, true);
+            this.toErr = toErr;
+            this.fallback = fallback;
+        }
+
+        private PrintStream target() {
+            Session session = SESSION.get();
+            if (session == null) {
+                return fallback;
+            }
+            return toErr ? session.err : session.out;
+        }
+
+        @Override public void write(int b) { target().write(b); }
+        @Override public void write(byte[] b, int off, int len) { target().write(b, off, len); }
+        @Override public void write(byte[] b) throws IOException { target().write(b); }
+        @Override public void flush() { target().flush(); }
+        @Override public void close() { target().flush(); }
+        @Override public boolean checkError() { return target().checkError(); }
+        @Override public void print(boolean b) { target().print(b); }
+        @Override public void print(char c) { target().print(c); }
+        @Override public void print(int i) { target().print(i); }
+        @Override public void print(long l) { target().print(l); }
+        @Override public void print(float f) { target().print(f); }
+        @Override public void print(double d) { target().print(d); }
+        @Override public void print(char[] s) { target().print(s); }
+        @Override public void print(String s) { target().print(s); }
+        @Override public void print(Object obj) { target().print(obj); }
+        @Override public void println() { target().println(); }
+        @Override public void println(boolean x) { target().println(x); }
+        @Override public void println(char x) { target().println(x); }
+        @Override public void println(int x) { target().println(x); }
+        @Override public void println(long x) { target().println(x); }
+        @Override public void println(float x) { target().println(x); }
+        @Override public void println(double x) { target().println(x); }
+        @Override public void println(char[] x) { target().println(x); }
+        @Override public void println(String x) { target().println(x); }
+        @Override public void println(Object x) { target().println(x); }
+        @Override public PrintStream printf(String format, Object... args) { return target().printf(format, args); }
+        @Override public PrintStream printf(Locale l, String format, Object... args) { return target().printf(l, format, args); }
+        @Override public PrintStream format(String format, Object... args) { return target().format(format, args); }
+        @Override public PrintStream format(Locale l, String format, Object... args) { return target().format(l, format, args); }
+        @Override public PrintStream append(CharSequence csq) { return target().append(csq); }
+        @Override public PrintStream append(CharSequence csq, int start, int end) { return target().append(csq, start, end); }
+        @Override public PrintStream append(char c) { return target().append(c); }
+    }
+
+    /** System.in: the current submission's input, else empty */
+    static final class RoutedInput extends InputStream {
+        private static final InputStream EMPTY = new ByteArrayInputStream(new byte[0]);
+
+        private InputStream target() {
+            Session session = SESSION.get();
+            return session == null ? EMPTY : session.stdin;
+        }
+
+        @Override public int read() throws IOException { return target().read(); }
+        @Override public int read(byte[] b, int off, int len) throws IOException { return target().read(b, off, len); }
+        @Override public int available() throws IOException { return target().available(); }
+        @Override public void close() { }
+    }
+
+    /**
+     * Turns System.exit in a submission into an exception, and keeps submissions away from
+     * the daemon's own stdin/stdout, which carry the protocol for every submission: no
+     * replacing the global streams, no opening standard file descriptors (directly, or as
+     * /dev or /proc paths, or through a symlink), and no reflecting into this class.
+     */
+    @SuppressWarnings("removal")
+    static final class ExitGuard extends SecurityManager {
+        static final Set<String> DEVICES = Set.of("/dev/null", "/dev/zero", "/dev/random", "/dev/urandom");
+        static final Set<String> DENIED = Set.of(
+            "setIO", "readFileDescriptor", "writeFileDescriptor", "accessDeclaredMembers", "setSecurityManager");
+
+        static boolean isSpecialFile(String name) {
+            Path path;
+            try {
+                path = Paths.get(name).toAbsolutePath().normalize();
+            } catch (InvalidPathException e) {
+                return true;
+            }
+            return path.startsWith("/proc") || (path.startsWith("/dev") && !DEVICES.contains(path.toString()));
+        }
+
+        /** Submission code is on the stack, even in a thread that did not inherit its session */
+        boolean inSubmission() {
+            if (SESSION.get() != null) {
+                return true;
+            }
+            for (Class<?> caller : getClassContext()) {
+                if (caller.getClassLoader() instanceof MemoryClassLoader) {
+                    return true;
+                }
+            }
+            return false;
+        }
+
+        @Override
+        public void checkPermission(Permission perm) {
+            boolean denied = perm instanceof RuntimePermission && DENIED.contains(perm.getName())
+                    || perm instanceof FilePermission && isSpecialFile(perm.getName())
+                    || perm instanceof LinkPermission;
+            if (denied && inSubmission()) {
+                throw new SecurityException(perm + " is not allowed");
+            }
+        }
+
+        @Override
+        public void checkPermission(Permission perm, Object context) {
+            checkPermission(perm);
+        }
+
+        @Override
+        public void checkExit(int status) {
+            Session session = SESSION.get();
+            if (session != null) {
+                session.exitStatus = status;
+                throw new ExitTrap(status);
+            }
+            if (inSubmission()) {
+                throw new SecurityException("System.exit(" + status + ") is not allowed here");
+            }
+        }
+    }
+
+    @SuppressWarnings("removal")
+    static boolean installExitGuard() {
+        try {
+            System.setSecurityManager(new ExitGuard());
+            return true;
+        } catch (UnsupportedOperationException | SecurityException e) {
+            // JDK 24+ has no security manager
+            return false;
+        }
+    }
+
+    // ---------------- Compiling ----------------
+
+    static final class MemoryFileManager extends ForwardingJavaFileManager<StandardJavaFileManager> {
+        final Map<String, ByteArrayOutputStream> classes = new HashMap<>();
+
+        MemoryFileManager(StandardJavaFileManager files) {
+            super(files);
+        }
+
+        @Override
+        public JavaFileObject getJavaFileForOutput(JavaFileManager.Location location, String className,
+                                                   JavaFileObject.Kind kind, FileObject sibling) {
+            URI uri = URI.create("mem:///" + className.replace('.', '/') + kind.extension);
+            return new SimpleJavaFileObject(uri, kind) {
+                @Override
+                public OutputStream openOutputStream() {
+                    ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+                    classes.put(className, bytes);
+                    return bytes;
+                }
+            };
+        }
+
+        @Override
+        public void close() {
+            // The standard file manager is shared between compilations
+        }
+    }
+
+    static final class SourceFile extends SimpleJavaFileObject {
+        private final String name;
+        private final String source;
+
+        SourceFile(String name, String source) {
+            super(URI.create("string:///" + name), JavaFileObject.Kind.SOURCE);
+            this.name = name;
+            this.source = source;
+        }
+
+        @Override
+        public String getName() {
+            return name;
+        }
+
+        @Override
+        public CharSequence getCharContent(boolean ignoreEncodingErrors) {
+            return source;
+        }
+    }
+
+    /** Compile one source file; null on errors, which are written to diagnostics */
+    static synchronized Map<String, byte[]> compile(String fileName, String source, StringWriter diagnostics) {
+        MemoryFileManager files = new MemoryFileManager(standardFiles);
+        Boolean ok = javac.getTask(diagnostics, files, null, JAVAC_OPTIONS, null,
+                List.of(new SourceFile(fileName, source))).call();
+        if (!Boolean.TRUE.equals(ok)) {
+            return null;
+        }
+        Map<String, byte[]> classes = new HashMap<>();
+        for (Map.Entry<String, ByteArrayOutputStream> entry : files.classes.entrySet()) {
+            classes.put(entry.getKey(), entry.getValue().toByteArray());
+        }
+        return classes;
+    }
+
+    static final class MemoryClassLoader extends ClassLoader {
+        private final Map<String, byte[]> classes;
+
+        MemoryClassLoader(Map<String, byte[]> classes) {
+            // Platform parent: submissions must not see the daemon's own classes
+            super(ClassLoader.getPlatformClassLoader());
+            this.classes = classes;
+        }
+
+        @Override
+        protected Class<?> findClass(String name) throws ClassNotFoundException {
+            byte[] bytes = classes.get(name);
+            if (bytes == null) {
+                throw new ClassNotFoundException(name);
+            }
+            return defineClass(name, bytes, 0, bytes.length);
+        }
+    }
+
+    /** The class named after the file if it has a main method, else any class that does */
+    static Method findMain(ClassLoader loader, Map<String, byte[]> classes, String fileName)
+            throws ClassNotFoundException {
+        String preferred = fileName.endsWith(".java") ? fileName.substring(0, fileName.length() - 5) : fileName;
+        List<String> names = new ArrayList<>(classes.keySet());
+        Collections.sort(names);
+        if (names.remove(preferred)) {
+            names.add(0, preferred);
+        }
+        for (String name : names) {
+            try {
+                Method main = loader.loadClass(name).getMethod("main", String[].class);
+                if (Modifier.isStatic(main.getModifiers())) {
+                    main.setAccessible(true);
+                    return main;
+                }
+            } catch (NoSuchMethodException ignored) {
+                // Not an entry point
+            }
+        }
+        return null;
+    }
+
+    static String sha256(String text) throws Exception {
+        byte[] digest = MessageDigest.getInstance("SHA-256").digest(text.getBytes(StandardCharsets.UTF_8));
+        StringBuilder hex = new StringBuilder();
+        for (byte b : digest) {
+            hex.append(String.format("%02x", b));
+        }
+        return hex.toString();
+    }
+
+    // ---------------- Requests ----------------
+
+    static final class Request {
+        int id;
+        int timeoutMs;
+        int outputLimit;
+        String fileName;
+        String source;
+        byte[] stdin;
+
+        static Request parse(byte[] frame) throws IOException {
+            DataInputStream in = new DataInputStream(new ByteArrayInputStream(frame));
+            Request request = new Request();
+            request.id = in.readInt();
+            request.timeoutMs = in.readInt();
+            request.outputLimit = in.readInt();
+            request.fileName = new String(readBytes(in), StandardCharsets.UTF_8);
+            request.source = new String(readBytes(in), StandardCharsets.UTF_8);
+            request.stdin = readBytes(in);
+            return request;
+        }
+    }
+
+    static final class Outcome {
+        final String status;
+        final int exitCode;
+        final long compileNanos;
+        final long runNanos;
+        final boolean cacheHit;
+        final String stdout;
+        final String stderr;
+
+        Outcome(String status, int exitCode, long compileNanos, long runNanos, boolean cacheHit,
+                String stdout, String stderr) {
+            this.status = status;
+            this.exitCode = exitCode;
+            this.compileNanos = compileNanos;
+            this.runNanos = runNanos;
+            this.cacheHit = cacheHit;
+            this.stdout = stdout;
+            this.stderr = stderr;
+        }
+
+        static Outcome error(String message) {
+            return new Outcome("error", 1, 0, 0, false, "", message);
+        }
+    }
+
+    static byte[] readBytes(DataInputStream in) throws IOException {
+        byte[] bytes = new byte[in.readInt()];
+        in.readFully(bytes);
+        return bytes;
+    }
+
+    static void writeString(DataOutputStream out, String text) throws IOException {
+        byte[] bytes = text.getBytes(StandardCharsets.UTF_8);
+        out.writeInt(bytes.length);
+        out.write(bytes);
+    }
+
+    static void send(int id, Outcome outcome) throws IOException {
+        ByteArrayOutputStream buffer = new ByteArrayOutputStream();
+        DataOutputStream message = new DataOutputStream(buffer);
+        message.writeInt(id);
+        writeString(message, outcome.status);
+        message.writeInt(outcome.exitCode);
+        message.writeLong(outcome.compileNanos);
+        message.writeLong(outcome.runNanos);
+        message.writeBoolean(outcome.cacheHit);
+        writeString(message, outcome.stdout);
+        writeString(message, outcome.stderr);
+        message.flush();
+        synchronized (responses) {
+            responses.writeInt(buffer.size());
+            buffer.writeTo(responses);
+            responses.flush();
+        }
+    }
+
+    static Outcome execute(Request request) throws Exception {
+        long start = System.nanoTime();
+        String key = sha256(request.fileName + "\0" + request.source);
+        Map<String, byte[]> classes = CACHE.get(key);
+        boolean cacheHit = classes != null;
+        if (!cacheHit) {
+            StringWriter diagnostics = new StringWriter();
+            classes = compile(request.fileName, request.source, diagnostics);
+            if (classes == null) {
+                return new Outcome("compile_error", 1, System.nanoTime() - start, 0, false, "",
+                        diagnostics.toString());
+            }
+            CACHE.put(key, classes);
+        }
+        long compileNanos = cacheHit ? 0 : System.nanoTime() - start;
+
+        ClassLoader loader = new MemoryClassLoader(classes);
+        Method main = findMain(loader, classes, request.fileName);
+        if (main == null) {
+            return Outcome.error("No class with a main method");
+        }
+
+        Session session = new Session(request.stdin, request.outputLimit);
+        Thread runner = new Thread(() -> {
+            SESSION.set(session);
+            Thread.currentThread().setContextClassLoader(loader);
+            Throwable failure = null;
+            try {
+                main.invoke(null, (Object) new String[0]);
+            } catch (InvocationTargetException e) {
+                failure = e.getCause();
+            } catch (Throwable t) {
+                failure = t;
+            }
+            session.finish(failure);
+        }, "main");
+        runner.setDaemon(true);
+
+        long runStart = System.nanoTime();
+        runner.start();
+        runner.join(request.timeoutMs);
+        long runNanos = System.nanoTime() - runStart;
+
+        if (runner.isAlive()) {
+            return new Outcome("timeout", -1, compileNanos, runNanos, cacheHit,
+                    session.stdoutText(), session.stderrText());
+        }
+        return new Outcome(session.limitExceeded ? "output_limit" : "ok", session.exitCode,
+                compileNanos, runNanos, cacheHit, session.stdoutText(), session.stderrText());
+    }
+
+    static void handle(Request request) {
+        Outcome outcome;
+        try {
+            outcome = execute(request);
+        } catch (Throwable t) {
+            outcome = Outcome.error(t.toString());
+        }
+        try {
+            send(request.id, outcome);
+        } catch (IOException e) {
+            // The client is gone
+            Runtime.getRuntime().halt(1);
+        }
+    }
+
+    public static void main(String[] args) throws Exception {
+        DataInputStream requests = new DataInputStream(new BufferedInputStream(new FileInputStream(FileDescriptor.in)));
+        responses = new DataOutputStream(new BufferedOutputStream(new FileOutputStream(FileDescriptor.out)));
+
+        PrintStream daemonErr = System.err;
+        System.setIn(new RoutedInput());
+        System.setOut(new RoutedPrintStream(false, daemonErr));
+        System.setErr(new RoutedPrintStream(true, daemonErr));
+
+        javac = ToolProvider.getSystemJavaCompiler();
+        if (javac == null) {
+            send(0, new Outcome("unavailable", 0, 0, 0, false, "", "No Java compiler in this runtime"));
+            return;
+        }
+        standardFiles = javac.getStandardFileManager(null, null, StandardCharsets.UTF_8);
+        if (!installExitGuard()) {
+            // Submissions could exit the daemon or write to its stdout, forging other results
+            send(0, new Outcome("unavailable", 0, 0, 0, false, "", "No security manager in this runtime"));
+            return;
+        }
+        send(0, new Outcome("ready", 1, 0, 0, false, "", ""));
+
+        ExecutorService workers = Executors.newCachedThreadPool(task -> {
+            Thread thread = new Thread(task, "runner-daemon-worker");
+            thread.setDaemon(true);
+            return thread;
+        });
+        while (true) {
+            byte[] frame;
+            try {
+                frame = new byte[requests.readInt()];
+                requests.readFully(frame);
+            } catch (EOFException e) {
+                break;
+            }
+            Request request = Request.parse(frame);
+            workers.execute(() -> handle(request));
+        }
+        // Let the submissions already running answer (each within its time limit), then
+        // exit without waiting for the threads of any that timed out
+        workers.shutdown();
+        workers.awaitTermination(1, TimeUnit.HOURS);
+        Runtime.getRuntime().halt(0);
+    }
+}
@@ -0,0 +1,308 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import time
+from typing import Dict, List, Optional, Set
+
+from compiler_service.executor import ExecutionResult
+from compiler_service.limits import ResourceLimits, apply_rlimits
+
+logger = logging.getLogger(__name__)
+
+
+DAEMON_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'java', 'RunnerDaemon.java')
+DAEMON_CLASS = 'RunnerDaemon'
+# The security manager traps System.exit and keeps submissions off the protocol streams
+# (allowed explicitly from JDK 18; JDK 24+ has none, and the daemon refuses to start)
+JVM_ARGS = ['-XX:+UseSerialGC', '-Djava.security.manager=allow']
+# Limits that hold for the daemon process as a whole; memory is capped
+# with -Xmx and CPU time per run (see JavaDaemon)
+DAEMON_RLIMITS = ('RLIMIT_FSIZE', 'RLIMIT_NPROC')
+
+
+def _string(text: str) -> bytes:
+    data = text.encode('utf-8')
+    return struct.pack('>i', len(data)) + data
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, fmt: str):
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values[0]
+
+    def string(self) -> str:
+        size = self.unpack('>i')
+        text = self.data[self.offset:self.offset + size].decode('utf-8', errors='replace')
+        self.offset += size
+        return text
+
+
+class JavaDaemon:
+    """Client for a resident JVM that compiles and runs Java submissions.
+
+    The daemon (java/RunnerDaemon.java, built with javac on first use)
+    keeps javac and the JVM warm, compiles each submission in memory and
+    runs it in its own class loader with time and output limits, so a run
+    costs milliseconds instead of two cold JVM starts. Requests are
+    multiplexed over the daemon's stdin/stdout, which its security manager
+    keeps out of the submissions' reach.
+
+    Programs share the daemon, so `limits` apply to it as a whole: the
+    memory limit becomes the JVM's -Xmx (one submission can take the heap
+    from the others running beside it), the file size and process limits
+    are set on the daemon process, and the CPU limit caps each run's time
+    limit. Threads a program starts are not limited separately.
+
+    execute() returns None whenever the daemon cannot take a submission
+    (not installed, failed to start, could not run it); the caller then
+    runs it the usual way. A submission the daemon has accepted is never
+    run a second time: if the daemon dies under it, that is its result. A
+    daemon that dies is started again on the next request, one that fails
+    to start is not retried for `retry_after` seconds.
+    """
+
+    def __init__(self, build_dir: str, output_limit: int = 1024 * 1024,
+                 jvm_args: Optional[List[str]] = None, start_timeout: float = 30.0,
+                 retry_after: float = 60.0, limits: Optional[ResourceLimits] = None):
+        self.build_dir = build_dir
+        self.output_limit = output_limit
+        self.limits = limits or ResourceLimits()
+        if jvm_args is None:
+            jvm_args = JVM_ARGS
+            if self.limits.memory_bytes is not None:
+                jvm_args = jvm_args + [f"-Xmx{max(self.limits.memory_bytes >> 20, 16)}m"]
+        self.jvm_args = jvm_args
+        self.start_timeout = start_timeout
+        self.retry_after = retry_after
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._listeners: Set[asyncio.Task] = set()
+        self._ids = itertools.count(1)
+        self._lock = asyncio.Lock()
+        self._retry_at = 0.0
+
+        # Metrics
+        self.runs = 0
+        self.fallbacks = 0
+        self.starts = 0
+        self.lost = 0
+
+    # ---------------- Lifecycle ----------------
+
+    async def _build(self) -> str:
+        """Compile the daemon once per source version; returns its class directory"""
+        with open(DAEMON_SOURCE, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:16]
+        classes = os.path.join(self.build_dir, digest)
+        if os.path.exists(os.path.join(classes, f"{DAEMON_CLASS}.class")):
+            return classes
+
+        os.makedirs(self.build_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.build_dir)
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                'javac', '-d', staging, DAEMON_SOURCE,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+            _, stderr = await proc.communicate()
+            if proc.returncode != 0:
+                raise RuntimeError(f"javac failed: {stderr.decode('utf-8', errors='replace')[:500]}")
+            try:
+                os.rename(staging, classes)
+            except OSError:
+                # Built concurrently by another process
+                pass
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return classes
+
+    async def _start(self):
+        classes = await self._build()
+        proc = await asyncio.create_subprocess_exec(
+            'java', *self.jvm_args, '-cp', classes, DAEMON_CLASS,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE
+        )
+        try:
+            # Set before any submission runs. HotSpot ignores SIGXFSZ, so an
+            # oversized file fails the write instead of killing the daemon.
+            rlimits = {name: value for name, value in self.limits.rlimits().items() if name in DAEMON_RLIMITS}
+            if rlimits:
+                apply_rlimits(rlimits, proc.pid)
+            ready = self._parse(await asyncio.wait_for(self._read_frame(proc), self.start_timeout))
+            if ready[1] != 'ready':
+                raise RuntimeError(ready[7] or f"daemon answered {ready[1]}")
+        except BaseException:
+            if proc.returncode is None:
+                proc.kill()
+            await proc.wait()
+            raise
+        self._proc = proc
+        self._pending = {}
+        listener = asyncio.create_task(self._listen(proc, self._pending))
+        self._listeners.add(listener)
+        listener.add_done_callback(self._listeners.discard)
+        self.starts += 1
+
+    def _retire(self, proc: asyncio.subprocess.Process):
+        """Send no more work to this daemon; it exits once what it is running has answered"""
+        if self._proc is proc:
+            self._proc = None
+        if not proc.stdin.is_closing():
+            proc.stdin.close()
+
+    async def _ensure_started(self) -> bool:
+        if self._proc is not None and self._proc.returncode is None:
+            return True
+        async with self._lock:
+            if self._proc is not None and self._proc.returncode is None:
+                return True
+            if time.monotonic() < self._retry_at:
+                return False
+            try:
+                await self._start()
+                return True
+            except Exception as e:
+                self._retry_at = time.monotonic() + self.retry_after
+                logger.warning(f"Java daemon unavailable, using javac/java per run: {str(e)}")
+                return False
+
+    async def start(self):
+        await self._ensure_started()
+
+    async def close(self):
+        proc = self._proc
+        self._proc = None
+        if proc is not None and proc.returncode is None:
+            proc.stdin.close()
+            try:
+                await asyncio.wait_for(proc.wait(), 5)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+        await asyncio.gather(*self._listeners, return_exceptions=True)
+
+    # ---------------- Protocol ----------------
+
+    @staticmethod
+    async def _read_frame(proc: asyncio.subprocess.Process) -> bytes:
+        size = struct.unpack('>i', await proc.stdout.readexactly(4))[0]
+        return await proc.stdout.readexactly(size)
+
+    @staticmethod
+    def _parse(frame: bytes):
+        reader = _Reader(frame)
+        return (
+            reader.unpack('>i'),      # request id
+            reader.string(),          # status
+            reader.unpack('>i'),      # exit code
+            reader.unpack('>q'),      # compile ns
+            reader.unpack('>q'),      # run ns
+            reader.unpack('>?'),      # cache hit
+            reader.string(),          # stdout
+            reader.string(),          # stderr
+        )
+
+    async def _listen(self, proc: asyncio.subprocess.Process, pending: Dict[int, asyncio.Future]):
+        try:
+            while True:
+                response = self._parse(await self._read_frame(proc))
+                waiter = pending.pop(response[0], None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(response)
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error):
+            pass
+        finally:
+            self._retire(proc)
+            if proc.returncode is None:
+                proc.kill()
+            await proc.wait()
+            # Whatever was still running went down with the daemon
+            for waiter in pending.values():
+                if not waiter.done():
+                    waiter.set_result(None)
+            pending.clear()
+
+    # ---------------- Public API ----------------
+
+    async def execute(self, code: str, input_data: str, source_name: str, timeout: float,
+                      compile_timeout: float) -> Optional[ExecutionResult]:
+        """Run a Java submission in the daemon; None means use the subprocess path"""
+        if not await self._ensure_started():
+            self.fallbacks += 1
+            return None
+
+        proc, pending = self._proc, self._pending
+        if self.limits.cpu_seconds is not None:
+            # A program's CPU time is at most its wall time, threads aside
+            timeout = min(timeout, self.limits.cpu_seconds)
+        request_id = next(self._ids)
+        payload = (
+            struct.pack('>iii', request_id, int(timeout * 1000), self.output_limit)
+            + _string(source_name) + _string(code) + _string(input_data or "")
+        )
+        waiter = asyncio.get_running_loop().create_future()
+        pending[request_id] = waiter
+        sent = False
+        try:
+            proc.stdin.write(struct.pack('>i', len(payload)) + payload)
+            await proc.stdin.drain()
+            sent = True
+            response = await asyncio.wait_for(waiter, timeout + compile_timeout + 5)
+        except asyncio.TimeoutError:
+            # The daemon stopped answering; start over with a fresh one
+            logger.error("Java daemon did not answer in time, restarting it")
+            self._retire(proc)
+            proc.kill()
+            return ExecutionResult(False, "", f"Execution timeout exceeded ({timeout:g}s)", timeout,
+                                   timed_out=True)
+        except (ConnectionError, RuntimeError):
+            response = None
+        finally:
+            pending.pop(request_id, None)
+
+        if response is None and not sent:
+            self.fallbacks += 1
+            return None
+        if response is None:
+            # It may have run, and running it again could repeat what it did
+            self.lost += 1
+            return ExecutionResult(False, "", "Java daemon exited while running the program", 0.0)
+        _, status, exit_code, compile_ns, run_ns, cache_hit, stdout, stderr = response
+        compile_time = compile_ns / 1e9
+        run_time = run_ns / 1e9
+        if status == 'error':
+            logger.warning(f"Java daemon could not run a submission: {stderr}")
+            self.fallbacks += 1
+            return None
+
+        self.runs += 1
+        if status == 'compile_error':
+            return ExecutionResult(False, "", stderr, 0.0, compile_time, compile_error=True)
+        if status == 'timeout':
+            # The runaway thread cannot be stopped: the daemon exits once the rest have answered
+            self._retire(proc)
+            return ExecutionResult(False, "", f"Execution timeout exceeded ({timeout:g}s)", timeout,
+                                   compile_time, cache_hit, timed_out=True)
+        if status == 'output_limit':
+            stderr += f"\nOutput limit exceeded ({self.output_limit} bytes)"
+            return ExecutionResult(False, stdout, stderr, run_time, compile_time, cache_hit)
+        return ExecutionResult(exit_code == 0, stdout, stderr, run_time, compile_time, cache_hit)
+
+    def metrics(self) -> dict:
+        return {
+            'running': self._proc is not None and self._proc.returncode is None,
+            'runs': self.runs,
+            'fallbacks': self.fallbacks,
+            'starts': self.starts,
+            'lost': self.lost,
+        }
@@ -0,0 +1,69 @@
+import signal
+from typing import List, NamedTuple, Optional
+
+from compiler_service.executor import ExecutionResult
+
+
+ACCEPTED = 'accepted'
+WRONG_ANSWER = 'wrong_answer'
+RUNTIME_ERROR = 'runtime_error'
+TIME_LIMIT_EXCEEDED = 'time_limit_exceeded'
+COMPILE_ERROR = 'compile_error'
+# Not run, because an earlier case failed and the batch stopped
+SKIPPED = 'skipped'
+
+SIGXCPU = getattr(signal, 'SIGXCPU', None)
+
+
+class JudgeCase(NamedTuple):
+    input_data: str = ""
+    # None only checks that the program runs successfully
+    expected_output: Optional[str] = None
+
+
+class CaseResult(NamedTuple):
+    verdict: str
+    result: Optional[ExecutionResult] = None
+
+
+class JudgeResult(NamedTuple):
+    verdict: str
+    cases: List[CaseResult]
+    compile_time: float = 0.0
+    cache_hit: bool = False
+    compile_error: Optional[str] = None
+
+
+def _normalize(text: str, ignore_whitespace: bool) -> List[str]:
+    if ignore_whitespace:
+        return text.split()
+    # Line endings, trailing spaces and trailing blank lines never count
+    lines = [line.rstrip() for line in text.replace('\r\n', '\n').split('\n')]
+    while lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def outputs_match(actual: str, expected: str, ignore_whitespace: bool = False) -> bool:
+    """Compare line by line, or token by token with ignore_whitespace"""
+    return _normalize(actual, ignore_whitespace) == _normalize(expected, ignore_whitespace)
+
+
+def case_verdict(result: ExecutionResult, expected: Optional[str], ignore_whitespace: bool = False) -> str:
+    if result.compile_error:
+        return COMPILE_ERROR
+    if result.timed_out or (result.usage is not None and result.usage.exit_signal == SIGXCPU):
+        return TIME_LIMIT_EXCEEDED
+    if not result.success:
+        return RUNTIME_ERROR
+    if expected is not None and not outputs_match(result.stdout, expected, ignore_whitespace):
+        return WRONG_ANSWER
+    return ACCEPTED
+
+
+def overall_verdict(cases: List[CaseResult]) -> str:
+    """The first case that did not pass decides"""
+    for case in cases:
+        if case.verdict not in (ACCEPTED, SKIPPED):
+            return case.verdict
+    return ACCEPTED
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from compiler_service.limits import ResourceUsage
+
+logger = logging.getLogger(__name__)
+
+
+FORK_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fork_server.py')
+# Largest request the fork server reads in one datagram
+MAX_REQUEST = 65536
+
+
+async def _write_all(fd: int, data: bytes):
+    loop = asyncio.get_running_loop()
+    view = memoryview(data)
+    try:
+        while view:
+            try:
+                view = view[os.write(fd, view):]
+            except BlockingIOError:
+                ready = loop.create_future()
+                loop.add_writer(fd, lambda: ready.done() or ready.set_result(None))
+                try:
+                    await ready
+                finally:
+                    loop.remove_writer(fd)
+    except BrokenPipeError:
+        # The program exited without reading all of its input
+        pass
+    finally:
+        os.close(fd)
+
+
+async def _read_all(fd: int) -> bytes:
+    loop = asyncio.get_running_loop()
+    chunks = []
+    try:
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except BlockingIOError:
+                ready = loop.create_future()
+                loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+                try:
+                    await ready
+                finally:
+                    loop.remove_reader(fd)
+                continue
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+
+
+def _kill(pid: int):
+    """SIGKILL a child's process group, or the child itself if it has none yet"""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        # Between fork and setsid its group does not exist yet
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    except PermissionError:
+        pass
+
+
+class ForkedProcess:
+    """A child of the fork server.
+
+    Quacks like asyncio.subprocess.Process as far as LocalCompiler needs:
+    pid, returncode, communicate(), wait() and kill(). Once it has exited,
+    `usage` holds what it used.
+    """
+
+    def __init__(self, pid: int, stdin: int, stdout: int, stderr: int, exited: asyncio.Future):
+        self.pid = pid
+        self.returncode: Optional[int] = None
+        self.usage: Optional[ResourceUsage] = None
+        self._fds = (stdin, stdout, stderr)
+        self._exited = exited
+
+    async def communicate(self, input: Optional[bytes] = None) -> Tuple[bytes, bytes]:
+        stdin, stdout, stderr = self._fds
+        _, out, err = await asyncio.gather(
+            _write_all(stdin, input or b""), _read_all(stdout), _read_all(stderr)
+        )
+        await self.wait()
+        return out, err
+
+    async def wait(self) -> int:
+        self.returncode, self.usage = await asyncio.shield(self._exited)
+        return self.returncode
+
+    def exited(self) -> bool:
+        """True once it is known to be gone, even if nobody waited for it"""
+        return self._exited.done()
+
+    def kill(self):
+        _kill(self.pid)
+
+    def discard(self):
+        """Kill a child that will never be used, closing our ends of its pipes"""
+        self.kill()
+        for fd in self._fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class ForkServer:
+    """Starts processes from a small, single-threaded fork server.
+
+    The server (fork_server.py) forks every child, applies its setrlimit
+    caps between fork and exec, and reaps it with wait4(), so each run
+    comes back with its own CPU time, peak RSS and exit signal. Neither is
+    possible for processes the event loop spawns (asyncio reaps them
+    itself), and forking from the server process instead of this one keeps
+    its threads out of the way. Children are either commands (spawn() with
+    an argv) or Python workers waiting for a program (see
+    compiler_service.python_pool). The server is restarted if it dies.
+    POSIX only.
+
+    Linux carries a process's peak RSS over exec, so a command's
+    `max_rss_kb` includes what its forked child used before the exec
+    (about 12 MB); every usage reports that as `rss_floor_kb`.
+    """
+
+    def __init__(self, python: Optional[str] = None):
+        self.python = python or sys.executable or 'python'
+        self._server: Optional[asyncio.subprocess.Process] = None
+        self._control: Optional[socket.socket] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._forks: Deque[asyncio.Future] = deque()
+        self._exits: Dict[int, asyncio.Future] = {}
+        self._lock = asyncio.Lock()
+
+        # Metrics
+        self.spawned = 0
+        self.server_starts = 0
+
+    async def _ensure_server(self):
+        async with self._lock:
+            if self._control is not None and self._server.returncode is None:
+                return
+            ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            try:
+                self._server = await asyncio.create_subprocess_exec(
+                    self.python, FORK_SERVER, str(theirs.fileno()),
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    pass_fds=(theirs.fileno(),)
+                )
+            except BaseException:
+                ours.close()
+                raise
+            finally:
+                theirs.close()
+            ours.setblocking(False)
+            self._control = ours
+            self._listener = asyncio.create_task(self._listen(ours))
+            self.server_starts += 1
+
+    async def _listen(self, control: socket.socket):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                data = await loop.sock_recv(control, 1024)
+                if not data:
+                    break
+                message = json.loads(data)
+                if 'pid' in message:
+                    pid = message['pid']
+                    exited = loop.create_future()
+                    # Keep its exit even if nobody waits for it, so the entry goes away
+                    self._exits[pid] = exited
+                    forked = self._forks.popleft()
+                    if not forked.done():
+                        forked.set_result((pid, exited))
+                    else:
+                        # spawn() was cancelled before the reply came: nobody owns the child
+                        _kill(pid)
+                elif 'exit' in message:
+                    exited = self._exits.pop(message['exit'], None)
+                    if exited is not None and not exited.done():
+                        status = message['status']
+                        exited.set_result((status, ResourceUsage(
+                            message['user_time'], message['system_time'], message['max_rss_kb'],
+                            -status if status < 0 else None, message.get('rss_floor_kb')
+                        )))
+        except (OSError, ValueError) as e:
+            logger.error(f"Fork server connection failed: {str(e)}")
+        finally:
+            self._abandon(control)
+
+    def _abandon(self, control: socket.socket):
+        """The fork server is gone: nobody will report on its children any more"""
+        if self._control is control:
+            self._control = None
+            if self._server is not None and self._server.returncode is None:
+                self._server.kill()
+        control.close()
+        while self._forks:
+            forked = self._forks.popleft()
+            if not forked.done():
+                forked.set_exception(RuntimeError("Fork server exited"))
+        for pid, exited in self._exits.items():
+            _kill(pid)
+            if not exited.done():
+                exited.set_result((-signal.SIGKILL, None))
+        self._exits.clear()
+
+    # ---------------- Public API ----------------
+
+    async def start(self):
+        await self._ensure_server()
+
+    async def spawn(self, argv: Optional[List[str]] = None, cwd: Optional[str] = None,
+                    rlimits: Optional[Dict[str, int]] = None) -> ForkedProcess:
+        """Fork a child running `argv` in `cwd`, or a Python worker without one"""
+        if argv and shutil.which(argv[0]) is None:
+            # Fail like create_subprocess_exec would, before anything is forked
+            raise FileNotFoundError(argv[0])
+        request = json.dumps({'rlimits': rlimits, 'argv': argv, 'cwd': cwd}).encode('utf-8')
+        if len(request) > MAX_REQUEST:
+            raise ValueError(f"Command too long for the fork server ({len(request)} bytes)")
+        await self._ensure_server()
+        if self._control is None:
+            raise RuntimeError("Fork server is not running")
+        stdin_r, stdin_w = os.pipe()
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        forked = asyncio.get_running_loop().create_future()
+        try:
+            self._forks.append(forked)
+            socket.send_fds(self._control, [request], [stdin_r, stdout_w, stderr_w])
+        except BaseException:
+            self._forks.remove(forked)
+            for fd in (stdin_w, stdout_r, stderr_r):
+                os.close(fd)
+            raise
+        finally:
+            for fd in (stdin_r, stdout_w, stderr_w):
+                os.close(fd)
+        for fd in (stdin_w, stdout_r, stderr_r):
+            os.set_blocking(fd, False)
+        try:
+            pid, exited = await forked
+        except BaseException:
+            for fd in (stdin_w, stdout_r, stderr_r):
+                os.close(fd)
+            raise
+        self.spawned += 1
+        return ForkedProcess(pid, stdin_w, stdout_r, stderr_r, exited)
+
+    async def close(self):
+        if self._server is not None and self._server.returncode is None:
+            self._server.kill()
+            await self._server.wait()
+        if self._listener is not None:
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    def metrics(self) -> dict:
+        return {
+            'running': self._server is not None and self._server.returncode is None,
+            'spawned': self.spawned,
+            'server_starts': self.server_starts,
+        }
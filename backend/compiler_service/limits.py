@@ -0,0 +1,111 @@
+import signal
+from typing import Dict, NamedTuple, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class ResourceLimits(NamedTuple):
+    """setrlimit caps for one program run; None leaves a limit alone.
+
+    `processes` (RLIMIT_NPROC) counts every process and thread of the user
+    the server runs as, not just the program's, so it is off by default.
+    """
+    cpu_seconds: Optional[int] = None
+    memory_bytes: Optional[int] = None
+    file_bytes: Optional[int] = None
+    processes: Optional[int] = None
+
+    def rlimits(self, reserves_address_space: bool = False) -> Dict[str, int]:
+        """RLIMIT_* names and values, in a form that can cross a pipe"""
+        limits = {}
+        if self.cpu_seconds is not None:
+            limits['RLIMIT_CPU'] = self.cpu_seconds
+        if self.memory_bytes is not None:
+            # JVMs, V8 and the Go runtime reserve far more address space
+            # than they use; cap their writable memory instead
+            limits['RLIMIT_DATA' if reserves_address_space else 'RLIMIT_AS'] = self.memory_bytes
+        if self.file_bytes is not None:
+            limits['RLIMIT_FSIZE'] = self.file_bytes
+        if self.processes is not None:
+            limits['RLIMIT_NPROC'] = self.processes
+        return limits
+
+
+def apply_rlimits(rlimits: Dict[str, int], pid: Optional[int] = None):
+    """Called in the child, between fork and exec; or on a running `pid` (Linux only)"""
+    for name, value in rlimits.items():
+        which = getattr(resource, name)
+        ceiling = (resource.getrlimit(which) if pid is None else resource.prlimit(pid, which))[1]
+        # CPU: SIGXCPU at the soft limit, SIGKILL a second later
+        hard = value + 1 if name == 'RLIMIT_CPU' else value
+        if ceiling != resource.RLIM_INFINITY:
+            # Only root may raise a hard limit
+            value, hard = min(value, ceiling), min(hard, ceiling)
+        if pid is None:
+            resource.setrlimit(which, (value, hard))
+        else:
+            resource.prlimit(pid, which, (value, hard))
+
+
+class ResourceUsage(NamedTuple):
+    """What a finished run used, from wait4().
+
+    Linux carries a process's peak RSS over exec, so `max_rss_kb` counts
+    what the forked child used before the program started. That peak,
+    measured in the child just before, is `rss_floor_kb`: `max_rss_kb` is
+    never below it, and only what it has above it is the program's own.
+    """
+    user_time: float
+    system_time: float
+    max_rss_kb: int
+    exit_signal: Optional[int] = None
+    rss_floor_kb: Optional[int] = None
+
+    @classmethod
+    def from_rusage(cls, rusage, returncode: int, rss_floor_kb: Optional[int] = None) -> 'ResourceUsage':
+        if rss_floor_kb is not None:
+            # The kernel's RSS counters are approximate; they can disagree by a few pages
+            rss_floor_kb = min(rss_floor_kb, rusage.ru_maxrss)
+        return cls(
+            user_time=rusage.ru_utime,
+            system_time=rusage.ru_stime,
+            max_rss_kb=rusage.ru_maxrss,
+            exit_signal=-returncode if returncode < 0 else None,
+            rss_floor_kb=rss_floor_kb
+        )
+
+
+def peak_rss_kb() -> Optional[int]:
+    """This process's peak RSS so far, from /proc; None elsewhere"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+SIGNAL_MESSAGES = {
+    signal.SIGKILL: "Killed",
+    signal.SIGSEGV: "Segmentation fault",
+    signal.SIGABRT: "Aborted",
+    signal.SIGFPE: "Floating point exception",
+}
+if hasattr(signal, 'SIGXCPU'):
+    SIGNAL_MESSAGES[signal.SIGXCPU] = "CPU time limit exceeded"
+    SIGNAL_MESSAGES[signal.SIGXFSZ] = "File size limit exceeded"
+
+
+def signal_message(signum: int) -> str:
+    message = SIGNAL_MESSAGES.get(signum)
+    if message is None:
+        try:
+            message = signal.Signals(signum).name
+        except ValueError:
+            message = f"signal {signum}"
+    return f"{message} (signal {signum})"
@@ -0,0 +1,363 @@
+import asyncio
+import os
+import signal
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from compiler_service.artifact_cache import ArtifactCache
+from compiler_service.executor import (
+    IN_PROCESS, TIMEOUT, ExecutionPlan, ExecutionResult, artifact_files, build_plan, cache_key,
+    command, copy_artifacts, execute_sql, normalize_language, plan_rlimits, prepare, unsupported,
+    with_exit_signal
+)
+from compiler_service.java_daemon import JavaDaemon
+from compiler_service.judge import (
+    ACCEPTED, COMPILE_ERROR, SKIPPED, CaseResult, JudgeCase, JudgeResult, case_verdict, overall_verdict
+)
+from compiler_service.launcher import ForkServer
+from compiler_service.limits import ResourceLimits, ResourceUsage
+from compiler_service.python_pool import PythonWorkerPool
+from compiler_service.workspace import WorkspacePool, default_pool
+
+
+PYTHON = {'python', 'python3'}
+
+
+class ExecutionTimeout(Exception):
+    pass
+
+
+class LocalCompiler:
+    """Runs code on this host with asyncio subprocesses.
+
+    Uses the same per-language plans as CodeExecutor, but nothing blocks
+    the event loop: processes are spawned with create_subprocess_exec and
+    awaited. At most `max_concurrency` programs (default: one per core)
+    compile or run at once; the rest wait their turn. Every process gets
+    its own session, so a timeout (or shutdown) kills the whole process
+    group, including anything the program forked.
+
+    With an `artifact_cache`, compiled programs are reused: a resubmission
+    of the same source only runs. Identical submissions arriving together
+    are compiled once; the others wait for that build. With a
+    `python_pool`, Python programs run in pre-started interpreters; with a
+    `java_daemon`, Java programs run in a resident JVM, falling back to
+    javac/java processes whenever the daemon cannot take them. Programs
+    run in directories from `workspaces` (the process-wide pool by default).
+
+    On POSIX, programs (not compilers) are started by a `fork_server`
+    (the Python pool's, or one of our own) under the setrlimit caps in
+    `limits`, and every run reports its CPU time, peak RSS and exit signal.
+    Programs in the Java daemon share its JVM and are not metered; the
+    daemon applies `limits` to itself (see JavaDaemon).
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, timeout: float = TIMEOUT,
+                 compile_timeout: Optional[float] = None,
+                 artifact_cache: Optional[ArtifactCache] = None,
+                 python_pool: Optional[PythonWorkerPool] = None,
+                 java_daemon: Optional[JavaDaemon] = None,
+                 workspaces: Optional[WorkspacePool] = None,
+                 limits: Optional[ResourceLimits] = None,
+                 fork_server: Optional[ForkServer] = None):
+        self.max_concurrency = max(1, max_concurrency or os.cpu_count() or 1)
+        self.timeout = timeout
+        self.compile_timeout = compile_timeout or timeout
+        self.artifact_cache = artifact_cache
+        self.python_pool = python_pool
+        self.java_daemon = java_daemon
+        self.workspaces = workspaces or default_pool()
+        self.limits = limits
+        if fork_server is None and os.name != 'nt':
+            fork_server = python_pool.server if python_pool is not None else ForkServer()
+        self.fork_server = fork_server
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._running: Set[asyncio.subprocess.Process] = set()
+        self._builds: Dict[str, asyncio.Future] = {}
+
+    # ---------------- Processes ----------------
+
+    @staticmethod
+    def _kill(proc: asyncio.subprocess.Process):
+        if proc.returncode is not None:
+            return
+        try:
+            if os.name == 'nt':
+                proc.kill()
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def _spawn(self, cmd: List[str], cwd: str, input_data: Optional[str],
+                     timeout: float) -> Tuple[int, str, str]:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE if input_data is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            start_new_session=os.name != 'nt'
+        )
+        stdin = input_data.encode('utf-8') if input_data is not None else None
+        return await self._communicate(proc, stdin, timeout)
+
+    async def _run(self, plan: ExecutionPlan, cmd: List[str], cwd: str,
+                   input_data: str) -> Tuple[int, str, str, Optional[ResourceUsage]]:
+        """Run a program under the plan's limits; metered when the fork server starts it"""
+        if self.fork_server is None:
+            return (*await self._spawn(cmd, cwd, input_data, self.timeout), None)
+        # Never falls back to an unlimited process: a request too large to send fails the run
+        proc = await self.fork_server.spawn(cmd, cwd, plan_rlimits(self.limits, plan))
+        returncode, stdout, stderr = await self._communicate(proc, input_data.encode('utf-8'), self.timeout)
+        return returncode, stdout, stderr, proc.usage
+
+    async def _communicate(self, proc: asyncio.subprocess.Process, stdin: Optional[bytes],
+                           timeout: float) -> Tuple[int, str, str]:
+        self._running.add(proc)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(stdin), timeout)
+        except asyncio.TimeoutError:
+            self._kill(proc)
+            await proc.wait()
+            raise ExecutionTimeout()
+        except BaseException:
+            # Cancelled (client went away, shutdown): do not leave it running
+            self._kill(proc)
+            raise
+        finally:
+            self._running.discard(proc)
+        return (
+            proc.returncode,
+            stdout.decode('utf-8', errors='replace'),
+            stderr.decode('utf-8', errors='replace')
+        )
+
+    # ---------------- Builds ----------------
+
+    async def _fetch(self, key: Optional[str], workdir: str) -> bool:
+        if key is None:
+            return False
+        if await asyncio.to_thread(self.artifact_cache.fetch, key, workdir):
+            return True
+        # The same program may be compiling for another request right now
+        pending = self._builds.get(key)
+        if pending is None:
+            return False
+        await asyncio.shield(pending)
+        return await asyncio.to_thread(self.artifact_cache.fetch, key, workdir)
+
+    async def _compile(self, plan: ExecutionPlan, paths: dict, key: Optional[str]):
+        """Compile into paths['dir']; returns (stderr on failure, seconds spent)"""
+        build = None
+        if key is not None:
+            build = asyncio.get_running_loop().create_future()
+            self._builds.setdefault(key, build)
+        start = time.time()
+        try:
+            try:
+                returncode, _, stderr = await self._spawn(
+                    command(plan.compile, paths), paths['dir'], None, self.compile_timeout
+                )
+            except ExecutionTimeout:
+                return f"Compilation timeout exceeded ({self.compile_timeout:g}s)", time.time() - start
+            compile_time = time.time() - start
+            if returncode != 0:
+                return stderr, compile_time
+            if key is not None:
+                await asyncio.to_thread(self.artifact_cache.store, key, artifact_files(plan, paths))
+            return None, compile_time
+        finally:
+            if build is not None:
+                if self._builds.get(key) is build:
+                    del self._builds[key]
+                build.set_result(None)
+
+    async def _build(self, plan: ExecutionPlan, code: str, paths: dict):
+        """Fetch or compile into paths['dir']; returns (stderr on failure, seconds spent, cache hit)"""
+        key = None
+        if self.artifact_cache is not None:
+            key = await asyncio.to_thread(cache_key, self.artifact_cache, plan, code)
+        if await self._fetch(key, paths['dir']):
+            return None, 0.0, True
+        error, compile_time = await self._compile(plan, paths, key)
+        return error, compile_time, False
+
+    async def _execute_plan(self, plan: ExecutionPlan, code: str, input_data: str,
+                            build: Optional[dict] = None) -> ExecutionResult:
+        """Build and run; with `build` (the paths of an earlier build), only run"""
+        temp_dir = None
+        try:
+            temp_dir = self.workspaces.acquire()
+            paths = await asyncio.to_thread(prepare, plan, code, temp_dir)
+
+            compile_time = 0.0
+            cache_hit = False
+            if build is not None:
+                await asyncio.to_thread(copy_artifacts, plan, build, temp_dir)
+            elif plan.compile:
+                error, compile_time, cache_hit = await self._build(plan, code, paths)
+                if error is not None:
+                    return ExecutionResult(False, "", error, 0.0, compile_time, compile_error=True)
+
+            start = time.time()
+            returncode, stdout, stderr, usage = await self._run(
+                plan, command(plan.run, paths), temp_dir, input_data
+            )
+            execution_time = time.time() - start
+            return ExecutionResult(
+                returncode == 0, stdout, with_exit_signal(stderr, usage), execution_time,
+                compile_time, cache_hit, usage
+            )
+        except FileNotFoundError:
+            return ExecutionResult(False, "", plan.missing or "Runtime not found in PATH.", 0.0)
+        except ExecutionTimeout:
+            return ExecutionResult(
+                False, "", f"Execution timeout exceeded ({self.timeout:g}s)", self.timeout, timed_out=True
+            )
+        except Exception as e:
+            return ExecutionResult(False, "", str(e), 0.0)
+        finally:
+            if temp_dir:
+                await asyncio.to_thread(self.workspaces.release, temp_dir)
+
+    async def _dispatch(self, language: str, plan: ExecutionPlan, code: str, input_data: str,
+                        build: Optional[dict] = None) -> ExecutionResult:
+        """Run by the fastest path the language has; the caller holds a slot"""
+        if self.python_pool is not None and language in PYTHON:
+            return await self._execute_pooled(code, input_data)
+        if self.java_daemon is not None and language == 'java':
+            result = await self.java_daemon.execute(
+                code, input_data, plan.source, self.timeout, self.compile_timeout
+            )
+            if result is not None:
+                return result
+        return await self._execute_plan(plan, code, input_data, build)
+
+    async def _execute_pooled(self, code: str, input_data: str) -> ExecutionResult:
+        temp_dir = None
+        try:
+            temp_dir = self.workspaces.acquire()
+            proc = await self.python_pool.acquire()
+            start = time.time()
+            returncode, stdout, stderr = await self._communicate(
+                proc, PythonWorkerPool.request(code, input_data, temp_dir), self.timeout
+            )
+            execution_time = time.time() - start
+            return ExecutionResult(
+                returncode == 0, stdout, with_exit_signal(stderr, proc.usage), execution_time,
+                usage=proc.usage
+            )
+        except ExecutionTimeout:
+            return ExecutionResult(
+                False, "", f"Execution timeout exceeded ({self.timeout:g}s)", self.timeout, timed_out=True
+            )
+        except Exception as e:
+            return ExecutionResult(False, "", str(e), 0.0)
+        finally:
+            if temp_dir:
+                await asyncio.to_thread(self.workspaces.release, temp_dir)
+
+    # ---------------- Public API ----------------
+
+    async def start(self):
+        if self.fork_server is not None:
+            await self.fork_server.start()
+        if self.python_pool is not None:
+            await self.python_pool.start()
+        if self.java_daemon is not None:
+            await self.java_daemon.start()
+
+    async def execute(self, language: str, code: str, input_data: str = "") -> ExecutionResult:
+        """Execute code and return (success, stdout, stderr, execution_time, compile_time, cache_hit, usage)"""
+        if normalize_language(language) in IN_PROCESS:
+            return await asyncio.to_thread(execute_sql, code)
+
+        plan = build_plan(language, code)
+        if plan is None:
+            return unsupported(language)
+        if not plan.run:
+            return ExecutionResult(False, "", plan.missing, 0.0)
+
+        async with self._slots:
+            return await self._dispatch(normalize_language(language), plan, code, input_data or "")
+
+    async def judge(self, language: str, code: str, cases: List[JudgeCase],
+                    stop_on_failure: bool = False, ignore_whitespace: bool = False) -> JudgeResult:
+        """Run one program against many inputs, building it once.
+
+        Cases start in order and run in parallel, each in its own
+        workspace, within the `max_concurrency` slots shared with every
+        other execution. With `stop_on_failure`, cases that have not
+        started when one fails are skipped.
+        """
+        language = normalize_language(language)
+        plan = None
+        if language not in IN_PROCESS:
+            plan = build_plan(language, code)
+            if plan is None:
+                return JudgeResult(COMPILE_ERROR, [], compile_error=unsupported(language).stderr)
+            if not plan.run:
+                return JudgeResult(COMPILE_ERROR, [], compile_error=plan.missing)
+        # The Java daemon compiles (and caches) per request instead
+        in_daemon = self.java_daemon is not None and language == 'java'
+
+        build_dir = None
+        build = None
+        compile_time = 0.0
+        cache_hit = False
+        stop = asyncio.Event()
+
+        async def run(case: JudgeCase) -> CaseResult:
+            async with self._slots:
+                if stop.is_set():
+                    return CaseResult(SKIPPED)
+                if plan is None:
+                    result = await asyncio.to_thread(execute_sql, code)
+                else:
+                    result = await self._dispatch(language, plan, code, case.input_data or "", build)
+            verdict = case_verdict(result, case.expected_output, ignore_whitespace)
+            if verdict != ACCEPTED and stop_on_failure:
+                stop.set()
+            return CaseResult(verdict, result)
+
+        try:
+            if plan is not None and plan.compile and plan.artifacts and not in_daemon:
+                async with self._slots:
+                    build_dir = self.workspaces.acquire()
+                    build = await asyncio.to_thread(prepare, plan, code, build_dir)
+                    try:
+                        error, compile_time, cache_hit = await self._build(plan, code, build)
+                    except FileNotFoundError:
+                        error = plan.missing or "Compiler not found in PATH."
+                if error is not None:
+                    return JudgeResult(COMPILE_ERROR, [], compile_time, cache_hit, error)
+
+            results = []
+            if in_daemon and cases:
+                # Let the first case compile it, so the others do not all do so at once
+                results.append(await run(cases[0]))
+            results += await asyncio.gather(*(run(case) for case in cases[len(results):]))
+        finally:
+            if build_dir:
+                await asyncio.to_thread(self.workspaces.release, build_dir)
+
+        for case in results:
+            if case.verdict == COMPILE_ERROR:
+                result = case.result
+                return JudgeResult(COMPILE_ERROR, [], result.compile_time, result.cache_hit, result.stderr)
+        if build is None and results and results[0].result is not None:
+            compile_time = results[0].result.compile_time
+            cache_hit = results[0].result.cache_hit
+        return JudgeResult(overall_verdict(results), results, compile_time, cache_hit)
+
+    async def close(self):
+        """Kill every program still running, the idle Python workers and the fork server"""
+        for proc in list(self._running):
+            self._kill(proc)
+        if self.python_pool is not None:
+            await self.python_pool.close()
+        if self.fork_server is not None:
+            await self.fork_server.close()
+        if self.java_daemon is not None:
+            await self.java_daemon.close()
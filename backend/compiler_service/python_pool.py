@@ -0,0 +1,98 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from compiler_service.launcher import ForkedProcess, ForkServer
+
+logger = logging.getLogger(__name__)
+
+
+class PythonWorkerPool:
+    """Pre-forked interpreters for Python submissions.
+
+    The fork server (see compiler_service.launcher) imports the usual
+    standard library once; every worker is a fork of it, so it starts in
+    about a millisecond with those modules already loaded, instead of
+    paying for a fresh interpreter. `size` workers are kept forked and
+    waiting, with `rlimits` already applied. Workers are single-use: a
+    program can leave any state behind, so every run gets a fresh fork, and
+    the pool forks a replacement in the background. Pass `server` to share
+    a fork server; otherwise the pool starts its own. POSIX only.
+    """
+
+    def __init__(self, size: int = 2, server: Optional[ForkServer] = None,
+                 rlimits: Optional[Dict[str, int]] = None):
+        self.size = max(1, size)
+        self.server = server or ForkServer()
+        self.rlimits = rlimits
+        self._owns_server = server is None
+        self._ready: Deque[ForkedProcess] = deque()
+        self._refill: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # Metrics
+        self.warm_runs = 0
+        self.cold_runs = 0
+
+    async def _fork(self) -> ForkedProcess:
+        return await self.server.spawn(rlimits=self.rlimits)
+
+    async def _fill(self):
+        while not self._closed and len(self._ready) < self.size:
+            try:
+                self._ready.append(await self._fork())
+            except Exception as e:
+                logger.error(f"Could not fork a Python worker: {str(e)}")
+                return
+
+    def _ensure_refill(self):
+        if not self._closed and (self._refill is None or self._refill.done()):
+            self._refill = asyncio.create_task(self._fill())
+
+    # ---------------- Public API ----------------
+
+    async def start(self):
+        self._closed = False
+        await self._fill()
+
+    async def acquire(self) -> ForkedProcess:
+        """A worker waiting for its program; the caller owns it from here on"""
+        while self._ready and self._ready[0].exited():
+            # Went down with a fork server that has since been replaced
+            self._ready.popleft().discard()
+        if self._ready:
+            worker = self._ready.popleft()
+            self.warm_runs += 1
+        else:
+            worker = await self._fork()
+            self.cold_runs += 1
+        self._ensure_refill()
+        return worker
+
+    @staticmethod
+    def request(code: str, input_data: str, cwd: str, filename: str = 'main.py') -> bytes:
+        """What to write to a worker's stdin to run `code`"""
+        source = code.encode('utf-8')
+        header = json.dumps({'cwd': cwd, 'filename': filename, 'size': len(source)})
+        return header.encode('utf-8') + b"\n" + source + (input_data or "").encode('utf-8')
+
+    async def close(self):
+        self._closed = True
+        if self._refill is not None:
+            self._refill.cancel()
+            await asyncio.gather(self._refill, return_exceptions=True)
+            self._refill = None
+        while self._ready:
+            self._ready.popleft().discard()
+        if self._owns_server:
+            await self.server.close()
+
+    def metrics(self) -> dict:
+        return {
+            'ready': len(self._ready),
+            'warm_runs': self.warm_runs,
+            'cold_runs': self.cold_runs,
+            'server_starts': self.server.server_starts,
+        }
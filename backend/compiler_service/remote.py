@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import random
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_URL = "https://onecompiler-apis.p.rapidapi.com/api/v1/run"
+
+LANGUAGE_MAP = {
+    "python": "python",
+    "javascript": "javascript",
+    "typescript": "typescript",
+    "cpp": "cpp",
+    "c": "c",
+    "java": "java",
+    "go": "go",
+    "rust": "rust",
+    "csharp": "csharp",
+    "kotlin": "kotlin",
+    "swift": "swift",
+    "ruby": "ruby",
+    "php": "php",
+    "r": "r",
+    "scala": "scala",
+    "bash": "bash",
+    "sql": "mysql"
+}
+
+# Worth another attempt: the request never ran or was shed by the server.
+# Not a dropped connection (RemoteProtocolError, ReadError): the program may
+# already have run, and running it again is not safe.
+RETRY_STATUSES = {429, 502, 503, 504}
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class RemoteCompilerError(Exception):
+    """The remote compiler could not be reached or returned an error"""
+
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RemoteCompiler:
+    """Runs code on the hosted compiler API without blocking the event loop.
+
+    One httpx.AsyncClient per process keeps connections alive between
+    calls. Requests in flight are bounded per host, and a request that
+    failed before it could run (connection errors, 429/502/503/504) is
+    retried with exponential backoff and full jitter. Read timeouts and
+    dropped connections are not retried: the code may already have run
+    remotely.
+    """
+
+    def __init__(self, url: Optional[str] = None, api_key: Optional[str] = None,
+                 api_host: Optional[str] = None, timeout: float = 30.0,
+                 connect_timeout: float = 5.0, max_connections: int = 20,
+                 max_concurrency: int = 20, retries: int = 2, backoff: float = 0.25):
+        self.url = url or DEFAULT_URL
+        self.api_key = api_key
+        self.api_host = api_host or urlparse(self.url).hostname
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max(1, max_connections)
+        self.max_concurrency = max(1, max_concurrency)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    # ---------------- Lifecycle ----------------
+
+    async def start(self):
+        if self._client is not None:
+            return
+        headers = {"content-type": "application/json"}
+        if self.api_key:
+            headers["X-RapidAPI-Key"] = self.api_key
+        if self.api_host:
+            headers["X-RapidAPI-Host"] = self.api_host
+        self._client = httpx.AsyncClient(
+            headers=headers,
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            )
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ---------------- Requests ----------------
+
+    def _slots(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = asyncio.Semaphore(self.max_concurrency)
+            self._host_slots[host] = slots
+        return slots
+
+    def _delay(self, attempt: int) -> float:
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    async def _post(self, payload: dict) -> httpx.Response:
+        await self.start()
+        slots = self._slots(self.url)
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                async with slots:
+                    response = await self._client.post(self.url, json=payload)
+            except RETRY_ERRORS as e:
+                if last:
+                    raise RemoteCompilerError(f"Compiler service unreachable: {str(e)}")
+                logger.warning(f"Compiler request failed ({str(e)}), retrying")
+            except httpx.TimeoutException:
+                raise RemoteCompilerError("Compiler service timed out", status_code=504)
+            except httpx.HTTPError as e:
+                raise RemoteCompilerError(f"Compiler request failed: {str(e)}")
+            else:
+                if response.status_code not in RETRY_STATUSES or last:
+                    return response
+                logger.warning(f"Compiler service returned {response.status_code}, retrying")
+            # Back off without holding a slot
+            await asyncio.sleep(self._delay(attempt))
+
+    async def run(self, language: str, code: str, input_data: str = "") -> dict:
+        """Execute code remotely; returns the service's JSON result"""
+        payload = {
+            "language": LANGUAGE_MAP.get(language, language),
+            "stdin": input_data or "",
+            "files": [
+                {
+                    "name": "main",
+                    "content": code
+                }
+            ]
+        }
+
+        response = await self._post(payload)
+        if response.status_code >= 400:
+            raise RemoteCompilerError(
+                f"Compiler service returned {response.status_code}: {response.text[:200]}"
+            )
+        try:
+            return response.json()
+        except ValueError:
+            raise RemoteCompilerError("Compiler service returned invalid JSON")
@@ -0,0 +1,230 @@
+import atexit
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+TMPFS_ROOTS = ('/dev/shm',)
+BASE_NAME = 'codeatlas-workspaces'
+
+
+def _usable(root: str) -> bool:
+    """Writable, and programs may be executed from it (tmpfs is often mounted noexec)"""
+    try:
+        if not os.path.isdir(root) or not os.access(root, os.W_OK):
+            return False
+        return not (os.statvfs(root).f_flag & getattr(os, 'ST_NOEXEC', 0))
+    except OSError:
+        return False
+
+
+def default_root() -> str:
+    for root in TMPFS_ROOTS:
+        if _usable(root):
+            return root
+    return tempfile.gettempdir()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _force_writable(func, path, _):
+    # Programs may chmod what they created; make it deletable and retry once
+    os.chmod(os.path.dirname(path), stat.S_IRWXU)
+    if os.path.isdir(path) and not os.path.islink(path):
+        os.chmod(path, stat.S_IRWXU)
+    func(path)
+
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(directory, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class WorkspacePool:
+    """Reusable scratch directories for running programs.
+
+    `size` directories are created up front under `root` (/dev/shm when it
+    is usable, else the system temp dir), so an execution takes one from a
+    list instead of creating and deleting a directory tree on disk.
+    release() empties it for the next execution. A workspace that grew past
+    `max_bytes` is rebuilt instead of reused, and counted. When all
+    workspaces are in use, callers get a one-off directory; that is counted
+    as exhaustion and logged, so the pool can be sized up.
+
+    Each process keeps its workspaces under its own directory; directories
+    left behind by processes that no longer exist are removed on start.
+    """
+
+    def __init__(self, root: Optional[str] = None, size: int = 8, max_bytes: int = 64 * 1024 * 1024):
+        self.root = root or default_root()
+        self.size = max(1, size)
+        self.max_bytes = max_bytes
+        self.base = os.path.join(self.root, BASE_NAME)
+        self.directory = os.path.join(self.base, f"pool-{os.getpid()}")
+        self._free: List[str] = []
+        self._in_use: Set[str] = set()
+        self._overflow: Set[str] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Metrics
+        self.acquired = 0
+        self.exhausted = 0
+        self.over_quota = 0
+        self.wipe_failures = 0
+
+        os.makedirs(self.base, exist_ok=True)
+        self._remove_stale()
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        for i in range(self.size):
+            path = os.path.join(self.directory, f"ws-{i}")
+            shutil.rmtree(path, ignore_errors=True)
+            os.mkdir(path, 0o700)
+            self._free.append(path)
+
+    def _remove_stale(self):
+        for entry in os.scandir(self.base):
+            name = entry.name
+            if not name.startswith('pool-') or not name[5:].isdigit():
+                continue
+            if int(name[5:]) != os.getpid() and not _pid_alive(int(name[5:])):
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    # ---------------- Cleaning ----------------
+
+    def _wipe(self, path: str) -> int:
+        """Empty a workspace in place; returns how many bytes it held"""
+        used = 0
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                used += _tree_size(entry.path)
+                shutil.rmtree(entry.path, onerror=_force_writable)
+            else:
+                used += entry.stat(follow_symlinks=False).st_size
+                try:
+                    os.unlink(entry.path)
+                except PermissionError:
+                    os.chmod(path, stat.S_IRWXU)
+                    os.unlink(entry.path)
+        return used
+
+    def _rebuild(self, path: str):
+        # Move it out of the way first, so the name is usable again at once
+        trash = os.path.join(self.directory, f"trash-{uuid.uuid4().hex}")
+        try:
+            os.rename(path, trash)
+        except OSError:
+            trash = path
+        try:
+            shutil.rmtree(trash, onerror=_force_writable)
+        except OSError:
+            shutil.rmtree(trash, ignore_errors=True)
+        os.makedirs(path, 0o700, exist_ok=True)
+
+    # ---------------- Public API ----------------
+
+    def acquire(self) -> str:
+        """An empty directory to run in; hand it back with release()"""
+        with self._lock:
+            self.acquired += 1
+            if self._free:
+                path = self._free.pop()
+                self._in_use.add(path)
+                return path
+            self.exhausted += 1
+        logger.warning(f"All {self.size} workspaces are in use; using a one-off directory")
+        path = tempfile.mkdtemp(prefix='overflow-', dir=self.directory)
+        with self._lock:
+            self._overflow.add(path)
+        return path
+
+    def release(self, path: str):
+        with self._lock:
+            overflow = path in self._overflow
+            self._overflow.discard(path)
+            if self._closed:
+                self._in_use.discard(path)
+                return
+        if overflow:
+            shutil.rmtree(path, ignore_errors=True)
+            return
+
+        try:
+            used = self._wipe(path)
+            if used > self.max_bytes:
+                self.over_quota += 1
+                logger.warning(f"Workspace held {used} bytes (cap {self.max_bytes}); rebuilding it")
+                self._rebuild(path)
+        except OSError as e:
+            self.wipe_failures += 1
+            logger.warning(f"Could not wipe workspace {path}: {str(e)}; rebuilding it")
+            self._rebuild(path)
+
+        with self._lock:
+            self._in_use.discard(path)
+            if not self._closed:
+                self._free.append(path)
+
+    @contextmanager
+    def workspace(self):
+        path = self.acquire()
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def close(self):
+        """Remove every workspace; used on shutdown"""
+        with self._lock:
+            self._closed = True
+            self._free.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'root': self.root,
+                'size': self.size,
+                'available': len(self._free),
+                'in_use': len(self._in_use) + len(self._overflow),
+                'acquired': self.acquired,
+                'exhausted': self.exhausted,
+                'over_quota': self.over_quota,
+                'wipe_failures': self.wipe_failures,
+            }
+
+
+_default_pool: Optional[WorkspacePool] = None
+_default_lock = threading.Lock()
+
+
+def default_pool() -> WorkspacePool:
+    """Process-wide pool for callers that were not given one"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = WorkspacePool()
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -1,8 +1,19 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Dict, Optional
+from typing import List, Dict, NamedTuple, Optional
 from datetime import datetime, timezone
 import uuid
 
+class FunctionMetrics(NamedTuple):
+    # A tuple rather than a model: stored and serialized as a compact array,
+    # which keeps files with thousands of functions cheap
+    name: str
+    start_line: int
+    end_line: int
+    complexity: int
+    nesting: int
+    params: int
+    loc: int
+
 class FileMetrics(BaseModel):
     filename: str
     language: str
@@ -12,6 +23,10 @@ class FileMetrics(BaseModel):
     complexity: float
     nesting_depth: int
     smells: List[str]
+    function_metrics: List[FunctionMetrics] = Field(default_factory=list)
+    duplicated_lines: int = 0
+    # Set when the file could not be analyzed; every other figure is then 0
+    error: Optional[str] = None
 
 class CodeSmell(BaseModel):
     type: str
@@ -36,6 +51,15 @@ class RefactorAction(BaseModel):
     effort: str
     description: str
 
+class CodeClone(BaseModel):
+    file_a: str
+    start_a: int
+    end_a: int
+    file_b: str
+    start_b: int
+    end_b: int
+    lines: int
+
 class AnalysisResult(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
@@ -50,6 +74,10 @@ class AnalysisResult(BaseModel):
     smells: List[CodeSmell]
     hotspots: List[Hotspot]
     refactor_actions: List[RefactorAction]
+    cache_hit_rate: float = 0.0
+    base_analysis_id: Optional[str] = None
+    duplication_ratio: float = 0.0
+    clones: List[CodeClone] = Field(default_factory=list)
 
 class AnalysisRequest(BaseModel):
     project_name: str
@@ -57,16 +85,74 @@ class AnalysisRequest(BaseModel):
     file_name: Optional[str] = None
     files: Optional[Dict[str, str]] = None
 
+class AnalysisDeltaRequest(BaseModel):
+    project_name: Optional[str] = None
+    added: Dict[str, str] = Field(default_factory=dict)
+    modified: Dict[str, str] = Field(default_factory=dict)
+    deleted: List[str] = Field(default_factory=list)
+
 class CompilerRequest(BaseModel):
     language: str
     code: str
     input_data: Optional[str] = None
 
+RSS_DESCRIPTION = (
+    "Peak resident memory of the run in KiB, as wait4() reports it. Linux counts what the process "
+    "used before the program started, so this is never below rss_floor_kb"
+)
+RSS_FLOOR_DESCRIPTION = (
+    "Peak resident memory in KiB of the process just before the program started, which Linux "
+    "counts in max_rss_kb; only what max_rss_kb has above this was the program's own"
+)
+
 class CompilerResponse(BaseModel):
     success: bool
     output: str
     error: Optional[str] = None
     execution_time: float
+    compile_time: float = 0.0
+    run_time: float = 0.0
+    cache_hit: bool = False
+    # CPU time, peak memory and fatal signal of the run, when it was metered
+    user_time: Optional[float] = None
+    system_time: Optional[float] = None
+    max_rss_kb: Optional[int] = Field(None, description=RSS_DESCRIPTION)
+    rss_floor_kb: Optional[int] = Field(None, description=RSS_FLOOR_DESCRIPTION)
+    exit_signal: Optional[int] = None
+
+class JudgeCaseRequest(BaseModel):
+    input_data: str = ""
+    # Leave out to only check that the program runs successfully
+    expected_output: Optional[str] = None
+
+class JudgeRequest(BaseModel):
+    language: str
+    code: str
+    cases: List[JudgeCaseRequest]
+    stop_on_failure: bool = False
+    ignore_whitespace: bool = False
+
+class JudgeCaseResponse(BaseModel):
+    # accepted, wrong_answer, runtime_error, time_limit_exceeded or skipped
+    verdict: str
+    output: str = ""
+    error: Optional[str] = None
+    run_time: float = 0.0
+    user_time: Optional[float] = None
+    system_time: Optional[float] = None
+    max_rss_kb: Optional[int] = Field(None, description=RSS_DESCRIPTION)
+    rss_floor_kb: Optional[int] = Field(None, description=RSS_FLOOR_DESCRIPTION)
+    exit_signal: Optional[int] = None
+
+class JudgeResponse(BaseModel):
+    # accepted, compile_error, or the verdict of the first case that failed
+    verdict: str
+    passed: int
+    total: int
+    compile_time: float = 0.0
+    cache_hit: bool = False
+    compile_error: Optional[str] = None
+    cases: List[JudgeCaseResponse] = Field(default_factory=list)
 
 class AIInsightRequest(BaseModel):
     analysis_id: str
@@ -1,28 +1,48 @@
-from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, UploadFile, File, Header, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import WriteConcern
+import asyncio
+import json
+import math
+from datetime import datetime, timedelta, timezone
 import os
 import logging
 from pathlib import Path
-import zipfile
-import io
-import requests
-from typing import Dict, List
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 from models.analysis import (
-    AnalysisResult, AnalysisRequest, CompilerRequest, CompilerResponse,
-    AIInsightRequest, AIInsightResponse, FileMetrics, CodeSmell, Hotspot, RefactorAction
+    AnalysisResult, AnalysisRequest, AnalysisDeltaRequest, CompilerRequest, CompilerResponse,
+    JudgeRequest, JudgeResponse, JudgeCaseResponse, AIInsightRequest, AIInsightResponse, FileMetrics, CodeSmell, CodeClone, Hotspot, RefactorAction
+)
+from analysis_engine.pipeline import AnalysisPool, FileAnalysis, FileStageStats, detect_language
+from analysis_engine.cache import AnalysisCache
+from analysis_engine.duplication import CloneIndex
+from analysis_engine.ingest import (
+    IngestError, IngestLimitExceeded, IngestLimits, count_zip_sources, iter_zip_sources, spool_upload
 )
-from analysis_engine.language_adapters.adapters import get_adapter
-from analysis_engine.metrics_calculator import MetricsCalculator
-from analysis_engine.smell_detector import SmellDetector
 from analysis_engine.hotspot_detector import HotspotDetector
-from analysis_engine.health_index import HealthIndexCalculator
+from analysis_engine.health_index import HealthAccumulator, HealthIndexCalculator
 from refactor_engine.strategy_generator import RefactorStrategyGenerator
 # from compiler_service.executor import CodeExecutor
+from compiler_service.artifact_cache import ArtifactCache
+from compiler_service.java_daemon import JavaDaemon
+from compiler_service.judge import ACCEPTED, JudgeCase
+from compiler_service.launcher import ForkServer
+from compiler_service.limits import ResourceLimits
+from compiler_service.local import LocalCompiler
+from compiler_service.python_pool import PythonWorkerPool
+from compiler_service.workspace import WorkspacePool
+from compiler_service.remote import RemoteCompiler, RemoteCompilerError
 from ai_orchestrator.provider import AIOrchestrator
+from storage.job_store import JobStore, JobTracker
+from storage.analysis_store import AnalysisStore, INSIGHT_FIELDS
+from storage.indexes import ensure_indexes
+from storage.compression import available_codec
+from storage.cold_tier import FileSystemColdStore, GridFSColdStore
+from storage.write_buffer import WriteBehindBuffer
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -38,40 +58,143 @@ app = FastAPI(title="CodeAtlas AI", version="1.0.0")
 # Create router with /api prefix
 api_router = APIRouter(prefix="/api")
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
 # Initialize services
-metrics_calc = MetricsCalculator()
-smell_detector = SmellDetector(complexity_threshold=int(os.environ.get('COMPLEXITY_THRESHOLD', 10)))
+COMPLEXITY_THRESHOLD = int(os.environ.get('COMPLEXITY_THRESHOLD', 10))
+
+analysis_pool = AnalysisPool(
+    workers=int(os.environ.get('ANALYSIS_WORKERS', os.cpu_count() or 1)),
+    chunk_size=int(os.environ.get('ANALYSIS_CHUNK_SIZE', 64)),
+    complexity_threshold=COMPLEXITY_THRESHOLD
+)
+analysis_cache = None
+if os.environ.get('ANALYSIS_CACHE', 'true').lower() == 'true':
+    analysis_cache = AnalysisCache(
+        collection=db.analysis_cache,
+        max_entries=int(os.environ.get('ANALYSIS_CACHE_SIZE', 10000)),
+        ttl_seconds=int(os.environ.get('ANALYSIS_CACHE_TTL', 7 * 24 * 3600)),
+        complexity_threshold=COMPLEXITY_THRESHOLD
+    )
+# 0 keeps every file in the hotspot list
+HOTSPOT_LIMIT = int(os.environ.get('HOTSPOT_LIMIT', 0))
+CLONE_INDEX_SIZE = int(os.environ.get('CLONE_INDEX_SIZE', 500000))
+CLONE_MAX_RESULTS = int(os.environ.get('CLONE_MAX_RESULTS', 200))
+ANALYSES_PAGE_MAX = int(os.environ.get('ANALYSES_PAGE_MAX', 100))
+ingest_limits = IngestLimits(
+    max_upload_bytes=int(os.environ.get('UPLOAD_MAX_BYTES', 512 * 1024 * 1024)),
+    max_uncompressed_bytes=int(os.environ.get('UPLOAD_MAX_UNCOMPRESSED_BYTES', 2 * 1024 * 1024 * 1024)),
+    max_entries=int(os.environ.get('UPLOAD_MAX_ENTRIES', 200000)),
+    max_compression_ratio=float(os.environ.get('UPLOAD_MAX_COMPRESSION_RATIO', 100)),
+    max_file_bytes=int(os.environ.get('UPLOAD_MAX_FILE_BYTES', 10 * 1024 * 1024))
+)
+job_store = JobStore(db.jobs, ttl_seconds=int(os.environ.get('ANALYSIS_JOB_TTL', 7 * 24 * 3600)))
+# 'remote' runs code on the hosted compiler API, 'local' on this host
+COMPILER_BACKEND = os.environ.get('COMPILER_BACKEND', 'remote').lower()
+local_compiler = None
+# Compiled programs are reused across submissions; 0 bytes turns the cache off
+COMPILER_ARTIFACT_DIR = os.environ.get('COMPILER_ARTIFACT_DIR', str(ROOT_DIR / 'compile_cache'))
+COMPILER_ARTIFACT_CACHE_BYTES = int(os.environ.get('COMPILER_ARTIFACT_CACHE_BYTES', 512 * 1024 * 1024))
+artifact_cache = None
+workspace_pool = None
+# Test cases one /api/judge request may run
+COMPILER_JUDGE_MAX_CASES = int(os.environ.get('COMPILER_JUDGE_MAX_CASES', 100))
+if COMPILER_BACKEND == 'local':
+    local_concurrency = int(os.environ.get('COMPILER_LOCAL_CONCURRENCY', 0)) or None
+    run_timeout = float(os.environ.get('COMPILER_RUN_TIMEOUT', 5))
+    # Scratch directories reused between runs, on /dev/shm unless a root is given
+    workspace_pool = WorkspacePool(
+        root=os.environ.get('COMPILER_WORKSPACE_ROOT') or None,
+        size=int(os.environ.get('COMPILER_WORKSPACES', 0)) or 2 * (local_concurrency or os.cpu_count() or 1),
+        max_bytes=int(os.environ.get('COMPILER_WORKSPACE_MAX_BYTES', 64 * 1024 * 1024))
+    )
+    # setrlimit caps for every program run; 0 turns a limit off. The process
+    # limit counts everything the server's user runs, so it is off by default.
+    run_limits = ResourceLimits(
+        cpu_seconds=int(os.environ.get('COMPILER_LIMIT_CPU_SECONDS', math.ceil(run_timeout))) or None,
+        memory_bytes=int(os.environ.get('COMPILER_LIMIT_MEMORY_BYTES', 512 * 1024 * 1024)) or None,
+        file_bytes=int(os.environ.get('COMPILER_LIMIT_FILE_BYTES', workspace_pool.max_bytes)) or None,
+        processes=int(os.environ.get('COMPILER_LIMIT_PROCESSES', 0)) or None
+    )
+    fork_server = ForkServer() if os.name != 'nt' else None
+    if COMPILER_ARTIFACT_CACHE_BYTES > 0:
+        artifact_cache = ArtifactCache(COMPILER_ARTIFACT_DIR, max_bytes=COMPILER_ARTIFACT_CACHE_BYTES)
+    # Pre-started Python interpreters; 0 starts one per run
+    python_pool_size = int(os.environ.get('COMPILER_PYTHON_POOL', 2))
+    # Resident JVM for Java, opt-in; falls back to javac/java per run when unavailable
+    java_daemon = None
+    if os.environ.get('COMPILER_JAVA_DAEMON', 'false').lower() == 'true':
+        java_daemon = JavaDaemon(
+            os.environ.get('COMPILER_JAVA_DAEMON_DIR', str(ROOT_DIR / 'java_daemon')),
+            output_limit=int(os.environ.get('COMPILER_JAVA_OUTPUT_LIMIT', 1024 * 1024)),
+            limits=run_limits
+        )
+    python_pool = None
+    if python_pool_size > 0 and fork_server is not None:
+        python_pool = PythonWorkerPool(python_pool_size, server=fork_server, rlimits=run_limits.rlimits())
+    local_compiler = LocalCompiler(
+        max_concurrency=local_concurrency,
+        timeout=run_timeout,
+        compile_timeout=float(os.environ.get('COMPILER_BUILD_TIMEOUT', 30)),
+        artifact_cache=artifact_cache,
+        python_pool=python_pool,
+        java_daemon=java_daemon,
+        workspaces=workspace_pool,
+        limits=run_limits,
+        fork_server=fork_server
+    )
+remote_compiler = RemoteCompiler(
+    url=os.environ.get('COMPILER_API_URL'),
+    api_key=os.environ.get('RAPIDAPI_KEY'),
+    api_host=os.environ.get('COMPILER_API_HOST'),
+    timeout=float(os.environ.get('COMPILER_TIMEOUT', 30)),
+    connect_timeout=float(os.environ.get('COMPILER_CONNECT_TIMEOUT', 5)),
+    max_connections=int(os.environ.get('COMPILER_MAX_CONNECTIONS', 20)),
+    max_concurrency=int(os.environ.get('COMPILER_MAX_CONCURRENCY', 20)),
+    retries=int(os.environ.get('COMPILER_RETRIES', 2))
+)
+# '' stores files and smells as documents; 'zlib' or 'zstd' as compressed blobs
+ANALYSIS_COMPRESSION = os.environ.get('ANALYSIS_COMPRESSION', '').lower()
+# Analyses older than this move to the cold tier; 0 keeps everything hot
+ANALYSIS_COLD_AFTER_DAYS = float(os.environ.get('ANALYSIS_COLD_AFTER_DAYS', 0))
+ANALYSIS_ARCHIVE_INTERVAL = int(os.environ.get('ANALYSIS_ARCHIVE_INTERVAL', 3600))
+cold_store = None
+if ANALYSIS_COLD_AFTER_DAYS > 0:
+    if os.environ.get('ANALYSIS_COLD_STORE', 'filesystem').lower() == 'gridfs':
+        cold_store = GridFSColdStore(db)
+    else:
+        cold_store = FileSystemColdStore(
+            os.environ.get('ANALYSIS_COLD_DIR', str(ROOT_DIR / 'cold_analyses'))
+        )
+# Write concern of stored analyses: w is a node count or 'majority', j waits for the journal
+ANALYSIS_WRITE_W = os.environ.get('ANALYSIS_WRITE_W', '1')
+analysis_write_concern = WriteConcern(
+    w=int(ANALYSIS_WRITE_W) if ANALYSIS_WRITE_W.isdigit() else ANALYSIS_WRITE_W,
+    j=os.environ.get('ANALYSIS_WRITE_J', 'false').lower() == 'true'
+)
+write_buffer = None
+if os.environ.get('ANALYSIS_WRITE_BUFFER', 'true').lower() == 'true':
+    write_buffer = WriteBehindBuffer(
+        max_docs=int(os.environ.get('WRITE_BUFFER_MAX_DOCS', 1000)),
+        max_delay=int(os.environ.get('WRITE_BUFFER_MAX_DELAY_MS', 50)) / 1000,
+        max_pending=int(os.environ.get('WRITE_BUFFER_MAX_PENDING', 50000))
+    )
+analysis_store = AnalysisStore(
+    *(db.get_collection(name, write_concern=analysis_write_concern)
+      for name in ('analyses', 'analysis_files', 'analysis_smells')),
+    blobs=db.get_collection('analysis_blobs', write_concern=analysis_write_concern),
+    compression=available_codec(ANALYSIS_COMPRESSION) if ANALYSIS_COMPRESSION else None,
+    cold_store=cold_store,
+    write_buffer=write_buffer
+)
+maintenance_tasks = set()
+background_jobs = set()
 hotspot_detector = HotspotDetector()
 health_calculator = HealthIndexCalculator()
 refactor_generator = RefactorStrategyGenerator()
 ai_orchestrator = AIOrchestrator()
 
-# Language detection
-def detect_language(filename: str) -> str:
-    """Detect programming language from file extension"""
-    ext_map = {
-        '.py': 'python',
-        '.js': 'javascript',
-        '.jsx': 'javascript',
-        '.ts': 'javascript',
-        '.tsx': 'javascript',
-        '.java': 'java',
-        '.cpp': 'cpp',
-        '.cc': 'cpp',
-        '.cxx': 'cpp',
-        '.c': 'cpp',
-        '.h': 'cpp',
-        '.hpp': 'cpp',
-        '.go': 'go',
-        '.rs': 'rust',
-        '.sql': 'sql',
-        '.sh': 'bash',
-        '.bash': 'bash'
-    }
-    
-    ext = Path(filename).suffix.lower()
-    return ext_map.get(ext, 'unknown')
-
 @api_router.get("/")
 async def root():
     return {
@@ -86,12 +209,208 @@ async def health_check():
     return {
         "status": "healthy",
         "ai_enabled": ai_available,
-        "ai_provider": os.environ.get('AI_PROVIDER', 'none')
+        "ai_provider": os.environ.get('AI_PROVIDER', 'none'),
+        "write_buffer": write_buffer.metrics() if write_buffer else None,
+        "artifact_cache": artifact_cache.metrics() if artifact_cache else None,
+        "python_pool": local_compiler.python_pool.metrics()
+        if local_compiler and local_compiler.python_pool else None,
+        "fork_server": local_compiler.fork_server.metrics()
+        if local_compiler and local_compiler.fork_server else None,
+        "java_daemon": local_compiler.java_daemon.metrics()
+        if local_compiler and local_compiler.java_daemon else None,
+        "workspaces": workspace_pool.metrics() if workspace_pool else None
     }
 
+def new_clone_index() -> CloneIndex:
+    return CloneIndex(max_entries=CLONE_INDEX_SIZE, max_clones=CLONE_MAX_RESULTS)
+
+def index_clones(clone_index: CloneIndex, chunk: List[FileAnalysis], health: HealthAccumulator):
+    """Feed a chunk's fingerprints to the clone index, recording duplicated lines"""
+    for analysis in chunk:
+        duplicated_lines = clone_index.add(
+            analysis.metrics.filename, analysis.fingerprints, analysis.metrics.loc
+        )
+        analysis.metrics.duplicated_lines = duplicated_lines
+        health.duplicated_lines += duplicated_lines
+
+def build_result(project_name: str, files: List[FileMetrics], smells: List[CodeSmell],
+                 health: Optional[HealthAccumulator] = None, **extra) -> AnalysisResult:
+    """Run the aggregate stages over per-file results.
+
+    Totals and the health index come from the merged health aggregates;
+    without them the aggregates are rebuilt from files and smells.
+    """
+    if health is None:
+        health = HealthAccumulator.from_results(files, smells)
+    total_loc = health.total_loc
+    avg_complexity = health.avg_complexity
+
+    # Detect hotspots
+    hotspots = hotspot_detector.detect(files, smells, top_k=HOTSPOT_LIMIT or None)
+
+    # Calculate health index
+    health_index = health_calculator.score(health)
+
+    # Generate refactor strategies
+    refactor_actions = refactor_generator.generate(hotspots, smells)
+
+    return AnalysisResult(
+        project_name=project_name,
+        health_index=health_index,
+        total_files=len(files),
+        total_loc=total_loc,
+        avg_complexity=round(avg_complexity, 2),
+        files=files,
+        smells=smells,
+        hotspots=hotspots,
+        refactor_actions=refactor_actions,
+        duplication_ratio=health.duplication_ratio,
+        **extra
+    )
+
+async def store_result(result: AnalysisResult, wait: bool = False):
+    await analysis_store.save(result, wait=wait)
+
+async def pipeline_events(project_name: str, sources: Iterable[Tuple[str, str]],
+                          tracker: Optional[JobTracker] = None
+                          ) -> AsyncIterator[Union[List[FileAnalysis], AnalysisResult]]:
+    """Run the full pipeline over (filename, code) pairs.
+
+    Yields each chunk of per-file results as soon as it is ready, then the
+    stored AnalysisResult. Sources are consumed lazily; only per-file
+    metrics and smells are kept. When a tracker is given, progress is
+    reported to it as files complete.
+    """
+    if tracker:
+        await tracker.stage('analyzing')
+
+    # Analyze files in the worker pool, merging chunk results back here
+    all_file_metrics = []
+    all_smells = []
+
+    stats = FileStageStats()
+    clone_index = new_clone_index()
+    async for chunk in analysis_pool.map(sources, cache=analysis_cache, stats=stats):
+        index_clones(clone_index, chunk, stats.health)
+        for analysis in chunk:
+            all_file_metrics.append(analysis.metrics)
+            all_smells.extend(analysis.smells)
+        if tracker:
+            await tracker.advance(len(chunk))
+        yield chunk
+
+    if not all_file_metrics:
+        raise HTTPException(status_code=400, detail="No analyzable files found")
+
+    if tracker:
+        await tracker.stage('aggregating')
+
+    result = build_result(
+        project_name, all_file_metrics, all_smells,
+        health=stats.health,
+        cache_hit_rate=stats.cache_hit_rate,
+        clones=clone_index.clones()
+    )
+
+    if tracker:
+        await tracker.stage('storing')
+
+    # A job is only reported complete once its result is written
+    await store_result(result, wait=tracker is not None)
+
+    yield result
+
+async def analyze_sources(project_name: str, sources: Iterable[Tuple[str, str]],
+                          tracker: Optional[JobTracker] = None) -> AnalysisResult:
+    """Run the full pipeline and return the stored AnalysisResult"""
+    async for event in pipeline_events(project_name, sources, tracker):
+        if isinstance(event, AnalysisResult):
+            return event
+
+def encode_stream_record(record: dict, media_type: str) -> str:
+    data = json.dumps(record)
+    if media_type == SSE_MEDIA_TYPE:
+        return f"event: {record['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+async def stream_records(project_name: str, sources: Iterable[Tuple[str, str]], media_type: str,
+                         cleanup: Optional[Callable[[], None]] = None) -> AsyncIterator[str]:
+    """Emit one record per analyzed file, then a summary record"""
+    try:
+        async for event in pipeline_events(project_name, sources):
+            if isinstance(event, AnalysisResult):
+                summary = event.model_dump(mode='json', exclude={'files', 'smells'})
+                summary['analysis_id'] = summary.pop('id')
+                yield encode_stream_record({'type': 'summary', **summary}, media_type)
+            else:
+                yield "".join(
+                    encode_stream_record({
+                        'type': 'file',
+                        'file': analysis.metrics.model_dump(mode='json'),
+                        'smells': [s.model_dump(mode='json') for s in analysis.smells]
+                    }, media_type)
+                    for analysis in event
+                )
+    except HTTPException as e:
+        yield encode_stream_record({'type': 'error', 'detail': e.detail}, media_type)
+    except IngestError as e:
+        yield encode_stream_record({'type': 'error', 'detail': str(e)}, media_type)
+    except Exception as e:
+        logging.error(f"Streaming analysis error: {str(e)}")
+        yield encode_stream_record({'type': 'error', 'detail': str(e)}, media_type)
+    finally:
+        if cleanup:
+            cleanup()
+
+def start_stream(project_name: str, sources: Iterable[Tuple[str, str]], accept: Optional[str],
+                 cleanup: Optional[Callable[[], None]] = None) -> StreamingResponse:
+    """Stream results as NDJSON, or as Server-Sent Events if the client asks for them"""
+    media_type = SSE_MEDIA_TYPE if accept and SSE_MEDIA_TYPE in accept else NDJSON_MEDIA_TYPE
+    return StreamingResponse(
+        stream_records(project_name, sources, media_type, cleanup),
+        media_type=media_type,
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+async def run_job(tracker: JobTracker, project_name: str, sources: Iterable[Tuple[str, str]],
+                  cleanup: Optional[Callable[[], None]] = None):
+    try:
+        result = await analyze_sources(project_name, sources, tracker)
+        await tracker.complete(result.id)
+    except HTTPException as e:
+        await tracker.fail(str(e.detail))
+    except IngestError as e:
+        await tracker.fail(str(e))
+    except asyncio.CancelledError:
+        await tracker.fail("Analysis interrupted by server shutdown")
+        raise
+    except Exception as e:
+        logging.error(f"Analysis job error: {str(e)}")
+        await tracker.fail(str(e))
+    finally:
+        if cleanup:
+            cleanup()
+
+async def start_job(project_name: str, sources: Iterable[Tuple[str, str]], total_files: int,
+                    cleanup: Optional[Callable[[], None]] = None) -> JSONResponse:
+    """Queue the pipeline as a background job and return its id right away"""
+    job = await job_store.create(project_name, total_files)
+    tracker = JobTracker(job_store, job['id'], total_files)
+
+    task = asyncio.create_task(run_job(tracker, project_name, sources, cleanup))
+    background_jobs.add(task)
+    task.add_done_callback(background_jobs.discard)
+
+    return JSONResponse(status_code=202, content=job)
+
 @api_router.post("/analyze")
-async def analyze_code(request: AnalysisRequest):
-    """Analyze single file or multiple files"""
+async def analyze_code(request: AnalysisRequest, mode: str = "sync",
+                       accept: Optional[str] = Header(None)):
+    """Analyze single file or multiple files.
+
+    mode=job runs the analysis in the background and returns a job id.
+    mode=stream streams per-file records followed by a summary record.
+    """
     try:
         files_to_analyze = []
         
@@ -113,84 +432,16 @@ async def analyze_code(request: AnalysisRequest):
         if not files_to_analyze:
             raise HTTPException(status_code=400, detail="No files provided")
         
-        # Analyze each file
-        all_file_metrics = []
-        all_smells = []
-        total_loc = 0
-        total_complexity = 0
-        
-        for file_data in files_to_analyze:
-            filename = file_data['filename']
-            code = file_data['code']
-            language = detect_language(filename)
-            
-            if language == 'unknown':
-                continue
-            
-            # Get adapter and analyze
-            adapter = get_adapter(language, code, filename)
-            ast_data = adapter.analyze(code)
-            
-            # Calculate metrics
-            loc = metrics_calc.calculate_loc(code)
-            complexity = metrics_calc.calculate_complexity(ast_data)
-            
-            # Detect smells
-            file_data_with_code = {**file_data, 'code': code}
-            smells = smell_detector.detect(file_data_with_code, ast_data)
-            
-            file_metrics = FileMetrics(
-                filename=filename,
-                language=language,
-                loc=loc,
-                functions=len(ast_data.get('functions', [])),
-                classes=len(ast_data.get('classes', [])),
-                complexity=complexity,
-                nesting_depth=ast_data.get('nesting_depth', 0),
-                smells=[s.type for s in smells]
-            )
-            
-            all_file_metrics.append(file_metrics)
-            all_smells.extend(smells)
-            total_loc += loc
-            total_complexity += complexity
-        
-        if not all_file_metrics:
-            raise HTTPException(status_code=400, detail="No analyzable files found")
-        
-        # Calculate averages
-        avg_complexity = total_complexity / len(all_file_metrics)
-        
-        # Detect hotspots
-        hotspots = hotspot_detector.detect(all_file_metrics, all_smells)
-        
-        # Calculate health index
-        health_index = health_calculator.calculate(
-            all_file_metrics, all_smells, total_loc, avg_complexity
-        )
-        
-        # Generate refactor strategies
-        refactor_actions = refactor_generator.generate(hotspots, all_smells)
-        
-        # Create result
-        result = AnalysisResult(
-            project_name=request.project_name,
-            health_index=health_index,
-            total_files=len(all_file_metrics),
-            total_loc=total_loc,
-            avg_complexity=round(avg_complexity, 2),
-            files=all_file_metrics,
-            smells=all_smells,
-            hotspots=hotspots,
-            refactor_actions=refactor_actions
-        )
-        
-        # Store in database
-        doc = result.model_dump()
-        doc['timestamp'] = doc['timestamp'].isoformat()
-        await db.analyses.insert_one(doc)
-        
-        return result
+        sources = ((f['filename'], f['code']) for f in files_to_analyze)
+
+        if mode == "job":
+            total_files = sum(1 for f in files_to_analyze if detect_language(f['filename']) != 'unknown')
+            return await start_job(request.project_name, sources, total_files)
+
+        if mode == "stream":
+            return start_stream(request.project_name, sources, accept)
+
+        return await analyze_sources(request.project_name, sources)
     
     except HTTPException:
         raise
@@ -198,87 +449,91 @@ async def analyze_code(request: AnalysisRequest):
         logging.error(f"Analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 @api_router.post("/analyze/upload")
-async def analyze_upload(file: UploadFile = File(...), project_name: str = "Uploaded Project"):
-    """Analyze uploaded file or ZIP"""
+async def analyze_upload(file: UploadFile = File(...), project_name: str = "Uploaded Project",
+                         mode: str = "sync", accept: Optional[str] = Header(None)):
+    """Analyze uploaded file or ZIP.
+
+    mode=job runs the analysis in the background and returns a job id.
+    mode=stream streams per-file records followed by a summary record.
+    """
+    spool = None
     try:
-        content = await file.read()
-        files_dict = {}
-
-        allowed_ext = (
-            '.py', '.js', '.ts', '.java', '.cpp', '.c', '.go', '.rs', '.sql', '.sh'
-        )
-
-        ignore_folders = (
-            'node_modules', 'venv', '__pycache__', '.git', 'dist', 'build'
-        )
+        # Spool to disk in chunks instead of holding the whole upload in memory
+        spool = await spool_upload(file, ingest_limits)
 
         # Check if ZIP
         if file.filename.endswith('.zip'):
-            with zipfile.ZipFile(io.BytesIO(content)) as zf:
-                for filename in zf.namelist():
-
-                    # Skip folders
-                    if filename.endswith('/'):
-                        continue
-
-                    # Skip heavy folders
-                    if any(x in filename.lower() for x in ignore_folders):
-                        continue
-
-                    # Allow only source code files
-                    if not filename.lower().endswith(allowed_ext):
-                        continue
-
-                    try:
-                        raw = zf.read(filename)
-
-                        try:
-                            file_content = raw.decode('utf-8')
-                        except:
-                            file_content = str(raw)
-
-                        if not isinstance(file_content, str):
-                            file_content = str(file_content)
-
-                        files_dict[filename] = file_content
-
-                    except:
-                        continue
-
+            total_files = count_zip_sources(spool) if mode == "job" else None
+            # Entries are decompressed one at a time as the pipeline asks for them
+            sources = iter_zip_sources(spool, ingest_limits)
         else:
             # Single file
             try:
-                file_content = content.decode('utf-8')
-                if not isinstance(file_content, str):
-                    file_content = str(file_content)
-                files_dict[file.filename] = file_content
-            except:
+                file_content = spool.read().decode('utf-8')
+            except UnicodeDecodeError:
                 raise HTTPException(status_code=400, detail="Could not decode file")
+            total_files = 1
+            sources = [(file.filename, file_content)]
 
-        if not files_dict:
-            raise HTTPException(status_code=400, detail="No valid source files found")
+        if mode == "job":
+            # The job owns the spool from here on and closes it when done
+            job_spool, spool = spool, None
+            return await start_job(project_name, sources, total_files, cleanup=job_spool.close)
 
-        # Create analysis request
-        request = AnalysisRequest(
-            project_name=project_name,
-            files=files_dict
-        )
+        if mode == "stream":
+            # Likewise for the response stream
+            stream_spool, spool = spool, None
+            return start_stream(project_name, sources, accept, cleanup=stream_spool.close)
 
-        return await analyze_code(request)
+        return await analyze_sources(project_name, sources)
 
+    except IngestLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
         logging.error(f"Upload analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if spool is not None:
+            spool.close()
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status and progress of an analysis job"""
+    try:
+        job = await job_store.get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error fetching job: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @api_router.get("/analyses")
-async def get_analyses(limit: int = 10):
-    """Get recent analyses"""
+async def get_analyses(response: Response, limit: int = 10, cursor: Optional[str] = None,
+                       project_name: Optional[str] = None, min_health: Optional[float] = None,
+                       max_health: Optional[float] = None):
+    """Get recent analyses, newest first.
+
+    Pass the X-Next-Cursor header of one page as `cursor` to get the next;
+    the header is absent on the last page.
+    """
     try:
-        analyses = await db.analyses.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
+        analyses, next_cursor = await analysis_store.list_summaries(
+            max(1, min(limit, ANALYSES_PAGE_MAX)), cursor=cursor, project_name=project_name,
+            min_health=min_health, max_health=max_health
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return analyses
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error fetching analyses: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -287,7 +542,7 @@ async def get_analyses(limit: int = 10):
 async def get_analysis(analysis_id: str):
     """Get specific analysis"""
     try:
-        analysis = await db.analyses.find_one({"id": analysis_id}, {"_id": 0})
+        analysis = await analysis_store.get(analysis_id)
         if not analysis:
             raise HTTPException(status_code=404, detail="Analysis not found")
         return analysis
@@ -297,62 +552,149 @@ async def get_analysis(analysis_id: str):
         logging.error(f"Error fetching analysis: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-load_dotenv()
+@api_router.post("/analyses/{analysis_id}/delta")
+async def analyze_delta(analysis_id: str, request: AnalysisDeltaRequest):
+    """Re-analyze a stored analysis given only the files that changed since"""
+    try:
+        base = await analysis_store.get_base(analysis_id)
+        if not base:
+            raise HTTPException(status_code=404, detail="Analysis not found")
 
-RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
+        changed = {**request.added, **request.modified}
+        removed = set(request.deleted) | set(changed)
+
+        # Untouched files keep their stored metrics and smells
+        all_file_metrics = [FileMetrics(**f) for f in base.get('files', []) if f['filename'] not in removed]
+        all_smells = [CodeSmell(**s) for s in base.get('smells', []) if s['file'] not in removed]
+        # Stored files are aggregated here, changed ones by the workers
+        health = HealthAccumulator.from_results(all_file_metrics, all_smells)
+        clones = [
+            CodeClone(**c) for c in base.get('clones', [])
+            if c['file_a'] not in removed and c['file_b'] not in removed
+        ]
 
-@api_router.post("/compile")
-async def compile_code(request: CompilerRequest):
+        # Changed files are only compared with each other; their clones of
+        # untouched files are picked up by the next full analysis
+        stats = FileStageStats()
+        clone_index = new_clone_index()
+        async for chunk in analysis_pool.map(changed.items(), cache=analysis_cache, stats=stats):
+            index_clones(clone_index, chunk, stats.health)
+            for analysis in chunk:
+                all_file_metrics.append(analysis.metrics)
+                all_smells.extend(analysis.smells)
+        clones = sorted(clones + clone_index.clones(), key=lambda c: c.lines, reverse=True)
 
-    language_map = {
-        "python": "python",
-        "javascript": "javascript",
-        "typescript": "typescript",
-        "cpp": "cpp",
-        "c": "c",
-        "java": "java",
-        "go": "go",
-        "rust": "rust",
-        "csharp": "csharp",
-        "kotlin": "kotlin",
-        "swift": "swift",
-        "ruby": "ruby",
-        "php": "php",
-        "r": "r",
-        "scala": "scala",
-        "bash": "bash",
-        "sql": "mysql"
-    }
+        if not all_file_metrics:
+            raise HTTPException(status_code=400, detail="No analyzable files left")
 
-    url = "https://onecompiler-apis.p.rapidapi.com/api/v1/run"
+        health.update(stats.health)
 
-    payload = {
-        "language": language_map.get(request.language, request.language),
-        "stdin": request.input_data or "",
-        "files": [
-            {
-                "name": "main",
-                "content": request.code
-            }
-        ]
-    }
+        result = build_result(
+            request.project_name or base['project_name'], all_file_metrics, all_smells,
+            health=health,
+            cache_hit_rate=stats.cache_hit_rate,
+            base_analysis_id=analysis_id,
+            clones=clones[:CLONE_MAX_RESULTS]
+        )
+        await store_result(result)
 
-    headers = {
-        "content-type": "application/json",
-        "X-RapidAPI-Key": RAPIDAPI_KEY,
-        "X-RapidAPI-Host": "onecompiler-apis.p.rapidapi.com"
-    }
+        return result
 
-    response = requests.post(url, json=payload, headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Delta analysis error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-    data = response.json()
+@api_router.post("/compile")
+async def compile_code(request: CompilerRequest):
+    if local_compiler:
+        result = await local_compiler.execute(request.language, request.code, request.input_data or "")
+        return CompilerResponse(
+            success=result.success,
+            output=result.stdout,
+            error=result.stderr or None,
+            execution_time=round(result.execution_time, 4),
+            compile_time=round(result.compile_time, 4),
+            run_time=round(result.execution_time, 4),
+            cache_hit=result.cache_hit,
+            user_time=round(result.usage.user_time, 4) if result.usage else None,
+            system_time=round(result.usage.system_time, 4) if result.usage else None,
+            max_rss_kb=result.usage.max_rss_kb if result.usage else None,
+            rss_floor_kb=result.usage.rss_floor_kb if result.usage else None,
+            exit_signal=result.usage.exit_signal if result.usage else None
+        )
+
+    try:
+        data = await remote_compiler.run(request.language, request.code, request.input_data or "")
+    except RemoteCompilerError as e:
+        logging.error(f"Compile error: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
     return {
         "success": True,
         "output": data.get("stdout", ""),
-        "execution_time": data.get("time", 0)
+        "execution_time": data.get("time", 0),
+        "compile_time": 0.0,
+        "run_time": data.get("time", 0),
+        "cache_hit": False,
+        "user_time": None,
+        "system_time": None,
+        "max_rss_kb": None,
+        "rss_floor_kb": None,
+        "exit_signal": None
     }
 
+@api_router.post("/judge")
+async def judge_code(request: JudgeRequest):
+    """Build a program once and run it against every test case"""
+    if not local_compiler:
+        raise HTTPException(status_code=501, detail="Batch judging needs COMPILER_BACKEND=local")
+    if not request.cases:
+        raise HTTPException(status_code=400, detail="No test cases provided")
+    if len(request.cases) > COMPILER_JUDGE_MAX_CASES:
+        raise HTTPException(status_code=400, detail=f"At most {COMPILER_JUDGE_MAX_CASES} test cases per request")
+
+    try:
+        judged = await local_compiler.judge(
+            request.language,
+            request.code,
+            [JudgeCase(case.input_data, case.expected_output) for case in request.cases],
+            stop_on_failure=request.stop_on_failure,
+            ignore_whitespace=request.ignore_whitespace
+        )
+    except Exception as e:
+        logging.error(f"Judge error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    cases = []
+    for case in judged.cases:
+        result = case.result
+        if result is None:
+            cases.append(JudgeCaseResponse(verdict=case.verdict))
+            continue
+        usage = result.usage
+        cases.append(JudgeCaseResponse(
+            verdict=case.verdict,
+            output=result.stdout,
+            error=result.stderr or None,
+            run_time=round(result.execution_time, 4),
+            user_time=round(usage.user_time, 4) if usage else None,
+            system_time=round(usage.system_time, 4) if usage else None,
+            max_rss_kb=usage.max_rss_kb if usage else None,
+            rss_floor_kb=usage.rss_floor_kb if usage else None,
+            exit_signal=usage.exit_signal if usage else None
+        ))
+    return JudgeResponse(
+        verdict=judged.verdict,
+        passed=sum(1 for case in judged.cases if case.verdict == ACCEPTED),
+        total=len(request.cases),
+        compile_time=round(judged.compile_time, 4),
+        cache_hit=judged.cache_hit,
+        compile_error=judged.compile_error,
+        cases=cases
+    )
+
 @api_router.post("/ai-insights")
 async def get_ai_insights(request: AIInsightRequest):
     """Get AI insights for analysis"""
@@ -365,7 +707,7 @@ async def get_ai_insights(request: AIInsightRequest):
             )
         
         # Get analysis data
-        analysis = await db.analyses.find_one({"id": request.analysis_id}, {"_id": 0})
+        analysis = await analysis_store.get_summary(request.analysis_id, INSIGHT_FIELDS)
         if not analysis:
             raise HTTPException(status_code=404, detail="Analysis not found")
         
@@ -374,9 +716,9 @@ async def get_ai_insights(request: AIInsightRequest):
             'health_index': analysis['health_index'],
             'total_files': analysis['total_files'],
             'avg_complexity': analysis['avg_complexity'],
-            'smell_count': len(analysis['smells']),
-            'hotspot_count': len(analysis['hotspots']),
-            'risk_score': max([h['risk_score'] for h in analysis['hotspots']]) if analysis['hotspots'] else 0
+            'smell_count': analysis['smell_count'],
+            'hotspot_count': analysis['hotspot_count'],
+            'risk_score': analysis['max_risk_score']
         }
         
         insights = await ai_orchestrator.get_insights(ai_data, request.intent)
@@ -403,6 +745,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Logging
@@ -412,6 +755,49 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def archive_old_analyses():
+    """Periodically move analyses past ANALYSIS_COLD_AFTER_DAYS to the cold tier"""
+    while True:
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=ANALYSIS_COLD_AFTER_DAYS)
+            while await analysis_store.archive(cutoff.isoformat()):
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Analysis archiving error: {str(e)}")
+        await asyncio.sleep(ANALYSIS_ARCHIVE_INTERVAL)
+
+@app.on_event("startup")
+async def ensure_db_indexes():
+    await ensure_indexes(db)
+
+@app.on_event("startup")
+async def start_compilers():
+    if local_compiler:
+        await local_compiler.start()
+    else:
+        await remote_compiler.start()
+
+@app.on_event("startup")
+async def start_archiving():
+    if cold_store is not None:
+        task = asyncio.create_task(archive_old_analyses())
+        maintenance_tasks.add(task)
+        task.add_done_callback(maintenance_tasks.discard)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    tasks = list(background_jobs) + list(maintenance_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if write_buffer:
+        await write_buffer.drain()
+    await remote_compiler.close()
+    if local_compiler:
+        await local_compiler.close()
+    if workspace_pool:
+        workspace_pool.close()
+    analysis_pool.shutdown()
     client.close()
\ No newline at end of file
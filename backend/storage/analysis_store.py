@@ -0,0 +1,418 @@
+import asyncio
+import base64
+import binascii
+import json
+from typing import Iterable, List, Optional, Tuple
+
+from models.analysis import AnalysisResult
+from storage.compression import compress, decompress
+from storage.write_buffer import WriteBehindBuffer
+
+
+# Embedded arrays of the pre-split layout; summaries never carry them
+HEAVY_FIELDS = ('files', 'smells', 'hotspots')
+
+SUMMARY_PROJECTION = {'_id': 0, **{field: 0 for field in HEAVY_FIELDS}}
+
+INSIGHT_FIELDS = (
+    'health_index', 'total_files', 'avg_complexity', 'smell_count', 'hotspot_count', 'max_risk_score'
+)
+
+# Per-file and per-smell documents are written in batches of this size
+INSERT_BATCH = 1000
+
+# Compressed payloads are split into parts well under the 16 MB document limit
+BLOB_PART_BYTES = 8 * 1024 * 1024
+
+HOT_TIER = 'hot'
+COLD_TIER = 'cold'
+
+
+def encode_cursor(timestamp: str, analysis_id: str) -> str:
+    raw = json.dumps([timestamp, analysis_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, analysis_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(timestamp, str) or not isinstance(analysis_id, str):
+        raise ValueError("Invalid cursor")
+    return timestamp, analysis_id
+
+
+class AnalysisStore:
+    """Analyses split across a summary collection and per-file / per-smell collections.
+
+    The summary document holds the scalar results, the (bounded) refactor
+    actions and clones, and counts precomputed at write time, so listing
+    analyses or preparing AI insights never touches per-file data. Files
+    carry their hotspot fields (risk score, smell count, priority) and
+    their position in the original result; smells are one document each.
+
+    With `compression` set, files and smells are instead written as one
+    compressed payload (split into parts under the document size limit)
+    and only decompressed when a detail read asks for them. Analyses older
+    than a cutoff can be moved to `cold_store` with archive(); their
+    summaries stay in place, so listing and reads are unchanged.
+
+    With a `write_buffer`, inserts are group-committed in the background;
+    reads of one analysis wait for its pending writes.
+
+    Documents written before the split embed everything in the summary;
+    they are recognised by the missing `layout` marker and read as-is.
+    """
+
+    LAYOUT = 'split'
+    BLOB_LAYOUT = 'blob'
+
+    def __init__(self, summaries, files, smells, blobs=None, compression: Optional[str] = None,
+                 cold_store=None, write_buffer: Optional[WriteBehindBuffer] = None):
+        self.summaries = summaries
+        self.files = files
+        self.smells = smells
+        self.blobs = blobs
+        self.compression = compression if blobs is not None else None
+        self.cold_store = cold_store
+        self.write_buffer = write_buffer
+
+    # ---------------- Serialization ----------------
+
+    @staticmethod
+    def _counts(file_count: int, severities: Iterable[str], risk_scores: List[float]) -> dict:
+        severity_counts = {'high': 0, 'medium': 0, 'low': 0}
+        smell_count = 0
+        for severity in severities:
+            smell_count += 1
+            if severity in severity_counts:
+                severity_counts[severity] += 1
+        return {
+            'file_count': file_count,
+            'smell_count': smell_count,
+            'severity_counts': severity_counts,
+            'hotspot_count': len(risk_scores),
+            'max_risk_score': max(risk_scores, default=0)
+        }
+
+    def _summary(self, result: AnalysisResult, layout: str) -> dict:
+        doc = result.model_dump(exclude=set(HEAVY_FIELDS))
+        doc['timestamp'] = doc['timestamp'].isoformat()
+        doc.update(
+            layout=layout,
+            tier=HOT_TIER,
+            **self._counts(
+                len(result.files), (s.severity for s in result.smells),
+                [h.risk_score for h in result.hotspots]
+            )
+        )
+        if layout == self.BLOB_LAYOUT:
+            doc['codec'] = self.compression
+        return doc
+
+    @staticmethod
+    def _file_docs(result: AnalysisResult, keyed: bool = True) -> List[dict]:
+        # Documents of a compressed payload are not keyed by analysis_id
+        key = {'analysis_id': result.id} if keyed else {}
+        hotspots = {h.file: h for h in result.hotspots}
+        docs = []
+        for seq, metrics in enumerate(result.files):
+            doc = {**key, 'seq': seq, **metrics.model_dump()}
+            hotspot = hotspots.get(metrics.filename)
+            if hotspot is not None:
+                doc.update(
+                    risk_score=hotspot.risk_score,
+                    smells_count=hotspot.smells_count,
+                    priority=hotspot.priority
+                )
+            docs.append(doc)
+        return docs
+
+    @staticmethod
+    def _smell_docs(result: AnalysisResult, keyed: bool = True) -> List[dict]:
+        key = {'analysis_id': result.id} if keyed else {}
+        return [
+            {**key, 'seq': seq, **smell.model_dump()}
+            for seq, smell in enumerate(result.smells)
+        ]
+
+    @staticmethod
+    def _legacy_file_docs(doc: dict) -> List[dict]:
+        """File documents (with hotspot fields) rebuilt from a pre-split document"""
+        hotspots = {h['file']: h for h in doc.get('hotspots') or []}
+        docs = []
+        for seq, metrics in enumerate(doc.get('files') or []):
+            file_doc = {'seq': seq, **metrics}
+            hotspot = hotspots.get(metrics['filename'])
+            if hotspot is not None:
+                file_doc.update(
+                    risk_score=hotspot['risk_score'],
+                    smells_count=hotspot['smells_count'],
+                    priority=hotspot['priority']
+                )
+            docs.append(file_doc)
+        return docs
+
+    @staticmethod
+    def _hotspot(doc: dict) -> dict:
+        return {
+            'file': doc['filename'],
+            'risk_score': doc['risk_score'],
+            'complexity': float(doc.get('complexity', 0)),
+            'smells_count': doc.get('smells_count', 0),
+            'priority': doc.get('priority', 'low')
+        }
+
+    def _hotspots(self, file_docs: List[dict]) -> List[dict]:
+        ranked = sorted(
+            (doc for doc in file_docs if 'risk_score' in doc),
+            key=lambda doc: (-doc['risk_score'], doc['seq'])
+        )
+        return [self._hotspot(doc) for doc in ranked]
+
+    @staticmethod
+    def _strip(doc: dict) -> dict:
+        for field in ('_id', 'analysis_id', 'seq', 'risk_score', 'smells_count', 'priority'):
+            doc.pop(field, None)
+        return doc
+
+    # JSON and compression of a large analysis take long enough to stall the
+    # event loop; callers run _pack and _unpack on a worker thread
+
+    @staticmethod
+    def _pack(file_docs: List[dict], smell_docs: List[dict], codec: str) -> bytes:
+        payload = {'files': file_docs, 'smells': smell_docs}
+        return compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'), codec)
+
+    @staticmethod
+    def _unpack(data: bytes, codec: str) -> Tuple[List[dict], List[dict]]:
+        payload = json.loads(decompress(data, codec))
+        return payload['files'], payload['smells']
+
+    async def _insert(self, collection, docs: List[dict], stage: int = 0, key: Optional[str] = None,
+                      after: Iterable[Optional[asyncio.Future]] = ()) -> Optional[asyncio.Future]:
+        """Insert now, or queue on the write buffer and return its completion future.
+
+        Buffered writes are only made once the `after` writes are.
+        """
+        if not docs:
+            return None
+        if self.write_buffer is not None:
+            return await self.write_buffer.enqueue(
+                collection, docs, stage=stage, key=key, after=[f for f in after if f is not None]
+            )
+        for start in range(0, len(docs), INSERT_BATCH):
+            await collection.insert_many(docs[start:start + INSERT_BATCH], ordered=False)
+        return None
+
+    async def _await_write(self, analysis_id: str):
+        # Read-your-writes for analyses still sitting in the write buffer;
+        # raises WriteDropped for one that was never stored
+        if self.write_buffer is not None:
+            await self.write_buffer.wait_for(analysis_id)
+
+    # ---------------- Payload locations ----------------
+
+    async def _write_blob(self, analysis_id: str, data: bytes) -> Optional[asyncio.Future]:
+        return await self._insert(self.blobs, [
+            {'analysis_id': analysis_id, 'part': part, 'data': data[start:start + BLOB_PART_BYTES]}
+            for part, start in enumerate(range(0, len(data), BLOB_PART_BYTES))
+        ], key=analysis_id)
+
+    async def _read_blob(self, analysis_id: str) -> bytes:
+        parts = await self.blobs.find(
+            {'analysis_id': analysis_id}, {'_id': 0, 'data': 1}
+        ).sort('part', 1).to_list(None)
+        return b''.join(part['data'] for part in parts)
+
+    async def _load(self, doc: dict) -> Tuple[List[dict], List[dict]]:
+        """File and smell documents of a stored analysis, wherever they live"""
+        analysis_id = doc['id']
+        if doc.get('tier') == COLD_TIER:
+            if self.cold_store is None:
+                raise ValueError("Analysis is archived but no cold store is configured")
+            data = await self.cold_store.get(analysis_id)
+            return await asyncio.to_thread(self._unpack, data, doc['codec'])
+        if doc.get('layout') == self.BLOB_LAYOUT:
+            data = await self._read_blob(analysis_id)
+            return await asyncio.to_thread(self._unpack, data, doc['codec'])
+
+        files = await self.files.find(
+            {'analysis_id': analysis_id}, {'_id': 0, 'analysis_id': 0}
+        ).sort('seq', 1).to_list(None)
+        smells = await self.smells.find(
+            {'analysis_id': analysis_id}, {'_id': 0, 'analysis_id': 0}
+        ).sort('seq', 1).to_list(None)
+        return files, smells
+
+    async def _drop_hot(self, analysis_id: str):
+        await self.files.delete_many({'analysis_id': analysis_id})
+        await self.smells.delete_many({'analysis_id': analysis_id})
+        if self.blobs is not None:
+            await self.blobs.delete_many({'analysis_id': analysis_id})
+
+    # ---------------- Public API ----------------
+
+    async def save(self, result: AnalysisResult, wait: bool = False):
+        """Store one result; the summary goes last so listed analyses are complete.
+
+        With a write buffer this returns once the result is queued, unless
+        `wait` asks for it to be written first (a dropped write then raises
+        WriteDropped). The summary is never written if any of the result's
+        other documents were dropped.
+        """
+        if self.compression:
+            data = await asyncio.to_thread(
+                self._pack, self._file_docs(result, keyed=False),
+                self._smell_docs(result, keyed=False), self.compression
+            )
+            parts = [await self._write_blob(result.id, data)]
+            layout = self.BLOB_LAYOUT
+        else:
+            parts = [
+                await self._insert(self.files, self._file_docs(result), key=result.id),
+                await self._insert(self.smells, self._smell_docs(result), key=result.id)
+            ]
+            layout = self.LAYOUT
+
+        written = await self._insert(
+            self.summaries, [self._summary(result, layout)], stage=1, key=result.id, after=parts
+        )
+        if wait and written is not None:
+            await written
+
+    async def list_summaries(self, limit: int = 10, cursor: Optional[str] = None,
+                             project_name: Optional[str] = None, min_health: Optional[float] = None,
+                             max_health: Optional[float] = None) -> Tuple[List[dict], Optional[str]]:
+        """One page of summaries, newest first, and the cursor of the next page.
+
+        Pages are keyed on (timestamp, id) rather than skipped over, so any
+        page costs one index seek plus `limit` documents however deep it is.
+        """
+        query = {}
+        if project_name:
+            query['project_name'] = project_name
+        if min_health is not None or max_health is not None:
+            query['health_index'] = {}
+            if min_health is not None:
+                query['health_index']['$gte'] = min_health
+            if max_health is not None:
+                query['health_index']['$lte'] = max_health
+        if cursor:
+            timestamp, analysis_id = decode_cursor(cursor)
+            query['$or'] = [
+                {'timestamp': {'$lt': timestamp}},
+                {'timestamp': timestamp, 'id': {'$lt': analysis_id}}
+            ]
+
+        docs = await self.summaries.find(query, SUMMARY_PROJECTION).sort(
+            [('timestamp', -1), ('id', -1)]
+        ).limit(limit + 1).to_list(limit + 1)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1]['timestamp'], docs[-1]['id'])
+        return docs, next_cursor
+
+    async def get_summary(self, analysis_id: str, fields: Tuple[str, ...]) -> Optional[dict]:
+        """Selected summary fields, with counts derived for pre-split documents"""
+        await self._await_write(analysis_id)
+        projection = {'_id': 0, 'layout': 1, **{field: 1 for field in fields}}
+        doc = await self.summaries.find_one({'id': analysis_id}, projection)
+        if doc is None or doc.pop('layout', None) in (self.LAYOUT, self.BLOB_LAYOUT):
+            return doc
+
+        legacy = await self.summaries.find_one(
+            {'id': analysis_id}, {'_id': 0, 'smells.severity': 1, 'hotspots.risk_score': 1}
+        )
+        counts = self._counts(
+            0, (s['severity'] for s in legacy.get('smells', [])),
+            [h['risk_score'] for h in legacy.get('hotspots', [])]
+        )
+        doc.update({field: value for field, value in counts.items() if field in fields})
+        return doc
+
+    async def get_hotspots(self, analysis_id: str, limit: int = 0) -> List[dict]:
+        """Hotspot files of a per-file analysis, riskiest first (ties keep their original order)"""
+        cursor = self.files.find(
+            {'analysis_id': analysis_id, 'risk_score': {'$exists': True}},
+            {'_id': 0, 'filename': 1, 'risk_score': 1, 'complexity': 1, 'smells_count': 1, 'priority': 1}
+        ).sort([('risk_score', -1), ('seq', 1)])
+        if limit:
+            cursor = cursor.limit(limit)
+        return [self._hotspot(doc) for doc in await cursor.to_list(None)]
+
+    async def get(self, analysis_id: str) -> Optional[dict]:
+        """The full result, reassembled from its summary, files and smells"""
+        await self._await_write(analysis_id)
+        doc = await self.summaries.find_one({'id': analysis_id}, {'_id': 0})
+        if doc is None or doc.get('layout') not in (self.LAYOUT, self.BLOB_LAYOUT):
+            return doc
+
+        files, smells = await self._load(doc)
+        if doc.get('tier') == COLD_TIER or doc['layout'] == self.BLOB_LAYOUT:
+            doc['hotspots'] = self._hotspots(files)
+        else:
+            doc['hotspots'] = await self.get_hotspots(analysis_id)
+        doc['files'] = [self._strip(f) for f in files]
+        doc['smells'] = [self._strip(s) for s in smells]
+        return doc
+
+    async def get_base(self, analysis_id: str) -> Optional[dict]:
+        """What a delta analysis needs: project name, files, smells and clones"""
+        await self._await_write(analysis_id)
+        doc = await self.summaries.find_one(
+            {'id': analysis_id},
+            {'_id': 0, 'id': 1, 'layout': 1, 'tier': 1, 'codec': 1,
+             'project_name': 1, 'files': 1, 'smells': 1, 'clones': 1}
+        )
+        if doc is None or doc.get('layout') not in (self.LAYOUT, self.BLOB_LAYOUT):
+            return doc
+
+        files, smells = await self._load(doc)
+        return {
+            'project_name': doc['project_name'],
+            'clones': doc.get('clones', []),
+            'files': [self._strip(f) for f in files],
+            'smells': [self._strip(s) for s in smells]
+        }
+
+    async def archive(self, older_than: str, limit: int = 100) -> int:
+        """Move up to `limit` hot analyses with timestamps before `older_than` to the cold store"""
+        if self.cold_store is None:
+            return 0
+        codec = self.compression or 'zlib'
+        docs = await self.summaries.find(
+            {'timestamp': {'$lt': older_than}, 'tier': {'$ne': COLD_TIER}},
+            {'_id': 0, 'id': 1, 'layout': 1, 'codec': 1}
+        ).sort('timestamp', 1).limit(limit).to_list(limit)
+
+        for doc in docs:
+            analysis_id = doc['id']
+            update = {'tier': COLD_TIER, 'codec': codec}
+            if doc.get('layout') in (self.LAYOUT, self.BLOB_LAYOUT):
+                files, smells = await self._load(doc)
+            else:
+                legacy = await self.summaries.find_one(
+                    {'id': analysis_id}, {'_id': 0, 'files': 1, 'smells': 1, 'hotspots': 1}
+                )
+                files = self._legacy_file_docs(legacy)
+                smells = [{'seq': seq, **smell} for seq, smell in enumerate(legacy.get('smells') or [])]
+                update.update(layout=self.BLOB_LAYOUT, **self._counts(
+                    len(files), (s['severity'] for s in smells),
+                    [f['risk_score'] for f in files if 'risk_score' in f]
+                ))
+
+            data = await asyncio.to_thread(self._pack, files, smells, codec)
+            await self.cold_store.put(analysis_id, data)
+            await self.summaries.update_one(
+                {'id': analysis_id},
+                {'$set': update, '$unset': {field: '' for field in HEAVY_FIELDS}}
+            )
+            await self._drop_hot(analysis_id)
+
+        return len(docs)
@@ -0,0 +1,64 @@
+import asyncio
+import os
+import uuid
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+
+class FileSystemColdStore:
+    """Archived analysis payloads as one file each under a local directory"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        # Keys are analysis ids (uuids); fan out so no directory grows unbounded
+        return self.root / key[:2] / f"{key}.bin"
+
+    def _write(self, key: str, data: bytes):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _read(self, key: str) -> bytes:
+        with open(self._path(key), 'rb') as f:
+            return f.read()
+
+    def _remove(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def put(self, key: str, data: bytes):
+        await asyncio.to_thread(self._write, key, data)
+
+    async def get(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._read, key)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._remove, key)
+
+
+class GridFSColdStore:
+    """Archived analysis payloads in a GridFS bucket, one file per analysis"""
+
+    def __init__(self, db, bucket_name: str = 'analysis_archive'):
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+
+    async def put(self, key: str, data: bytes):
+        # Replace rather than accumulate revisions if an archive run is retried
+        await self.delete(key)
+        await self.bucket.upload_from_stream(key, data)
+
+    async def get(self, key: str) -> bytes:
+        stream = await self.bucket.open_download_stream_by_name(key)
+        return await stream.read()
+
+    async def delete(self, key: str):
+        async for grid_out in self.bucket.find({'filename': key}):
+            await self.bucket.delete(grid_out._id)
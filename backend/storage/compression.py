@@ -0,0 +1,50 @@
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+CODECS = ('zlib', 'zstd')
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def _zstd():
+    # Optional dependency: only needed when zstd is configured
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd compression requires the 'zstandard' package")
+    return zstandard
+
+
+def available_codec(codec: str) -> str:
+    """The configured codec, or zlib when it is unknown or not installed"""
+    codec = (codec or 'zlib').lower()
+    if codec not in CODECS:
+        logger.warning(f"Unknown compression codec '{codec}', using zlib")
+        return 'zlib'
+    if codec == 'zstd':
+        try:
+            _zstd()
+        except ValueError as e:
+            logger.warning(f"{str(e)}, using zlib")
+            return 'zlib'
+    return codec
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == 'zlib':
+        return zlib.compress(data, ZLIB_LEVEL)
+    if codec == 'zstd':
+        return _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    raise ValueError(f"Unknown compression codec '{codec}'")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'zstd':
+        return _zstd().ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown compression codec '{codec}'")
@@ -0,0 +1,43 @@
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+
+# Every index the application relies on, by collection. Ensured once at
+# startup; create_indexes is a no-op for indexes that already exist.
+# (The analysis cache and job TTL indexes depend on runtime config and are
+# ensured by AnalysisCache and JobStore themselves.)
+INDEXES: Dict[str, List[IndexModel]] = {
+    'analyses': [
+        IndexModel([('id', ASCENDING)], unique=True),
+        # Keyset pagination: newest first, id breaks timestamp ties
+        IndexModel([('timestamp', DESCENDING), ('id', DESCENDING)]),
+        IndexModel([('project_name', ASCENDING), ('timestamp', DESCENDING), ('id', DESCENDING)]),
+    ],
+    'analysis_files': [
+        # Serves both "all files in order" and "riskiest files first"
+        IndexModel([('analysis_id', ASCENDING), ('risk_score', DESCENDING), ('seq', ASCENDING)]),
+        IndexModel([('analysis_id', ASCENDING), ('seq', ASCENDING)]),
+    ],
+    'analysis_smells': [
+        IndexModel([('analysis_id', ASCENDING), ('seq', ASCENDING)]),
+    ],
+    'analysis_blobs': [
+        IndexModel([('analysis_id', ASCENDING), ('part', ASCENDING)]),
+    ],
+    'jobs': [
+        IndexModel([('id', ASCENDING)], unique=True),
+    ],
+}
+
+
+async def ensure_indexes(db):
+    """Create every registered index; failures are logged, not fatal"""
+    for name, indexes in INDEXES.items():
+        try:
+            await db[name].create_indexes(indexes)
+        except Exception as e:
+            logger.warning(f"Could not ensure indexes on {name}: {str(e)}")
@@ -0,0 +1,122 @@
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """Analysis job state kept in Mongo so any worker can report on it.
+
+    Finished jobs are stamped with `finished_at`, and a TTL index expires
+    them `ttl_seconds` later; jobs that never finish are kept.
+    """
+
+    def __init__(self, collection, ttl_seconds: int = 7 * 24 * 3600):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self._index_ready = False
+
+    async def _ensure_index(self):
+        if self._index_ready:
+            return
+        try:
+            await self.collection.create_index("finished_at", expireAfterSeconds=self.ttl_seconds)
+        except Exception as e:
+            # Jobs still work without it; they just are not expired
+            logger.warning(f"Could not ensure the job TTL index: {str(e)}")
+            return
+        self._index_ready = True
+
+    async def create(self, project_name: str, total_files: Optional[int] = None) -> dict:
+        now = datetime.now(timezone.utc).isoformat()
+        job = {
+            'id': str(uuid.uuid4()),
+            'project_name': project_name,
+            'status': 'queued',
+            'stage': 'queued',
+            'files_processed': 0,
+            'total_files': total_files,
+            'eta_seconds': None,
+            'analysis_id': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now
+        }
+        await self._ensure_index()
+        await self.collection.insert_one(dict(job))
+        return job
+
+    async def update(self, job_id: str, **fields):
+        fields['updated_at'] = datetime.now(timezone.utc).isoformat()
+        await self.collection.update_one({'id': job_id}, {'$set': fields})
+
+    async def finish(self, job_id: str, **fields):
+        """Record a terminal state; the job expires `ttl_seconds` from now"""
+        # A BSON date, which is what the TTL index reads
+        await self.update(job_id, finished_at=datetime.now(timezone.utc), **fields)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.collection.find_one({'id': job_id}, {'_id': 0, 'finished_at': 0})
+
+
+class JobTracker:
+    """Reports the progress of one running job to the JobStore.
+
+    File progress is written at most every `min_interval` seconds; stage
+    changes and terminal states are always written.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, total_files: Optional[int] = None,
+                 min_interval: float = 0.5):
+        self.store = store
+        self.job_id = job_id
+        self.total_files = total_files
+        self.min_interval = min_interval
+        self.files_processed = 0
+        self._started = time.monotonic()
+        self._last_write = 0.0
+
+    def _eta(self) -> Optional[float]:
+        if not self.total_files or not self.files_processed:
+            return None
+        elapsed = time.monotonic() - self._started
+        remaining = max(self.total_files - self.files_processed, 0)
+        return round(elapsed / self.files_processed * remaining, 1)
+
+    async def stage(self, stage: str):
+        await self.store.update(self.job_id, status='running', stage=stage)
+
+    async def advance(self, count: int):
+        self.files_processed += count
+        now = time.monotonic()
+        if now - self._last_write < self.min_interval:
+            return
+        self._last_write = now
+        await self.store.update(
+            self.job_id,
+            files_processed=self.files_processed,
+            eta_seconds=self._eta()
+        )
+
+    async def complete(self, analysis_id: str):
+        await self.store.finish(
+            self.job_id,
+            status='completed',
+            stage='completed',
+            files_processed=self.files_processed,
+            eta_seconds=0,
+            analysis_id=analysis_id
+        )
+
+    async def fail(self, error: str):
+        await self.store.finish(
+            self.job_id,
+            status='failed',
+            stage='failed',
+            files_processed=self.files_processed,
+            eta_seconds=None,
+            error=error
+        )
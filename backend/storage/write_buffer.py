@@ -0,0 +1,294 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+DUPLICATE_KEY = 11000
+
+# How many keys of dropped writes wait_for() remembers
+LOST_KEYS = 1024
+
+
+class WriteDropped(Exception):
+    """A buffered write was given up on; some of its documents were never written"""
+
+
+def _failed(future: asyncio.Future) -> bool:
+    return future.done() and (future.cancelled() or future.exception() is not None)
+
+
+class _Write:
+    __slots__ = ('collection', 'docs', 'stage', 'key', 'after', 'future', 'attempts')
+
+    def __init__(self, collection, docs: List[dict], stage: int, key: Optional[str],
+                 after: Tuple[asyncio.Future, ...]):
+        self.collection = collection
+        self.docs = docs
+        self.stage = stage
+        self.key = key
+        self.after = after
+        self.future = asyncio.get_running_loop().create_future()
+        self.attempts = 0
+
+
+class WriteBehindBuffer:
+    """Group commit for inserts: many callers, few insert_many round trips.
+
+    enqueue() returns as soon as the documents are queued. A background
+    flusher writes everything pending once `max_docs` documents have
+    accumulated or `max_delay` seconds after the first one arrived,
+    whichever comes first, with one unordered insert_many per collection.
+
+    Writes carry a stage, and lower stages of a batch are written first. A
+    write can also name the writes it depends on (`after`, earlier stages
+    only): it waits until they are written and is dropped if any of them
+    is, so a summary is never visible before the documents it points at.
+    When an insert_many fails, only the documents that failed are retried
+    with the next batch, up to `max_attempts` times; co-batched writes are
+    not held back. A dropped write fails its future with WriteDropped, and
+    wait_for() raises it for that key. When more than `max_pending`
+    documents are queued, enqueue() waits for a flush (backpressure
+    instead of unbounded memory).
+    """
+
+    def __init__(self, max_docs: int = 1000, max_delay: float = 0.05,
+                 max_pending: int = 50000, max_attempts: int = 3):
+        self.max_docs = max(1, max_docs)
+        self.max_delay = max_delay
+        self.max_pending = max(self.max_docs, max_pending)
+        self.max_attempts = max(1, max_attempts)
+        self._pending: List[_Write] = []
+        self._pending_docs = 0
+        self._keys: Dict[str, asyncio.Future] = {}
+        self._lost: "OrderedDict[str, WriteDropped]" = OrderedDict()
+        self._has_pending = asyncio.Event()
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # Metrics
+        self.flushes = 0
+        self.documents_written = 0
+        self.failed_writes = 0
+        self.dropped_writes = 0
+        self.dropped_documents = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._flush_ms_total = 0.0
+
+    # ---------------- Flushing ----------------
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._has_pending.wait()
+            if self._pending_docs < self.max_docs:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write buffer flush error: {str(e)}")
+
+    async def _write(self, collection, docs: List[dict]) -> Tuple[List[int], Optional[Exception]]:
+        """Insert `docs`; returns the indexes of the documents that were not written"""
+        failed: List[int] = []
+        error = None
+        for start in range(0, len(docs), self.max_docs):
+            chunk = docs[start:start + self.max_docs]
+            try:
+                await collection.insert_many(chunk, ordered=False)
+            except BulkWriteError as e:
+                details = e.details or {}
+                if details.get('writeConcernErrors'):
+                    # Written, but not as durably as asked; a retry only hits duplicates
+                    failed.extend(range(start, start + len(chunk)))
+                    error = e
+                    continue
+                # Unordered: every document without a write error was written.
+                # Duplicates are _ids an earlier attempt already wrote.
+                bad = [start + w['index'] for w in details.get('writeErrors', [])
+                       if w.get('code') != DUPLICATE_KEY]
+                if bad:
+                    failed.extend(bad)
+                    error = e
+            except Exception as e:
+                failed.extend(range(start, start + len(chunk)))
+                error = e
+        return failed, error
+
+    def _settle(self, write: _Write, error: Optional[Exception] = None):
+        if write.key is not None and self._keys.get(write.key) is write.future:
+            del self._keys[write.key]
+        if write.future.done():
+            return
+        if error is None:
+            write.future.set_result(None)
+        else:
+            write.future.set_exception(error)
+            # Nobody may be waiting on it; do not warn about a lost exception
+            write.future.exception()
+
+    def _drop(self, write: _Write, reason: str):
+        error = WriteDropped(f"Dropped {len(write.docs)} documents for "
+                             f"{write.collection.name}: {reason}")
+        self.dropped_writes += 1
+        self.dropped_documents += len(write.docs)
+        logger.error(str(error))
+        if write.key is not None:
+            self._lost[write.key] = error
+            self._lost.move_to_end(write.key)
+            while len(self._lost) > LOST_KEYS:
+                self._lost.popitem(last=False)
+        self._settle(write, error)
+
+    async def _write_batch(self, batch: List[_Write], retry: List[_Write]):
+        """One insert_many for writes to the same collection"""
+        collection = batch[0].collection
+        failed, error = await self._write(collection, [d for w in batch for d in w.docs])
+        if failed:
+            self.failed_writes += 1
+            logger.warning(f"Buffered write of {len(failed)} documents to "
+                           f"{collection.name} failed: {str(error)}")
+
+        failed = iter(failed)
+        index = next(failed, None)
+        offset = 0
+        for write in batch:
+            count = len(write.docs)
+            bad = []
+            while index is not None and index < offset + count:
+                bad.append(index - offset)
+                index = next(failed, None)
+            offset += count
+            self.documents_written += count - len(bad)
+            if not bad:
+                self._settle(write)
+                continue
+            write.docs = [write.docs[i] for i in bad]
+            write.attempts += 1
+            if write.attempts >= self.max_attempts:
+                self._drop(write, f"{write.attempts} failed attempts ({str(error)})")
+            else:
+                retry.append(write)
+
+    async def flush(self):
+        """Write everything queued so far"""
+        async with self._lock:
+            writes, self._pending = self._pending, []
+            self._pending_docs = 0
+            self._has_pending.clear()
+            self._full.clear()
+            if not writes:
+                return
+
+            started = time.perf_counter()
+            retry: List[_Write] = []
+
+            for stage in sorted({w.stage for w in writes}):
+                # Earlier stages are settled by now, so dependencies in this
+                # batch are either written, dropped or being retried
+                by_collection: Dict[int, List[_Write]] = {}
+                for write in writes:
+                    if write.stage != stage:
+                        continue
+                    if any(_failed(f) for f in write.after):
+                        self._drop(write, "a write it depends on was dropped")
+                    elif not all(f.done() for f in write.after):
+                        # Held without spending an attempt
+                        retry.append(write)
+                    else:
+                        by_collection.setdefault(id(write.collection), []).append(write)
+                for batch in by_collection.values():
+                    await self._write_batch(batch, retry)
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.last_flush_ms = round(elapsed_ms, 2)
+            self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+            self._flush_ms_total += elapsed_ms
+
+            if retry:
+                self._pending[:0] = retry
+                self._pending_docs += sum(len(w.docs) for w in retry)
+                self._has_pending.set()
+
+    # ---------------- Public API ----------------
+
+    async def enqueue(self, collection, docs: List[dict], stage: int = 0,
+                      key: Optional[str] = None,
+                      after: Iterable[asyncio.Future] = ()) -> asyncio.Future:
+        """Queue documents for insertion.
+
+        The returned future resolves once they are written, or fails with
+        WriteDropped if they never will be. `after` are futures of earlier
+        stage writes that must be written first.
+        """
+        if self._closed:
+            raise RuntimeError("Write buffer is closed")
+        while self._pending_docs >= self.max_pending:
+            await self.flush()
+
+        write = _Write(collection, docs, stage, key, tuple(after))
+        self._pending.append(write)
+        self._pending_docs += len(docs)
+        if key is not None:
+            self._keys[key] = write.future
+        self._has_pending.set()
+        if self._pending_docs >= self.max_docs:
+            self._full.set()
+        self._ensure_flusher()
+        return write.future
+
+    async def wait_for(self, key: str):
+        """Wait until the latest queued write for `key` is durable (read-your-writes).
+
+        Raises WriteDropped if a write for `key` was recently given up on.
+        """
+        future = self._keys.get(key)
+        if future is not None:
+            try:
+                await asyncio.shield(future)
+            except Exception:
+                pass
+        error = self._lost.get(key)
+        if error is not None:
+            raise error
+
+    async def drain(self):
+        """Flush until empty and stop the flusher; used on shutdown"""
+        self._closed = True
+        # Terminates: every flush writes, drops or spends an attempt on each
+        # write whose dependencies are settled
+        while self._pending:
+            await self.flush()
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+    def metrics(self) -> dict:
+        return {
+            'queue_depth': self._pending_docs,
+            'queued_writes': len(self._pending),
+            'flushes': self.flushes,
+            'documents_written': self.documents_written,
+            'failed_writes': self.failed_writes,
+            'dropped_writes': self.dropped_writes,
+            'dropped_documents': self.dropped_documents,
+            'last_flush_ms': self.last_flush_ms,
+            'max_flush_ms': self.max_flush_ms,
+            'avg_flush_ms': round(self._flush_ms_total / self.flushes, 2) if self.flushes else 0.0
+        }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend imports its packages top-level (analysis_engine, storage, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
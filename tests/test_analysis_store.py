@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import zlib
+
+import pytest
+
+from models.analysis import AnalysisResult, CodeSmell, FileMetrics, Hotspot
+from storage import analysis_store as store_module
+from storage.analysis_store import AnalysisStore, decode_cursor, encode_cursor
+from storage.cold_tier import FileSystemColdStore
+from storage.compression import available_codec, compress, decompress
+from storage.write_buffer import WriteBehindBuffer, WriteDropped
+
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_result(files=3, timestamp=None):
+    metrics = [
+        FileMetrics(filename=f'f{i}.py', language='python', loc=10 * i, functions=i, classes=0,
+                    complexity=float(i), nesting_depth=1, smells=['long_function'] if i else [])
+        for i in range(files)
+    ]
+    smells = [
+        CodeSmell(type='long_function', severity='high', file=f'f{i}.py', line=1,
+                  message='too long', suggestion='split it')
+        for i in range(1, files)
+    ]
+    hotspots = [
+        Hotspot(file=f'f{i}.py', risk_score=float(10 * i), complexity=float(i), smells_count=1,
+                priority='low')
+        for i in range(1, files)
+    ]
+    extra = {'timestamp': timestamp} if timestamp else {}
+    return AnalysisResult(
+        project_name='demo', health_index=80.0, total_files=files, total_loc=30, avg_complexity=1.0,
+        files=metrics, smells=smells, hotspots=hotspots, refactor_actions=[], **extra
+    )
+
+
+def make_store(**kwargs):
+    db = mongomock_motor.AsyncMongoMockClient()['test']
+    return AnalysisStore(db.analyses, db.analysis_files, db.analysis_smells, blobs=db.analysis_blobs,
+                         **kwargs)
+
+
+def test_codecs_round_trip():
+    data = b'{"files": []}' * 100
+    assert decompress(compress(data, 'zlib'), 'zlib') == data
+    assert zlib.decompress(compress(data, 'zlib')) == data
+    with pytest.raises(ValueError):
+        compress(data, 'lz4')
+
+
+def test_unknown_codec_falls_back_to_zlib():
+    assert available_codec('lz4') == 'zlib'
+    assert available_codec(None) == 'zlib'
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor('2024-01-01T00:00:00', 'abc')) == ('2024-01-01T00:00:00', 'abc')
+    with pytest.raises(ValueError):
+        decode_cursor('not a cursor')
+
+
+@pytest.mark.parametrize('compression', [None, 'zlib'])
+def test_save_and_get_round_trip(compression):
+    result = make_result()
+
+    async def scenario():
+        store = make_store(compression=compression)
+        await store.save(result)
+        return store, await store.get(result.id), await store.get_base(result.id)
+
+    store, doc, base = run(scenario())
+    assert doc['layout'] == (AnalysisStore.BLOB_LAYOUT if compression else AnalysisStore.LAYOUT)
+    assert [f['filename'] for f in doc['files']] == ['f0.py', 'f1.py', 'f2.py']
+    assert doc['files'][1] == result.files[1].model_dump()
+    assert [s['file'] for s in doc['smells']] == ['f1.py', 'f2.py']
+    assert [h['file'] for h in doc['hotspots']] == ['f2.py', 'f1.py']
+    assert doc['smell_count'] == 2 and doc['max_risk_score'] == 20.0
+    assert [f['filename'] for f in base['files']] == ['f0.py', 'f1.py', 'f2.py']
+
+
+def test_archive_moves_payload_to_cold_store(tmp_path):
+    old = make_result(timestamp='2020-01-01T00:00:00+00:00')
+    new = make_result()
+
+    async def scenario():
+        store = make_store(compression='zlib', cold_store=FileSystemColdStore(str(tmp_path)))
+        await store.save(old)
+        await store.save(new)
+        archived = await store.archive('2021-01-01')
+        blobs = await store.blobs.count_documents({'analysis_id': old.id})
+        return archived, blobs, await store.get(old.id)
+
+    archived, blobs, doc = run(scenario())
+    assert archived == 1
+    assert blobs == 0
+    assert doc['tier'] == 'cold'
+    assert [f['filename'] for f in doc['files']] == ['f0.py', 'f1.py', 'f2.py']
+    assert [h['file'] for h in doc['hotspots']] == ['f2.py', 'f1.py']
+    assert list(tmp_path.rglob(f'{old.id}.bin'))
+
+
+def test_packing_runs_off_the_event_loop(monkeypatch, tmp_path):
+    threads = set()
+    pack, unpack = AnalysisStore._pack, AnalysisStore._unpack
+
+    def tracked(function):
+        def wrapper(*args):
+            threads.add(threading.current_thread() is threading.main_thread())
+            return function(*args)
+        return staticmethod(wrapper)
+
+    monkeypatch.setattr(store_module.AnalysisStore, '_pack', tracked(pack))
+    monkeypatch.setattr(store_module.AnalysisStore, '_unpack', tracked(unpack))
+    result = make_result(timestamp='2020-01-01T00:00:00+00:00')
+
+    async def scenario():
+        store = make_store(compression='zlib', cold_store=FileSystemColdStore(str(tmp_path)))
+        await store.save(result)
+        await store.get(result.id)
+        await store.archive('2021-01-01')
+        await store.get_base(result.id)
+
+    run(scenario())
+    assert threads == {False}
+
+
+def test_buffered_save_drops_summary_when_files_are_lost():
+    result = make_result()
+
+    async def scenario():
+        buffer = WriteBehindBuffer(max_delay=0.01, max_attempts=1)
+        store = make_store(write_buffer=buffer)
+
+        async def broken(docs, ordered=True):
+            raise ConnectionError('lost')
+
+        store.files.insert_many = broken
+        with pytest.raises(WriteDropped):
+            await store.save(result, wait=True)
+        with pytest.raises(WriteDropped):
+            await store.get(result.id)
+        summaries = await store.summaries.count_documents({})
+        await buffer.drain()
+        return summaries
+
+    assert run(scenario()) == 0
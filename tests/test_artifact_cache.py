@@ -0,0 +1,65 @@
+import os
+import sys
+
+from compiler_service.artifact_cache import ArtifactCache
+
+
+def build(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def key(cache, code):
+    return cache.key(code, 'main.c', [sys.executable, '-c', 'build'], ('main',))
+
+
+def test_key_covers_code_command_and_toolchain(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    assert key(cache, 'a') == key(cache, 'a')
+    assert key(cache, 'a') != key(cache, 'b')
+    assert key(cache, 'a') != cache.key('a', 'main.c', [sys.executable, '-O'], ('main',))
+    assert cache.key('a', 'main.c', ['no-such-compiler-here'], ('main',)) is None
+
+
+def test_store_then_fetch_copies_artifacts(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    artifact = build(tmp_path, 'main', b'\x7fELF binary')
+    k = key(cache, 'int main() {}')
+
+    workdir = tmp_path / 'run'
+    workdir.mkdir()
+    assert not cache.fetch(k, str(workdir))
+    cache.store(k, [artifact])
+    assert cache.fetch(k, str(workdir))
+    assert (workdir / 'main').read_bytes() == b'\x7fELF binary'
+    # A copy, never a link into the cache
+    assert not os.path.samefile(workdir / 'main', os.path.join(cache._path(k), 'main'))
+    assert cache.metrics()['hits'] == 1 and cache.metrics()['misses'] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'), max_bytes=250)
+    keys = [key(cache, str(i)) for i in range(3)]
+    cache.store(keys[0], [build(tmp_path, 'a', b'x' * 100)])
+    cache.store(keys[1], [build(tmp_path, 'b', b'x' * 100)])
+    workdir = tmp_path / 'run'
+    workdir.mkdir()
+    assert cache.fetch(keys[0], str(workdir))
+    cache.store(keys[2], [build(tmp_path, 'c', b'x' * 100)])
+
+    assert cache.metrics()['evictions'] == 1
+    assert not os.path.isdir(cache._path(keys[1]))
+    assert os.path.isdir(cache._path(keys[0])) and os.path.isdir(cache._path(keys[2]))
+
+
+def test_entries_survive_a_restart(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    k = key(cache, 'x')
+    cache.store(k, [build(tmp_path, 'main', b'1234')])
+
+    reopened = ArtifactCache(str(tmp_path / 'cache'))
+    assert reopened.metrics()['entries'] == 1 and reopened.metrics()['bytes'] == 4
+    workdir = tmp_path / 'run'
+    workdir.mkdir()
+    assert reopened.fetch(k, str(workdir))
@@ -0,0 +1,78 @@
+import pytest
+
+from analysis_engine.language_adapters.adapters import get_adapter
+from analysis_engine.language_adapters.clike import CPP, GO, JAVA, JAVASCRIPT, RUST, CLikeScanner
+
+
+def analyze(language, code):
+    return get_adapter(language, code, 'file').analyze(code)
+
+
+def test_java_methods_and_classes():
+    code = (
+        'class Shape {\n'
+        '  int area(int w, int h) {\n'
+        '    if (w > 0 && h > 0) {\n'
+        '      return w * h;\n'
+        '    }\n'
+        '    return 0;\n'
+        '  }\n'
+        '}\n'
+    )
+    result = analyze('java', code)
+    assert result['classes'] == ['Shape']
+    (area,) = result['function_metrics']
+    assert (area.name, area.start_line, area.end_line) == ('area', 2, 7)
+    assert (area.complexity, area.nesting, area.params) == (3, 1, 2)
+
+
+def test_keywords_in_strings_comments_and_regexes_are_ignored():
+    code = (
+        'const s = "if (a) while (b)"; // if for\n'
+        '/* while (x) { if (y) } */\n'
+        'const r = /if|for/g;\n'
+        'const t = `for ${s}`;\n'
+    )
+    result = analyze('javascript', code)
+    assert result['complexity'] == 1
+    assert result['loc'] == 3
+
+
+def test_arrow_functions_are_named_after_their_binding():
+    result = analyze('javascript', 'const add = (a, b) => {\n  return a + b;\n};\n')
+    assert [(f.name, f.params) for f in result['function_metrics']] == [('add', 2)]
+
+
+def test_go_rust_and_cpp_declarations():
+    go = analyze('go', 'func (s *S) Run(a, b int) error {\n\tfor i := 0; i < a; i++ {\n\t}\n\treturn nil\n}\n')
+    assert [(f.name, f.params, f.complexity) for f in go['function_metrics']] == [('Run', 2, 2)]
+
+    rust = analyze('rust', "fn longest<'a>(x: &'a str, y: &'a str) -> &'a str {\n    x\n}\n")
+    assert [(f.name, f.params) for f in rust['function_metrics']] == [('longest', 2)]
+
+    cpp = analyze('cpp', '#include <vector>\nint main(void) {\n  auto s = R"(if {)";\n  return 0;\n}\n')
+    assert [(f.name, f.params, f.complexity) for f in cpp['function_metrics']] == [('main', 0, 1)]
+
+
+def test_unicode_identifiers():
+    result = analyze('java', 'class Größe {\n  int größe(int ä) {\n    return ä;\n  }\n}\n')
+    assert result['classes'] == ['Größe']
+    assert result['functions'] == ['größe']
+
+    result = analyze('go', 'func Añadir(a int) int {\n\treturn a\n}\n')
+    assert result['functions'] == ['Añadir']
+
+
+def test_unicode_whitespace_is_whitespace():
+    code = 'function f(a,\u00a0b) {\u00a0return a;\u3000}\n'
+    result = analyze('javascript', code)
+    assert [(f.name, f.params) for f in result['function_metrics']] == [('f', 2)]
+    assert result['loc'] == 1
+
+
+@pytest.mark.parametrize('language', [JAVASCRIPT, JAVA, CPP, GO, RUST])
+def test_any_input_scans(language):
+    # Characters no language defines a token for must not stop the lexer
+    code = 'x = "\u00e9\u0660\u200b\u2028\x00\x1c\ud800";\n\u00a7 \u0660\u0661 \U0001f600 \\ @ # `\n'
+    result = CLikeScanner(language).scan(code)
+    assert result['line_count'] == 3
@@ -0,0 +1,95 @@
+import random
+
+from analysis_engine.duplication import CloneIndex, fingerprint, normalized_tokens
+
+
+STATEMENTS = [
+    "{a} = {b} + {c} * 2",
+    "if {a} > {b}:\n        {c} = [{a}, {b}]",
+    "for {a} in range({b}):\n        {c}.append({a} - 1)",
+    "while {a} and not {b}:\n        {a} -= {c}",
+    "{a} = {{'{b}': {c}, 'n': len({a})}}",
+    "try:\n        {a} = {b}({c})\n    except KeyError:\n        {a} = None",
+    "{a} = [{b} for {b} in {c} if {b} % 3]",
+    "return {a}({b}, *{c})",
+]
+
+
+def block(seed, statements=14):
+    """A function of varied (non-periodic) statements; the seed picks them"""
+    rng = random.Random(seed)
+    names = [f"v{seed}_{i}" for i in range(6)]
+    body = "\n".join(
+        "    " + rng.choice(STATEMENTS).format(a=rng.choice(names), b=rng.choice(names), c=rng.choice(names))
+        for _ in range(statements)
+    )
+    return f"def f{seed}(x, y):\n{body}\n"
+
+
+def renamed(code, seed, new_seed):
+    return code.replace(f"v{seed}_", f"w{new_seed}_").replace(f"def f{seed}", f"def g{new_seed}")
+
+
+def triples(fingerprints):
+    return [tuple(fingerprints[i:i + 3]) for i in range(0, len(fingerprints), 3)]
+
+
+def test_identifiers_and_literals_are_normalized():
+    first, _ = normalized_tokens("total = price * 2  # comment", 'python')
+    second, lines = normalized_tokens("amount = cost * 7", 'python')
+    assert first == second
+    assert lines == [1, 1, 1, 1, 1]
+    # Keywords are kept apart
+    assert normalized_tokens("if x: pass", 'python')[0] != normalized_tokens("while x: pass", 'python')[0]
+
+
+def test_short_files_have_no_fingerprints():
+    assert len(fingerprint("x = 1\n", 'python')) == 0
+
+
+def test_fingerprints_are_deterministic_triples():
+    code = block(1)
+    prints = fingerprint(code, 'python')
+    assert prints == fingerprint(code, 'python')
+    assert len(prints) % 3 == 0
+    for _, start, end in triples(prints):
+        assert 1 <= start <= end <= code.count('\n')
+
+
+def test_renamed_copy_is_reported_as_clone():
+    index = CloneIndex(min_lines=6)
+    original = block(1)
+    loc = original.count('\n')
+    assert index.add('a.py', fingerprint(original, 'python'), loc=loc) == 0
+    duplicated = index.add('b.py', fingerprint(renamed(original, 1, 2), 'python'), loc=loc)
+    assert duplicated == loc
+
+    (clone,) = index.clones()
+    assert (clone.file_a, clone.file_b) == ('a.py', 'b.py')
+    assert clone.lines >= 6
+    assert index.duplication_ratio == 0.5
+
+
+def test_unrelated_code_is_not_a_clone():
+    index = CloneIndex(min_lines=6)
+    index.add('a.py', fingerprint(block(1), 'python'), loc=20)
+    assert index.add('c.py', fingerprint(block(3), 'python'), loc=20) == 0
+    assert index.clones() == []
+
+
+def test_index_stays_bounded_by_sampling():
+    index = CloneIndex(max_entries=10)
+    for i in range(10):
+        index.add(f'f{i}.py', fingerprint(block(i, statements=30), 'python'))
+    assert len(index._index) <= 10
+    assert index.modulus > 1
+
+
+def test_clone_list_is_capped_and_longest_first():
+    index = CloneIndex(min_lines=6, max_clones=2)
+    code = block(1, statements=60)
+    for i in range(4):
+        index.add(f'f{i}.py', fingerprint(code[:len(code) * (i + 2) // 6], 'python'))
+    clones = index.clones()
+    assert len(clones) == 2
+    assert clones[0].lines >= clones[1].lines
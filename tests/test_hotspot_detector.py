@@ -0,0 +1,43 @@
+from analysis_engine.hotspot_detector import HotspotDetector
+from models.analysis import CodeSmell, FileMetrics
+
+
+def metrics(filename, complexity=0.0, loc=0, nesting=0):
+    return FileMetrics(
+        filename=filename, language='python', loc=loc, functions=0, classes=0,
+        complexity=complexity, nesting_depth=nesting, smells=[]
+    )
+
+
+def smell(filename):
+    return CodeSmell(type='long_function', severity='medium', file=filename, line=1,
+                     message='', suggestion='')
+
+
+def test_scores_and_orders_files():
+    files = [metrics('small.py', complexity=2, loc=50), metrics('big.py', complexity=20, loc=500, nesting=6)]
+    hotspots = HotspotDetector().detect(files, [smell('big.py')] * 5)
+    assert [(h.file, h.risk_score, h.smells_count, h.priority) for h in hotspots] == [
+        ('big.py', 100.0, 5, 'critical'),
+        ('small.py', 6.0, 0, 'low'),
+    ]
+
+
+def test_priority_uses_the_unrounded_score():
+    # 39.996 + 30 = 69.996: shown as 70.0, but below the critical threshold
+    files = [metrics('edge.py', complexity=19.998)]
+    (hotspot,) = HotspotDetector().detect(files, [smell('edge.py')] * 5)
+    assert hotspot.risk_score == 70.0
+    assert hotspot.priority == 'high'
+
+
+def test_top_k_keeps_the_riskiest_in_order():
+    files = [metrics(f'f{i}.py', complexity=i) for i in range(10)]
+    hotspots = HotspotDetector().detect(files, [], top_k=3)
+    assert [h.file for h in hotspots] == ['f9.py', 'f8.py', 'f7.py']
+
+
+def test_ties_keep_input_order():
+    files = [metrics(name, complexity=5) for name in ('b.py', 'a.py', 'c.py')]
+    assert [h.file for h in HotspotDetector().detect(files, [])] == ['b.py', 'a.py', 'c.py']
+    assert [h.file for h in HotspotDetector().detect(files, [], top_k=2)] == ['b.py', 'a.py']
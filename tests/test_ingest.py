@@ -0,0 +1,67 @@
+import io
+import warnings
+import zipfile
+
+import pytest
+
+from analysis_engine.ingest import (
+    IngestLimitExceeded, IngestLimits, count_zip_sources, iter_zip_sources
+)
+
+
+def make_zip(entries):
+    buffer = io.BytesIO()
+    with warnings.catch_warnings():
+        # zipfile warns about duplicate names, which some tests want
+        warnings.simplefilter('ignore')
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name, content in entries:
+                zf.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def test_yields_source_files_only():
+    archive = make_zip([
+        ('src/app.py', 'print(1)\n'),
+        ('README.md', '# readme\n'),
+        ('node_modules/lib/index.js', 'module.exports = 1\n'),
+        ('src/', ''),
+        ('src/main.go', 'package main\n'),
+    ])
+    assert list(iter_zip_sources(archive, IngestLimits())) == [
+        ('src/app.py', 'print(1)\n'),
+        ('src/main.go', 'package main\n'),
+    ]
+
+
+def test_duplicate_names_keep_first_entry():
+    archive = make_zip([
+        ('a.py', 'first = 1\n'),
+        ('a.py', 'second = 2\n'),
+        ('b.py', 'other = 3\n'),
+    ])
+    assert count_zip_sources(archive) == 2
+    archive.seek(0)
+    assert list(iter_zip_sources(archive, IngestLimits())) == [
+        ('a.py', 'first = 1\n'),
+        ('b.py', 'other = 3\n'),
+    ]
+
+
+def test_duplicates_do_not_use_up_the_budget():
+    archive = make_zip([('a.py', 'x' * 100)] * 3 + [('b.py', 'y' * 100)])
+    limits = IngestLimits(max_uncompressed_bytes=250)
+    assert [name for name, _ in iter_zip_sources(archive, limits)] == ['a.py', 'b.py']
+
+
+def test_uncompressed_budget_is_enforced():
+    archive = make_zip([('a.py', 'x' * 100), ('b.py', 'y' * 100)])
+    with pytest.raises(IngestLimitExceeded):
+        list(iter_zip_sources(archive, IngestLimits(max_uncompressed_bytes=150)))
+
+
+def test_oversized_files_are_skipped():
+    archive = make_zip([('big.py', 'x' * 100), ('small.py', 'y = 1\n')])
+    limits = IngestLimits(max_file_bytes=50)
+    assert [name for name, _ in iter_zip_sources(archive, limits)] == ['small.py']
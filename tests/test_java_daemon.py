@@ -0,0 +1,292 @@
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from compiler_service.java_daemon import DAEMON_CLASS, DAEMON_SOURCE, JavaDaemon
+from compiler_service.limits import ResourceLimits
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason="POSIX only")
+
+
+# Speaks RunnerDaemon's protocol, one request at a time, logging its
+# command line and every program it runs. The submission's source picks the
+# outcome: COMPILE_ERROR, HANG (answers "timeout" after its time limit),
+# CRASH (exits without answering), LIMITS (prints its time limit and file
+# size limit); anything else echoes its input.
+FAKE_JVM = textwrap.dedent('''\
+    #!{python}
+    import os, resource, struct, sys, time
+
+    def note(line):
+        with open(os.environ['FAKE_JVM_LOG'], 'a') as log:
+            log.write(line + '\\n')
+
+    note(' '.join(sys.argv[1:]))
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+
+    def string(text):
+        data = text.encode()
+        return struct.pack('>i', len(data)) + data
+
+    def send(request_id, status, exit_code=0, out='', err=''):
+        body = (struct.pack('>i', request_id) + string(status) + struct.pack('>iqq?', exit_code, 1000, 2000, False)
+                + string(out) + string(err))
+        stdout.write(struct.pack('>i', len(body)) + body)
+        stdout.flush()
+
+    def read_string(data, offset):
+        size = struct.unpack_from('>i', data, offset)[0]
+        return data[offset + 4:offset + 4 + size].decode(), offset + 4 + size
+
+    if os.environ.get('FAKE_JVM_UNGUARDED'):
+        # A JDK without a security manager
+        send(0, 'unavailable', err='No security manager in this runtime')
+        sys.exit(0)
+    send(0, 'ready', 1)
+    while True:
+        header = stdin.read(4)
+        if len(header) < 4:
+            break
+        frame = stdin.read(struct.unpack('>i', header)[0])
+        request_id, timeout_ms, limit = struct.unpack_from('>iii', frame)
+        name, offset = read_string(frame, 12)
+        source, offset = read_string(frame, offset)
+        data, offset = read_string(frame, offset)
+        note(f'run {{source}} {{data}}')
+        if 'COMPILE_ERROR' in source:
+            send(request_id, 'compile_error', 1, err=name + ': error: expected ;')
+        elif 'HANG' in source:
+            time.sleep(timeout_ms / 1000)
+            send(request_id, 'timeout', -1)
+        elif 'CRASH' in source:
+            os._exit(1)
+        elif 'LIMITS' in source:
+            send(request_id, 'ok', 0, out=f'{{timeout_ms}} {{resource.getrlimit(resource.RLIMIT_FSIZE)[0]}}')
+        else:
+            send(request_id, 'ok', 0, out=data)
+''')
+
+
+@pytest.fixture
+def fake_jvm(tmp_path, monkeypatch):
+    """A `java` on PATH running FAKE_JVM, with the daemon classes already 'built'"""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    java = bin_dir / 'java'
+    java.write_text(FAKE_JVM.format(python=sys.executable))
+    java.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+    log = tmp_path / 'jvm.log'
+    monkeypatch.setenv('FAKE_JVM_LOG', str(log))
+
+    build_dir = tmp_path / 'build'
+    with open(DAEMON_SOURCE, 'rb') as f:
+        classes = build_dir / hashlib.sha256(f.read()).hexdigest()[:16]
+    classes.mkdir(parents=True)
+    (classes / f"{DAEMON_CLASS}.class").write_bytes(b'')
+    return str(build_dir), log
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_runs_submissions_in_the_daemon(fake_jvm):
+    build_dir, _ = fake_jvm
+
+    async def scenario():
+        daemon = JavaDaemon(build_dir)
+        try:
+            results = await asyncio.gather(*(
+                daemon.execute('class Main {}', f'input {i}', 'Main.java', 2, 10) for i in range(3)
+            ))
+            return results, daemon.metrics()
+        finally:
+            await daemon.close()
+
+    results, metrics = run(scenario())
+    assert [r.stdout for r in results] == ['input 0', 'input 1', 'input 2']
+    assert all(r.success for r in results)
+    assert (metrics['runs'], metrics['starts'], metrics['fallbacks']) == (3, 1, 0)
+
+
+def test_compile_errors_and_timeouts(fake_jvm):
+    build_dir, _ = fake_jvm
+
+    async def scenario():
+        daemon = JavaDaemon(build_dir)
+        try:
+            compile_error = await daemon.execute('COMPILE_ERROR', '', 'Main.java', 1, 10)
+            timeout = await daemon.execute('HANG', '', 'Main.java', 0.2, 10)
+            # The timed-out daemon is retired; the next run starts a new one
+            after = await daemon.execute('class Main {}', 'ok', 'Main.java', 1, 10)
+            return compile_error, timeout, after, daemon.metrics()
+        finally:
+            await daemon.close()
+
+    compile_error, timeout, after, metrics = run(scenario())
+    assert compile_error.compile_error and 'expected ;' in compile_error.stderr
+    assert timeout.timed_out and not timeout.success
+    assert after.success and after.stdout == 'ok'
+    assert metrics['starts'] == 2
+
+
+def test_programs_are_not_run_twice(fake_jvm):
+    build_dir, log = fake_jvm
+
+    async def scenario():
+        daemon = JavaDaemon(build_dir)
+        try:
+            # A timeout retires the daemon, but what it already has still answers
+            timeout, beside = await asyncio.gather(
+                daemon.execute('HANG', '', 'Main.java', 0.2, 10),
+                daemon.execute('class Main {}', 'beside', 'Main.java', 1, 10)
+            )
+            # Both were sent before it crashed: neither is run again
+            await daemon.start()
+            crashed = await asyncio.gather(
+                daemon.execute('CRASH', '', 'Main.java', 1, 10),
+                daemon.execute('class Main {}', 'victim', 'Main.java', 1, 10)
+            )
+            return timeout, beside, crashed, daemon.metrics()
+        finally:
+            await daemon.close()
+
+    timeout, beside, crashed, metrics = run(scenario())
+    assert timeout.timed_out
+    assert beside.success and beside.stdout == 'beside'
+    assert all(r is not None and not r.success and 'exited' in r.stderr for r in crashed)
+    assert (metrics['lost'], metrics['fallbacks']) == (2, 0)
+    runs = [line for line in log.read_text().splitlines() if line.startswith('run ')]
+    assert runs == ['run HANG ', 'run class Main {} beside', 'run CRASH ']
+
+
+def test_limits_apply_to_the_daemon(fake_jvm):
+    build_dir, log = fake_jvm
+
+    async def scenario():
+        daemon = JavaDaemon(build_dir, limits=ResourceLimits(
+            cpu_seconds=1, memory_bytes=256 * 1024 * 1024, file_bytes=4096
+        ))
+        try:
+            return await daemon.execute('LIMITS', '', 'Main.java', 5, 10)
+        finally:
+            await daemon.close()
+
+    result = run(scenario())
+    # The CPU limit caps the time limit; the file size limit is the daemon's
+    assert result.stdout == '1000 4096'
+    assert '-Xmx256m' in log.read_text().splitlines()[0].split()
+
+
+def test_unavailable_daemon_falls_back(tmp_path, monkeypatch):
+    monkeypatch.setenv('PATH', str(tmp_path))
+
+    async def scenario():
+        daemon = JavaDaemon(str(tmp_path / 'build'))
+        result = await daemon.execute('class Main {}', '', 'Main.java', 1, 10)
+        return result, daemon.metrics()
+
+    result, metrics = run(scenario())
+    assert result is None
+    assert metrics['fallbacks'] == 1 and not metrics['running']
+
+
+def test_daemon_without_a_security_manager_is_not_used(fake_jvm, monkeypatch):
+    build_dir, _ = fake_jvm
+    monkeypatch.setenv('FAKE_JVM_UNGUARDED', '1')
+
+    async def scenario():
+        daemon = JavaDaemon(build_dir)
+        try:
+            result = await daemon.execute('class Main {}', '', 'Main.java', 1, 10)
+            return result, daemon.metrics()
+        finally:
+            await daemon.close()
+
+    result, metrics = run(scenario())
+    assert result is None
+    assert (metrics['starts'], metrics['fallbacks'], metrics['running']) == (0, 1, False)
+
+
+def _jdk_major() -> int:
+    if shutil.which('javac') is None or shutil.which('java') is None:
+        return 0
+    version = subprocess.run(['java', '-version'], capture_output=True, text=True).stderr
+    match = re.search(r'version "(1\.)?(\d+)', version)
+    return int(match.group(2)) if match else 0
+
+
+# JDK 24+ has no security manager, and the daemon refuses to run there
+@pytest.mark.skipif(not 0 < _jdk_major() < 24, reason="needs a JDK with a security manager")
+def test_real_jdk(tmp_path):
+    code = textwrap.dedent('''\
+        import java.util.Scanner;
+
+        public class Main {
+            static int calls = 0;
+
+            public static void main(String[] args) {
+                calls++;
+                Scanner in = new Scanner(System.in);
+                int a = in.nextInt(), b = in.nextInt();
+                System.out.println(a + b);
+                System.out.println("calls=" + calls);
+            }
+        }
+    ''')
+
+    # Writes a well-formed response frame for another request straight to the daemon's stdout
+    forger = textwrap.dedent('''\
+        import java.io.*;
+
+        public class Main {
+            public static void main(String[] args) throws Exception {
+                ByteArrayOutputStream body = new ByteArrayOutputStream();
+                DataOutputStream frame = new DataOutputStream(body);
+                frame.writeInt(1);
+                frame.writeInt(2);
+                frame.writeBytes("ok");
+                frame.writeInt(0);
+                frame.writeLong(0);
+                frame.writeLong(0);
+                frame.writeBoolean(false);
+                frame.writeInt(6);
+                frame.writeBytes("forged");
+                frame.writeInt(0);
+                DataOutputStream out = new DataOutputStream(new FileOutputStream(FileDescriptor.out));
+                out.writeInt(body.size());
+                body.writeTo(out);
+                out.flush();
+            }
+        }
+    ''')
+
+    async def scenario():
+        daemon = JavaDaemon(str(tmp_path / 'build'), start_timeout=120)
+        try:
+            first = await daemon.execute(code, '2 3\n', 'Main.java', 10, 60)
+            second = await daemon.execute(code, '40 2\n', 'Main.java', 10, 60)
+            broken = await daemon.execute('public class Main {', '', 'Main.java', 10, 60)
+            forged = await daemon.execute(forger, '', 'Main.java', 10, 60)
+            after = await daemon.execute(code, '1 1\n', 'Main.java', 10, 60)
+            return first, second, broken, forged, after
+        finally:
+            await daemon.close()
+
+    first, second, broken, forged, after = run(scenario())
+    assert first is not None, "daemon did not start"
+    assert first.success and first.stdout.split() == ['5', 'calls=1']
+    # Compiled once; each run gets fresh static state
+    assert second.cache_hit and second.stdout.split() == ['42', 'calls=1']
+    assert broken.compile_error
+    # Refused, and the daemon's stream is untouched
+    assert not forged.success and 'SecurityException' in forged.stderr
+    assert after.success and after.stdout.split() == ['2', 'calls=1']
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from storage.job_store import JobStore, JobTracker
+
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_store(ttl_seconds=60):
+    collection = mongomock_motor.AsyncMongoMockClient()['test'].jobs
+    return JobStore(collection, ttl_seconds=ttl_seconds), collection
+
+
+def test_create_ensures_ttl_index_on_finished_at():
+    async def scenario():
+        store, collection = make_store(ttl_seconds=120)
+        await store.create('demo')
+        return await collection.index_information()
+
+    indexes = run(scenario())
+    ttl = [index for index in indexes.values() if index['key'] == [('finished_at', 1)]]
+    assert ttl and ttl[0]['expireAfterSeconds'] == 120
+
+
+def test_running_jobs_have_no_finished_at():
+    async def scenario():
+        store, collection = make_store()
+        job = await store.create('demo', total_files=4)
+        tracker = JobTracker(store, job['id'], 4, min_interval=0)
+        await tracker.stage('analyzing')
+        await tracker.advance(2)
+        return await collection.find_one({'id': job['id']})
+
+    doc = run(scenario())
+    assert doc['status'] == 'running'
+    assert doc['files_processed'] == 2
+    assert 'finished_at' not in doc
+
+
+@pytest.mark.parametrize('finish', [
+    lambda tracker: tracker.complete('analysis-1'),
+    lambda tracker: tracker.fail('boom'),
+])
+def test_terminal_states_are_stamped_for_expiry(finish):
+    async def scenario():
+        store, collection = make_store()
+        job = await store.create('demo')
+        await finish(JobTracker(store, job['id']))
+        return await collection.find_one({'id': job['id']}), await store.get(job['id'])
+
+    doc, public = run(scenario())
+    assert isinstance(doc['finished_at'], datetime)
+    # The API view keeps its ISO string timestamps only
+    assert 'finished_at' not in public
+    assert public['status'] in ('completed', 'failed')
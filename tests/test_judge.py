@@ -0,0 +1,98 @@
+import asyncio
+import os
+import shutil
+import signal
+
+import pytest
+
+from compiler_service.executor import ExecutionResult
+from compiler_service.judge import (
+    ACCEPTED, COMPILE_ERROR, RUNTIME_ERROR, SKIPPED, TIME_LIMIT_EXCEEDED, WRONG_ANSWER, CaseResult,
+    JudgeCase, case_verdict, outputs_match, overall_verdict
+)
+from compiler_service.limits import ResourceLimits, ResourceUsage
+from compiler_service.local import LocalCompiler
+from compiler_service.workspace import WorkspacePool
+
+
+def test_outputs_match_ignores_line_endings_and_trailing_space():
+    assert outputs_match("1 2\r\n3  \n\n\n", "1 2\n3")
+    assert not outputs_match("1  2\n3", "1 2\n3")
+    assert not outputs_match("1\n\n3", "1\n3")
+    assert outputs_match("1  2\n\n3", "1 2 3", ignore_whitespace=True)
+
+
+def test_case_verdicts():
+    ok = ExecutionResult(True, "42\n", "", 0.1)
+    assert case_verdict(ok, "42") == ACCEPTED
+    assert case_verdict(ok, None) == ACCEPTED
+    assert case_verdict(ok, "41") == WRONG_ANSWER
+    assert case_verdict(ExecutionResult(False, "", "boom", 0.1), "42") == RUNTIME_ERROR
+    assert case_verdict(ExecutionResult(False, "", "late", 5.0, timed_out=True), "42") == TIME_LIMIT_EXCEEDED
+    assert case_verdict(ExecutionResult(False, "", "error", 0.0, compile_error=True), "42") == COMPILE_ERROR
+    if hasattr(signal, 'SIGXCPU'):
+        usage = ResourceUsage(1.0, 0.0, 1000, signal.SIGXCPU)
+        assert case_verdict(ExecutionResult(False, "", "", 1.0, usage=usage), "42") == TIME_LIMIT_EXCEEDED
+
+
+def test_first_failed_case_decides():
+    assert overall_verdict([CaseResult(ACCEPTED), CaseResult(SKIPPED)]) == ACCEPTED
+    assert overall_verdict([
+        CaseResult(ACCEPTED), CaseResult(WRONG_ANSWER), CaseResult(RUNTIME_ERROR)
+    ]) == WRONG_ANSWER
+    assert overall_verdict([]) == ACCEPTED
+
+
+# ---------------- LocalCompiler.judge ----------------
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _judge(tmp_path, language, code, cases, **options):
+    compiler = LocalCompiler(
+        timeout=2, workspaces=WorkspacePool(root=str(tmp_path), size=2),
+        limits=ResourceLimits(cpu_seconds=1)
+    )
+    try:
+        return await compiler.judge(language, code, cases, **options)
+    finally:
+        await compiler.close()
+        compiler.workspaces.close()
+
+
+PYTHON_SUM = "print(sum(map(int, input().split())))"
+
+
+def test_judges_every_case(tmp_path):
+    cases = [JudgeCase("1 2", "3"), JudgeCase("2 2", "5"), JudgeCase("x", "0"), JudgeCase("0 0")]
+    judged = run(_judge(tmp_path, 'python', PYTHON_SUM, cases))
+    assert judged.verdict == WRONG_ANSWER
+    assert [case.verdict for case in judged.cases] == [ACCEPTED, WRONG_ANSWER, RUNTIME_ERROR, ACCEPTED]
+    assert 'ValueError' in judged.cases[2].result.stderr
+
+
+def test_stop_on_failure_skips_the_rest(tmp_path):
+    cases = [JudgeCase("1 1", "3")] + [JudgeCase("1 1", "2")] * 3
+    judged = run(_judge(tmp_path, 'python', PYTHON_SUM, cases, stop_on_failure=True))
+    assert judged.verdict == WRONG_ANSWER
+    assert judged.cases[0].verdict == WRONG_ANSWER
+    # One core: the others wait for a slot, and find the batch stopped
+    if (os.cpu_count() or 1) == 1:
+        assert {case.verdict for case in judged.cases[1:]} == {SKIPPED}
+
+
+def test_cpu_limit_is_a_time_limit(tmp_path):
+    judged = run(_judge(tmp_path, 'python', "while True:\n    pass", [JudgeCase("")]))
+    assert judged.verdict == TIME_LIMIT_EXCEEDED
+
+
+@pytest.mark.skipif(shutil.which('gcc') is None, reason="needs gcc")
+def test_compiled_programs_are_built_once(tmp_path):
+    code = '#include <stdio.h>\nint main(void) { int a, b; scanf("%d %d", &a, &b); printf("%d\\n", a * b); return 0; }\n'
+    judged = run(_judge(tmp_path, 'c', code, [JudgeCase("3 4", "12"), JudgeCase("5 6", "30")]))
+    assert judged.verdict == ACCEPTED and judged.compile_time > 0
+    assert all(case.result.usage is not None for case in judged.cases)
+
+    broken = run(_judge(tmp_path, 'c', "int main(void) { return }", [JudgeCase("", "")]))
+    assert broken.verdict == COMPILE_ERROR and broken.cases == [] and 'error' in broken.compile_error
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import signal
+import sys
+
+import pytest
+
+from compiler_service.launcher import ForkServer
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason="the fork server is POSIX only")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _run(server: ForkServer, argv, cwd, rlimits=None, stdin=b""):
+    proc = await server.spawn(argv, cwd, rlimits)
+    out, err = await asyncio.wait_for(proc.communicate(stdin), 10)
+    return proc, out, err
+
+
+def test_commands_run_with_their_usage(tmp_path):
+    async def scenario():
+        server = ForkServer()
+        try:
+            proc, out, err = await _run(server, ['sh', '-c', 'pwd; cat'], str(tmp_path), stdin=b"hi\n")
+            assert (proc.returncode, out, err) == (0, f"{tmp_path}\nhi\n".encode(), b"")
+            assert proc.usage.max_rss_kb > 0 and proc.usage.exit_signal is None
+            assert 0 < proc.usage.rss_floor_kb <= proc.usage.max_rss_kb
+
+            proc, _, _ = await _run(server, ['sh', '-c', 'exit 3'], str(tmp_path))
+            assert proc.returncode == 3
+            # A trivial program's peak is all floor
+            assert proc.usage.rss_floor_kb <= proc.usage.max_rss_kb
+
+            # What a program allocates shows above the floor
+            program = 'b = bytearray(64 << 20)\nfor i in range(0, len(b), 4096): b[i] = 1'
+            proc, _, _ = await _run(server, [sys.executable, '-c', program], str(tmp_path))
+            assert proc.returncode == 0
+            assert proc.usage.max_rss_kb - proc.usage.rss_floor_kb > 60 << 10
+            assert server.metrics()['spawned'] == 3
+        finally:
+            await server.close()
+
+    run(scenario())
+
+
+def test_rlimits_are_applied(tmp_path):
+    async def scenario():
+        server = ForkServer()
+        try:
+            proc, _, _ = await _run(server, ['sh', '-c', 'while :; do :; done'], str(tmp_path),
+                                    {'RLIMIT_CPU': 1})
+            assert proc.usage.exit_signal == signal.SIGXCPU
+            assert proc.usage.user_time + proc.usage.system_time >= 0.9
+
+            proc, _, _ = await _run(server, ['sh', '-c', 'exec head -c 100000 /dev/zero > out'], str(tmp_path),
+                                    {'RLIMIT_FSIZE': 1000})
+            assert proc.usage.exit_signal == signal.SIGXFSZ
+            assert os.path.getsize(tmp_path / 'out') == 1000
+        finally:
+            await server.close()
+
+    run(scenario())
+
+
+def test_missing_command_fails_before_forking(tmp_path):
+    async def scenario():
+        server = ForkServer()
+        try:
+            with pytest.raises(FileNotFoundError):
+                await server.spawn(['no-such-command-here'], str(tmp_path))
+            assert server.metrics()['spawned'] == 0
+        finally:
+            await server.close()
+
+    run(scenario())
+
+
+def test_cancelled_spawn_kills_its_child(tmp_path):
+    async def scenario():
+        server = ForkServer()
+        try:
+            await server.start()
+            spawning = asyncio.create_task(server.spawn(['sleep', '30'], str(tmp_path)))
+            # Let it send its request, then give up before the reply arrives
+            await asyncio.sleep(0)
+            spawning.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await spawning
+
+            # The server carries on, and the orphan is killed and reaped
+            proc, out, _ = await _run(server, ['echo', 'ok'], str(tmp_path))
+            assert out == b"ok\n"
+            for _ in range(100):
+                if not server._exits:
+                    break
+                await asyncio.sleep(0.05)
+            assert server._exits == {}
+            assert server.metrics()['server_starts'] == 1
+        finally:
+            await server.close()
+
+    run(scenario())
+
+
+def test_server_is_restarted_after_it_dies(tmp_path):
+    async def scenario():
+        server = ForkServer()
+        try:
+            sleeper = await server.spawn(['sleep', '30'], str(tmp_path))
+            server._server.kill()
+            # Its children are killed with it and reported as such
+            assert await asyncio.wait_for(sleeper.wait(), 10) == -signal.SIGKILL
+            sleeper.discard()
+
+            proc, out, _ = await _run(server, ['echo', 'again'], str(tmp_path))
+            assert out == b"again\n"
+            assert server.metrics()['server_starts'] == 2
+        finally:
+            await server.close()
+
+    run(scenario())
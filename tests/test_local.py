@@ -0,0 +1,35 @@
+import asyncio
+import os
+
+import pytest
+
+from compiler_service.limits import ResourceLimits
+from compiler_service.local import LocalCompiler
+from compiler_service.workspace import WorkspacePool
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason="rlimits are POSIX only")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _execute(tmp_path, language, code, limits):
+    compiler = LocalCompiler(timeout=5, workspaces=WorkspacePool(root=str(tmp_path), size=1), limits=limits)
+    try:
+        return await compiler.execute(language, code)
+    finally:
+        await compiler.close()
+        compiler.workspaces.close()
+
+
+@pytest.mark.parametrize('padding', [0, 70 * 1024])
+def test_shell_scripts_of_any_size_run_under_limits(tmp_path, padding):
+    # Larger than a fork server request once padded
+    script = f"# {'x' * padding}\nulimit -t\nulimit -f\n"
+    result = run(_execute(tmp_path, 'bash', script, ResourceLimits(cpu_seconds=1, file_bytes=1024 * 1024)))
+    assert result.success, result.stderr
+    # ulimit -f counts 512-byte blocks in POSIX mode, 1024 in bash
+    assert result.stdout.split()[0] == '1'
+    assert result.stdout.split()[1] in ('1024', '2048')
+    assert result.usage is not None
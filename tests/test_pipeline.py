@@ -0,0 +1,90 @@
+import asyncio
+
+from analysis_engine import pipeline
+from analysis_engine.health_index import HealthAccumulator
+from analysis_engine.pipeline import AnalysisPool, FileStageStats, analyze_batch, analyze_file
+from models.analysis import FileMetrics
+
+
+def test_unknown_languages_are_skipped():
+    assert analyze_file('notes.txt', 'hello') is None
+
+
+def test_failing_file_is_recorded_not_raised(monkeypatch):
+    real = pipeline._analyze
+
+    def flaky(filename, code, language, complexity_threshold):
+        if filename == 'bad.py':
+            raise IndexError('list index out of range')
+        return real(filename, code, language, complexity_threshold)
+
+    monkeypatch.setattr(pipeline, '_analyze', flaky)
+    batch = analyze_batch([
+        ('good.py', 'def f():\n    return 1\n'),
+        ('bad.py', 'x = 1\n'),
+        ('other.js', 'function g() { return 2; }\n'),
+    ])
+
+    assert [a.metrics.filename for a in batch.analyses] == ['good.py', 'bad.py', 'other.js']
+    bad = batch.analyses[1]
+    assert bad.metrics.error == 'IndexError: list index out of range'
+    assert bad.smells == [] and bad.metrics.loc == 0
+    assert all(a.metrics.error is None for a in batch.analyses if a is not bad)
+    # Only the files that were analyzed count towards health
+    assert batch.health.files == 2
+
+
+def test_stored_results_score_like_a_full_analysis(monkeypatch):
+    real = pipeline._analyze
+
+    def flaky(filename, code, language, complexity_threshold):
+        if filename == 'bad.py':
+            raise SyntaxError('invalid syntax')
+        return real(filename, code, language, complexity_threshold)
+
+    monkeypatch.setattr(pipeline, '_analyze', flaky)
+    batch = analyze_batch([
+        ('good.py', 'def f(x):\n    if x:\n        return 1\n    return 2\n'),
+        ('bad.py', 'def (:\n'),
+    ])
+
+    # A delta analysis rebuilds the untouched files from what was stored
+    stored = [FileMetrics(**a.metrics.model_dump()) for a in batch.analyses]
+    smells = [smell for a in batch.analyses for smell in a.smells]
+    health = HealthAccumulator.from_results(stored, smells)
+
+    assert health.files == batch.health.files == 1
+    assert [getattr(health, name) for name in HealthAccumulator.__slots__] == \
+        [getattr(batch.health, name) for name in HealthAccumulator.__slots__]
+
+
+class FakeCache:
+    def __init__(self):
+        self.stored = {}
+
+    def key(self, filename, code):
+        return filename
+
+    async def get_many(self, files):
+        return {}
+
+    async def put_many(self, entries):
+        self.stored.update(entries)
+
+
+def test_failures_are_not_cached(monkeypatch):
+    def broken(filename, code, language, complexity_threshold):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(pipeline, '_analyze', broken)
+    cache = FakeCache()
+    stats = FileStageStats()
+
+    async def scenario():
+        pool = AnalysisPool(workers=0)
+        return [chunk async for chunk in pool.map([('a.py', 'x = 1\n')], cache=cache, stats=stats)]
+
+    chunks = asyncio.run(scenario())
+    assert [a.metrics.error for chunk in chunks for a in chunk] == ['RuntimeError: boom']
+    assert cache.stored == {}
+    assert stats.health.files == 0
@@ -0,0 +1,56 @@
+import pytest
+
+from analysis_engine.language_adapters.adapters import get_adapter
+from analysis_engine.language_adapters.python_ast import analyze_python
+
+
+SOURCE = '''def f(x, y):
+    """Docstring lines are not code"""
+    # neither are comments
+    if x and y:
+        for i in range(x):
+            pass
+    return [i for i in range(y) if i]
+
+
+class A:
+    def method(self, a):
+        try:
+            return a
+        except ValueError:
+            return None
+'''
+
+
+def test_complexity_nesting_and_spans():
+    result = analyze_python(SOURCE)
+    assert result['functions'] == ['f', 'method']
+    assert result['classes'] == ['A']
+    # if + and + for + comprehension with one filter, and except
+    assert result['complexity'] == 1 + 2 + 1 + 2 + 1
+    spans = {f['name']: f for f in result['function_spans']}
+    assert spans['f']['complexity'] == 6
+    assert spans['f']['nesting'] == 2
+    assert (spans['f']['start'], spans['f']['end']) == (1, 7)
+    assert spans['f']['loc'] == 5
+    assert spans['method']['params'] == 1
+
+
+@pytest.mark.parametrize('newline', ['\r\n', '\r'])
+def test_other_line_endings_match_unix(newline):
+    expected = analyze_python(SOURCE)
+    result = analyze_python(SOURCE.replace('\n', newline))
+    assert result['loc'] == expected['loc']
+    assert result['line_count'] == expected['line_count']
+    assert result['function_spans'] == expected['function_spans']
+
+
+def test_form_feed_does_not_shift_lines():
+    code = 'x = 1\n\x0c\ndef f():\n    return 1\n'
+    spans = analyze_python(code)['function_spans']
+    assert (spans[0]['start'], spans[0]['loc']) == (3, 2)
+
+
+def test_unparseable_code_falls_back_to_line_scanner():
+    result = get_adapter('python', 'print "py2"\n', 'a.py').analyze('print "py2"\n')
+    assert 'function_metrics' in result
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+from compiler_service.python_pool import PythonWorkerPool
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason="the Python pool is POSIX only")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _run(pool: PythonWorkerPool, code: str, cwd: str, input_data: str = ""):
+    worker = await pool.acquire()
+    out, err = await asyncio.wait_for(worker.communicate(PythonWorkerPool.request(code, input_data, cwd)), 10)
+    return worker, out.decode(), err.decode()
+
+
+def test_programs_run_in_prestarted_workers(tmp_path):
+    async def scenario():
+        pool = PythonWorkerPool(size=2)
+        try:
+            await pool.start()
+            assert pool.metrics()['ready'] == 2
+            code = "import os, sys\nprint(sum(map(int, sys.stdin.read().split())), os.getcwd(), __name__)"
+            worker, out, err = await _run(pool, code, str(tmp_path), "1 2 3")
+            assert (worker.returncode, out, err) == (0, f"6 {tmp_path} __main__\n", "")
+            assert worker.usage.exit_signal is None
+            # The pool forks a replacement in the background
+            await pool._refill
+            return pool.metrics()
+        finally:
+            await pool.close()
+
+    metrics = run(scenario())
+    assert (metrics['ready'], metrics['warm_runs'], metrics['cold_runs']) == (2, 1, 0)
+
+
+def test_workers_never_carry_state_over(tmp_path):
+    async def scenario():
+        pool = PythonWorkerPool(size=1)
+        try:
+            await pool.start()
+            code = "import math\nmath.seen = getattr(math, 'seen', 0) + 1\nprint(math.seen)"
+            outputs = [(await _run(pool, code, str(tmp_path)))[1] for _ in range(3)]
+            return outputs, pool.metrics()
+        finally:
+            await pool.close()
+
+    outputs, metrics = run(scenario())
+    assert outputs == ["1\n"] * 3
+    assert metrics['warm_runs'] + metrics['cold_runs'] == 3
+
+
+def test_errors_exits_and_limits(tmp_path):
+    async def scenario():
+        pool = PythonWorkerPool(size=1, rlimits={'RLIMIT_CPU': 1})
+        try:
+            await pool.start()
+            failed, _, err = await _run(pool, "def f():\n    raise ValueError('boom')\nf()", str(tmp_path))
+            exited, _, _ = await _run(pool, "import sys\nsys.exit(4)", str(tmp_path))
+            spinning, _, _ = await _run(pool, "while True:\n    pass", str(tmp_path))
+            return failed, err, exited, spinning
+        finally:
+            await pool.close()
+
+    failed, err, exited, spinning = run(scenario())
+    assert failed.returncode == 1
+    # Reported like `python main.py` would, quoting the source
+    assert 'File "main.py", line 2, in f' in err and "raise ValueError('boom')" in err
+    assert 'fork_server' not in err and err.strip().endswith('ValueError: boom')
+    assert exited.returncode == 4
+    assert spinning.usage.exit_signal == signal.SIGXCPU
+
+
+def test_workers_of_a_dead_server_are_replaced(tmp_path):
+    async def scenario():
+        pool = PythonWorkerPool(size=2)
+        try:
+            await pool.start()
+            pool.server._server.kill()
+            for _ in range(100):
+                if all(worker.exited() for worker in pool._ready):
+                    break
+                await asyncio.sleep(0.05)
+            worker, out, _ = await _run(pool, "print('fresh')", str(tmp_path))
+            return worker.returncode, out, pool.metrics()
+        finally:
+            await pool.close()
+
+    returncode, out, metrics = run(scenario())
+    assert (returncode, out) == (0, "fresh\n")
+    assert metrics['cold_runs'] == 1 and metrics['server_starts'] == 2
@@ -0,0 +1,53 @@
+import asyncio
+
+import httpx
+import pytest
+
+from compiler_service.remote import RemoteCompiler, RemoteCompilerError
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _compiler(handler):
+    compiler = RemoteCompiler(url='http://compiler.test/run', retries=2, backoff=0)
+    compiler._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return compiler
+
+
+def _call(compiler):
+    async def scenario():
+        try:
+            return await compiler.run('python', 'print(1)')
+        finally:
+            await compiler.close()
+
+    return run(scenario())
+
+
+def test_requests_that_never_ran_are_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            raise httpx.ConnectError('connection refused', request=request)
+        return httpx.Response(200, json={'stdout': '1\n'})
+
+    assert _call(_compiler(handler)) == {'stdout': '1\n'}
+    assert len(calls) == 3
+
+
+def test_dropped_connections_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.RemoteProtocolError('Server disconnected without sending a response.', request=request)
+
+    with pytest.raises(RemoteCompilerError) as error:
+        _call(_compiler(handler))
+    # The program may have run already: it must not run twice
+    assert len(calls) == 1
+    assert error.value.status_code == 502
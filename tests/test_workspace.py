@@ -0,0 +1,53 @@
+import os
+
+from compiler_service.workspace import WorkspacePool
+
+
+def test_workspaces_are_reused_and_wiped(tmp_path):
+    pool = WorkspacePool(root=str(tmp_path), size=1)
+    with pool.workspace() as path:
+        os.makedirs(os.path.join(path, 'sub'))
+        with open(os.path.join(path, 'sub', 'out.txt'), 'w') as f:
+            f.write('data')
+        os.chmod(os.path.join(path, 'sub'), 0o500)
+    with pool.workspace() as again:
+        assert again == path
+        assert os.listdir(again) == []
+    assert pool.metrics()['available'] == 1
+    pool.close()
+    assert not os.path.exists(pool.directory)
+
+
+def test_exhausted_pool_hands_out_one_off_directories(tmp_path):
+    pool = WorkspacePool(root=str(tmp_path), size=1)
+    first = pool.acquire()
+    extra = pool.acquire()
+    assert extra != first and os.path.isdir(extra)
+    pool.release(extra)
+    assert not os.path.exists(extra)
+    pool.release(first)
+    metrics = pool.metrics()
+    assert (metrics['exhausted'], metrics['in_use'], metrics['available']) == (1, 0, 1)
+    pool.close()
+
+
+def test_oversized_workspace_is_rebuilt(tmp_path):
+    pool = WorkspacePool(root=str(tmp_path), size=1, max_bytes=10)
+    with pool.workspace() as path:
+        with open(os.path.join(path, 'big'), 'wb') as f:
+            f.write(b'x' * 100)
+    assert pool.metrics()['over_quota'] == 1
+    with pool.workspace() as path:
+        assert os.listdir(path) == []
+    pool.close()
+
+
+def test_directories_of_dead_processes_are_removed(tmp_path):
+    pool = WorkspacePool(root=str(tmp_path), size=1)
+    # No process has pid 2**22 + 1 (above Linux's pid_max)
+    stale = os.path.join(pool.base, f"pool-{2 ** 22 + 1}")
+    os.makedirs(os.path.join(stale, 'ws-0'))
+    pool._remove_stale()
+    assert not os.path.exists(stale)
+    assert os.path.exists(pool.directory)
+    pool.close()
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from storage.write_buffer import WriteBehindBuffer, WriteDropped
+
+
+class FakeCollection:
+    """insert_many with unordered semantics; documents marked 'bad' fail validation"""
+
+    def __init__(self, name, fail_times=0):
+        self.name = name
+        self.docs = []
+        self.calls = 0
+        # Whole-call failures (e.g. a lost connection) before inserts succeed
+        self.fail_times = fail_times
+
+    async def insert_many(self, docs, ordered=True):
+        assert ordered is False
+        self.calls += 1
+        if self.fail_times:
+            self.fail_times -= 1
+            raise AutoReconnect('connection lost')
+        errors = []
+        for index, doc in enumerate(docs):
+            if doc.get('bad'):
+                errors.append({'index': index, 'code': 121, 'errmsg': 'Document failed validation'})
+            else:
+                self.docs.append(doc)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(docs) - len(errors)})
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_writes_are_group_committed():
+    async def scenario():
+        files = FakeCollection('files')
+        buffer = WriteBehindBuffer(max_docs=100, max_delay=0.01)
+        futures = [await buffer.enqueue(files, [{'n': i}]) for i in range(10)]
+        await asyncio.gather(*futures)
+        await buffer.drain()
+        return files, buffer.metrics()
+
+    files, metrics = run(scenario())
+    assert [d['n'] for d in files.docs] == list(range(10))
+    assert files.calls == 1
+    assert metrics['documents_written'] == 10 and metrics['dropped_documents'] == 0
+
+
+def test_bad_document_does_not_fail_its_batch():
+    async def scenario():
+        files = FakeCollection('files')
+        buffer = WriteBehindBuffer(max_docs=100, max_delay=0.01, max_attempts=2)
+        good = await buffer.enqueue(files, [{'n': 1}, {'n': 2}])
+        bad = await buffer.enqueue(files, [{'n': 3}, {'n': 4, 'bad': True}], key='a')
+        await good
+        with pytest.raises(WriteDropped):
+            await bad
+        await buffer.drain()
+        return files, buffer
+
+    files, buffer = run(scenario())
+    # Written once each: only the failed document was retried
+    assert sorted(d['n'] for d in files.docs) == [1, 2, 3]
+    assert files.calls == 2
+    metrics = buffer.metrics()
+    assert metrics['dropped_writes'] == 1 and metrics['dropped_documents'] == 1
+    assert metrics['documents_written'] == 3
+
+
+def test_failed_calls_are_retried():
+    async def scenario():
+        files = FakeCollection('files', fail_times=2)
+        buffer = WriteBehindBuffer(max_docs=100, max_delay=0.01, max_attempts=3)
+        await (await buffer.enqueue(files, [{'n': 1}]))
+        await buffer.drain()
+        return files
+
+    files = run(scenario())
+    assert files.calls == 3 and len(files.docs) == 1
+
+
+def test_dependent_summary_is_dropped_with_its_files():
+    async def scenario():
+        files, summaries = FakeCollection('files'), FakeCollection('summaries')
+        buffer = WriteBehindBuffer(max_docs=100, max_delay=0.01, max_attempts=2)
+        part = await buffer.enqueue(files, [{'n': 1, 'bad': True}], key='a')
+        summary = await buffer.enqueue(summaries, [{'id': 'a'}], stage=1, key='a', after=[part])
+        other = await buffer.enqueue(summaries, [{'id': 'b'}], stage=1, key='b')
+        with pytest.raises(WriteDropped):
+            await summary
+        await other
+        with pytest.raises(WriteDropped):
+            await buffer.wait_for('a')
+        await buffer.wait_for('b')
+        await buffer.drain()
+        return summaries, buffer.metrics()
+
+    summaries, metrics = run(scenario())
+    assert summaries.docs == [{'id': 'b'}]
+    assert metrics['dropped_writes'] == 2
+
+
+def test_dependent_waits_for_retried_writes():
+    async def scenario():
+        files, summaries = FakeCollection('files', fail_times=1), FakeCollection('summaries')
+        buffer = WriteBehindBuffer(max_docs=100, max_delay=0.01, max_attempts=3)
+        part = await buffer.enqueue(files, [{'n': 1}], key='a')
+        summary = await buffer.enqueue(summaries, [{'id': 'a'}], stage=1, key='a', after=[part])
+        await summary
+        assert part.done()
+        await buffer.drain()
+        return summaries
+
+    assert run(scenario()).docs == [{'id': 'a'}]
+
+
+def test_closed_buffer_rejects_writes():
+    async def scenario():
+        buffer = WriteBehindBuffer()
+        await buffer.drain()
+        with pytest.raises(RuntimeError):
+            await buffer.enqueue(FakeCollection('files'), [{'n': 1}])
+
+    run(scenario())